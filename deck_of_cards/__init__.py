@@ -1,3 +1,103 @@
 #!/usr/bin/python
 """A Python Implementation Of A Deck of Cards
+
+The package exposes the :class:`deck_of_cards.card.Card` and
+:class:`deck_of_cards.deck.Deck` objects and the card constants at the top
+level. Nothing is imported until an attribute is first used, so
+``import deck_of_cards`` stays cheap for short-lived processes and optional
+submodules only load when they are needed.
 """
+
+import sys
+
+#: maps a top-level attribute to the submodule that provides it
+_LAZY_ATTRIBUTES = {
+    'Card' : 'card',
+    'POSSIBLE_SUIT' : 'card',
+    'POSSIBLE_RANK' : 'card',
+    'JOKER_SUIT' : 'card',
+    'JOKER_RANK' : 'card',
+    'RANK_TRANSLATION' : 'card',
+    'Deck' : 'deck',
+}
+
+#: submodules that are imported on first attribute access
+_LAZY_SUBMODULES = (
+    'card',
+    'card_array',
+    'core',
+    'counter_random',
+    'deck',
+    'fairness',
+    'journal',
+    'lehmer',
+    'memory',
+    'metrics',
+    'recorder',
+    'records',
+    'replication',
+    'scheduler',
+    'shared',
+)
+
+__all__ = sorted(list(_LAZY_ATTRIBUTES) + list(_LAZY_SUBMODULES))
+
+def _load(name):
+    """Import the submodule or attribute `name` and cache it on the package
+
+    :param str name: a key of :attr:`_LAZY_ATTRIBUTES` or a name in
+                     :attr:`_LAZY_SUBMODULES`
+    :returns: the submodule or attribute
+    :raises: AttributeError
+    """
+    if name in _LAZY_SUBMODULES:
+        module_name = name
+    elif name in _LAZY_ATTRIBUTES:
+        module_name = _LAZY_ATTRIBUTES[name]
+    else:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+    __import__('%s.%s' % (__name__, module_name))
+    module = sys.modules['%s.%s' % (__name__, module_name)]
+
+    if name in _LAZY_SUBMODULES:
+        value = module
+    else:
+        value = getattr(module, name)
+
+    setattr(sys.modules[__name__], name, value)
+    return value
+
+def __getattr__(name):
+    """PEP 562 hook which loads top-level attributes on first access
+    """
+    return _load(name)
+
+def __dir__():
+    """
+    :returns: names available on the package, loaded or not
+    :rtype: list
+    """
+    return sorted(set(globals()) | set(__all__))
+
+if sys.version_info < (3, 7):
+    # module level __getattr__ is only honoured from Python 3.7 on, so older
+    # interpreters get a module subclass that forwards missing attributes
+    import types
+
+    class _LazyModule(types.ModuleType):
+        """Module type that forwards missing attributes to :func:`_load`
+        """
+
+        def __getattr__(self, name):
+            return _load(name)
+
+        def __dir__(self):
+            return __dir__()
+
+    _lazy_module = _LazyModule(__name__, __doc__)
+    _lazy_module.__dict__.update(sys.modules[__name__].__dict__)
+    # keep the original module alive, Python 2 clears the globals of a
+    # module object when it is garbage collected
+    _lazy_module._original_module = sys.modules[__name__]
+    sys.modules[__name__] = _lazy_module
@@ -0,0 +1,855 @@
+/*
+ * C implementation of deck_of_cards.core
+ *
+ * Every function behaves like its pure Python counterpart in core.py, down to
+ * the random numbers it draws and the exceptions it raises. Only the
+ * interpreter overhead of the loops over cards is gone.
+ */
+
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+
+#if PY_MAJOR_VERSION >= 3
+#define Int_FromSsize_t PyLong_FromSsize_t
+#define String_InternFromString PyUnicode_InternFromString
+#else
+#define Int_FromSsize_t PyInt_FromSsize_t
+#define String_InternFromString PyString_InternFromString
+#endif
+
+/* the card codes, ranks and suits, read from deck_of_cards.card on import */
+#define MAX_CODES 256
+#define MAX_SUITS 16
+static PyObject *card_type = NULL;
+static PyObject *code_by_rank_suit = NULL;
+static PyObject *suits = NULL;
+static Py_ssize_t number_of_codes = 0;
+static Py_ssize_t number_of_ranks = 0;
+static Py_ssize_t joker_code = 0;
+static Py_ssize_t rank_of_code[MAX_CODES];
+static Py_ssize_t suit_of_code[MAX_CODES];
+/* the code of every (suit index, rank), -1 when no card has them */
+static Py_ssize_t code_of_suit_rank[MAX_SUITS][MAX_CODES];
+
+static PyObject *random_module = NULL;
+
+static PyObject *str_rank = NULL;
+static PyObject *str_suit = NULL;
+static PyObject *str_cards = NULL;
+static PyObject *str_in_play_cards = NULL;
+static PyObject *str_discarded_cards = NULL;
+static PyObject *str_code_counts = NULL;
+static PyObject *str_rank_counts = NULL;
+static PyObject *str_suit_counts = NULL;
+static PyObject *str_randrange = NULL;
+static PyObject *str_random = NULL;
+static PyObject *str_shuffle = NULL;
+static PyObject *str_pop = NULL;
+static PyObject *str_append = NULL;
+static PyObject *str_remove = NULL;
+
+/* Returns the code of a card like _CODE_BY_RANK_SUIT[(rank, suit)], or -1 with
+ * a KeyError set */
+static Py_ssize_t
+card_code(PyObject *c_card)
+{
+    PyObject *rank, *suit, *key, *code, *error_args;
+    Py_ssize_t value = -1, i, rank_value;
+
+    rank = PyObject_GetAttr(c_card, str_rank);
+    if (rank == NULL)
+        return -1;
+    suit = PyObject_GetAttr(c_card, str_suit);
+    if (suit == NULL) {
+        Py_DECREF(rank);
+        return -1;
+    }
+
+    /* cards share the suit strings of deck_of_cards.card, so look the code
+     * up by identity and skip building a key */
+#if PY_MAJOR_VERSION >= 3
+    if (PyLong_CheckExact(rank)) {
+#else
+    if (PyInt_CheckExact(rank)) {
+#endif
+        rank_value = PyNumber_AsSsize_t(rank, NULL);
+        for (i = 0; i < PyList_GET_SIZE(suits); i++) {
+            if (suit == PyList_GET_ITEM(suits, i)) {
+                if (rank_value >= 0 && rank_value < number_of_ranks)
+                    value = code_of_suit_rank[i][rank_value];
+                break;
+            }
+        }
+        if (value != -1) {
+            Py_DECREF(rank);
+            Py_DECREF(suit);
+            return value;
+        }
+        PyErr_Clear();
+    }
+
+    key = PyTuple_Pack(2, rank, suit);
+    Py_DECREF(rank);
+    Py_DECREF(suit);
+    if (key == NULL)
+        return -1;
+
+    code = PyDict_GetItem(code_by_rank_suit, key);
+    if (code != NULL) {
+        value = PyNumber_AsSsize_t(code, NULL);
+    }
+    else if (!PyErr_Occurred()) {
+        error_args = PyTuple_Pack(1, key);
+        if (error_args != NULL) {
+            PyErr_SetObject(PyExc_KeyError, error_args);
+            Py_DECREF(error_args);
+        }
+    }
+    Py_DECREF(key);
+    return value;
+}
+
+/* Adds `delta` to sequence[index] */
+static int
+add_to_item(PyObject *sequence, PyObject *index, Py_ssize_t delta)
+{
+    PyObject *item, *new_item;
+    Py_ssize_t value;
+    int result;
+
+    item = PyObject_GetItem(sequence, index);
+    if (item == NULL)
+        return -1;
+    value = PyNumber_AsSsize_t(item, NULL);
+    Py_DECREF(item);
+    if (value == -1 && PyErr_Occurred())
+        return -1;
+
+    new_item = Int_FromSsize_t(value + delta);
+    if (new_item == NULL)
+        return -1;
+    result = PyObject_SetItem(sequence, index, new_item);
+    Py_DECREF(new_item);
+    return result;
+}
+
+static int
+add_to_attribute_item(PyObject *obj, PyObject *name, PyObject *index, Py_ssize_t delta)
+{
+    PyObject *sequence;
+    int result;
+
+    sequence = PyObject_GetAttr(obj, name);
+    if (sequence == NULL)
+        return -1;
+    result = add_to_item(sequence, index, delta);
+    Py_DECREF(sequence);
+    return result;
+}
+
+/* Takes a card out of the remaining counts of a deck, see core.count_out */
+static int
+count_out_card(PyObject *d_deck, PyObject *c_card)
+{
+    PyObject *index;
+    Py_ssize_t code;
+    int result;
+
+    code = card_code(c_card);
+    if (code == -1)
+        return -1;
+
+    index = Int_FromSsize_t(code);
+    if (index == NULL)
+        return -1;
+    result = add_to_attribute_item(d_deck, str_code_counts, index, -1);
+    Py_DECREF(index);
+    if (result == -1)
+        return -1;
+
+    index = Int_FromSsize_t(rank_of_code[code]);
+    if (index == NULL)
+        return -1;
+    result = add_to_attribute_item(d_deck, str_rank_counts, index, -1);
+    Py_DECREF(index);
+    if (result == -1)
+        return -1;
+
+    return add_to_attribute_item(d_deck, str_suit_counts,
+                                 PyList_GET_ITEM(suits, suit_of_code[code]), -1);
+}
+
+/* Builds a list of `size` integers */
+static PyObject *
+list_from_counts(const Py_ssize_t *counts, Py_ssize_t size)
+{
+    PyObject *list, *item;
+    Py_ssize_t i;
+
+    list = PyList_New(size);
+    if (list == NULL)
+        return NULL;
+    for (i = 0; i < size; i++) {
+        item = Int_FromSsize_t(counts[i]);
+        if (item == NULL) {
+            Py_DECREF(list);
+            return NULL;
+        }
+        PyList_SET_ITEM(list, i, item);
+    }
+    return list;
+}
+
+PyDoc_STRVAR(pile_codes_doc, "See deck_of_cards.core.pile_codes");
+
+static PyObject *
+pile_codes(PyObject *self, PyObject *cards)
+{
+    PyObject *fast, *codes, *item;
+    Py_ssize_t i, size, code;
+
+    fast = PySequence_Fast(cards, "cards must be iterable");
+    if (fast == NULL)
+        return NULL;
+    size = PySequence_Fast_GET_SIZE(fast);
+    codes = PyList_New(size);
+    if (codes == NULL)
+        goto error;
+
+    for (i = 0; i < size; i++) {
+        code = card_code(PySequence_Fast_GET_ITEM(fast, i));
+        if (code == -1)
+            goto error;
+        item = Int_FromSsize_t(code);
+        if (item == NULL)
+            goto error;
+        PyList_SET_ITEM(codes, i, item);
+    }
+    Py_DECREF(fast);
+    return codes;
+
+error:
+    Py_DECREF(fast);
+    Py_XDECREF(codes);
+    return NULL;
+}
+
+PyDoc_STRVAR(count_cards_doc, "See deck_of_cards.core.count_cards");
+
+static PyObject *
+count_cards(PyObject *self, PyObject *cards)
+{
+    PyObject *fast, *code_list = NULL, *rank_list = NULL, *suit_dict = NULL;
+    PyObject *item, *result = NULL;
+    Py_ssize_t code_counts[MAX_CODES] = {0};
+    Py_ssize_t rank_counts[MAX_CODES] = {0};
+    Py_ssize_t suit_counts[MAX_SUITS] = {0};
+    Py_ssize_t i, size, code;
+
+    fast = PySequence_Fast(cards, "cards must be iterable");
+    if (fast == NULL)
+        return NULL;
+    size = PySequence_Fast_GET_SIZE(fast);
+    for (i = 0; i < size; i++) {
+        code = card_code(PySequence_Fast_GET_ITEM(fast, i));
+        if (code == -1)
+            goto done;
+        code_counts[code]++;
+        rank_counts[rank_of_code[code]]++;
+        suit_counts[suit_of_code[code]]++;
+    }
+
+    code_list = list_from_counts(code_counts, number_of_codes);
+    rank_list = list_from_counts(rank_counts, number_of_ranks);
+    suit_dict = PyDict_New();
+    if (code_list == NULL || rank_list == NULL || suit_dict == NULL)
+        goto done;
+    for (i = 0; i < PyList_GET_SIZE(suits); i++) {
+        item = Int_FromSsize_t(suit_counts[i]);
+        if (item == NULL || PyDict_SetItem(suit_dict, PyList_GET_ITEM(suits, i), item) == -1) {
+            Py_XDECREF(item);
+            goto done;
+        }
+        Py_DECREF(item);
+    }
+    result = PyTuple_Pack(3, code_list, rank_list, suit_dict);
+
+done:
+    Py_DECREF(fast);
+    Py_XDECREF(code_list);
+    Py_XDECREF(rank_list);
+    Py_XDECREF(suit_dict);
+    return result;
+}
+
+PyDoc_STRVAR(count_out_doc, "See deck_of_cards.core.count_out");
+
+static PyObject *
+count_out(PyObject *self, PyObject *args)
+{
+    PyObject *d_deck, *c_card;
+
+    if (!PyArg_UnpackTuple(args, "count_out", 2, 2, &d_deck, &c_card))
+        return NULL;
+    if (count_out_card(d_deck, c_card) == -1)
+        return NULL;
+    Py_RETURN_NONE;
+}
+
+PyDoc_STRVAR(bad_codes_doc, "See deck_of_cards.core.bad_codes");
+
+static PyObject *
+bad_codes(PyObject *self, PyObject *codes)
+{
+    PyObject *fast, *bad, *item;
+    Py_ssize_t code_counts[MAX_CODES] = {0};
+    Py_ssize_t i, size, code;
+
+    fast = PySequence_Fast(codes, "codes must be iterable");
+    if (fast == NULL)
+        return NULL;
+    size = PySequence_Fast_GET_SIZE(fast);
+    for (i = 0; i < size; i++) {
+        code = PyNumber_AsSsize_t(PySequence_Fast_GET_ITEM(fast, i), PyExc_IndexError);
+        if (code == -1 && PyErr_Occurred()) {
+            Py_DECREF(fast);
+            return NULL;
+        }
+        /* index like a Python list would */
+        if (code < 0)
+            code += number_of_codes;
+        if (code < 0 || code >= number_of_codes) {
+            Py_DECREF(fast);
+            PyErr_SetString(PyExc_IndexError, "list index out of range");
+            return NULL;
+        }
+        code_counts[code]++;
+    }
+    Py_DECREF(fast);
+
+    bad = PyList_New(0);
+    if (bad == NULL)
+        return NULL;
+    for (code = 0; code < number_of_codes; code++) {
+        if (code_counts[code] > (code == joker_code ? 2 : 1)) {
+            item = Int_FromSsize_t(code);
+            if (item == NULL || PyList_Append(bad, item) == -1) {
+                Py_XDECREF(item);
+                Py_DECREF(bad);
+                return NULL;
+            }
+            Py_DECREF(item);
+        }
+    }
+    return bad;
+}
+
+/* Swaps items[i] and items[j] */
+static int
+swap_items(PyObject *items, Py_ssize_t i, Py_ssize_t j)
+{
+    PyObject *item_i, *item_j;
+    int result;
+
+    if (PyList_CheckExact(items)) {
+        item_i = PyList_GET_ITEM(items, i);
+        PyList_SET_ITEM(items, i, PyList_GET_ITEM(items, j));
+        PyList_SET_ITEM(items, j, item_i);
+        return 0;
+    }
+
+    item_i = PySequence_GetItem(items, i);
+    if (item_i == NULL)
+        return -1;
+    item_j = PySequence_GetItem(items, j);
+    if (item_j == NULL) {
+        Py_DECREF(item_i);
+        return -1;
+    }
+    result = PySequence_SetItem(items, i, item_j);
+    if (result != -1)
+        result = PySequence_SetItem(items, j, item_i);
+    Py_DECREF(item_i);
+    Py_DECREF(item_j);
+    return result;
+}
+
+/* Draws j in [0, bound) from a randrange method */
+static Py_ssize_t
+call_randrange(PyObject *randrange, Py_ssize_t bound)
+{
+    PyObject *value;
+    Py_ssize_t j;
+
+    value = PyObject_CallFunction(randrange, "n", bound);
+    if (value == NULL)
+        return -1;
+    j = PyNumber_AsSsize_t(value, PyExc_OverflowError);
+    Py_DECREF(value);
+    if (j == -1 && PyErr_Occurred())
+        return -1;
+    if (j < 0 || j >= bound) {
+        PyErr_SetString(PyExc_IndexError, "randrange returned an index out of range");
+        return -1;
+    }
+    return j;
+}
+
+#if PY_MAJOR_VERSION < 3
+/* random.shuffle of Python 2, which draws j = int(random() * (i + 1)) */
+static int
+shuffle_all(PyObject *items, Py_ssize_t size)
+{
+    PyObject *random_function, *value;
+    Py_ssize_t i, j;
+    double r;
+
+    random_function = PyObject_GetAttr(random_module, str_random);
+    if (random_function == NULL)
+        return -1;
+    for (i = size - 1; i > 0; i--) {
+        value = PyObject_CallObject(random_function, NULL);
+        if (value == NULL)
+            goto error;
+        r = PyFloat_AsDouble(value);
+        Py_DECREF(value);
+        if (r == -1.0 && PyErr_Occurred())
+            goto error;
+        j = (Py_ssize_t)(r * (double)(i + 1));
+        if (j < 0 || j > i) {
+            PyErr_SetString(PyExc_IndexError, "random() returned a value out of [0, 1)");
+            goto error;
+        }
+        if (swap_items(items, i, j) == -1)
+            goto error;
+    }
+    Py_DECREF(random_function);
+    return 0;
+
+error:
+    Py_DECREF(random_function);
+    return -1;
+}
+#else
+/* random.shuffle draws with the private _randbelow on Python 3, so call it */
+static int
+shuffle_all(PyObject *items, Py_ssize_t size)
+{
+    PyObject *result;
+
+    result = PyObject_CallMethodObjArgs(random_module, str_shuffle, items, NULL);
+    if (result == NULL)
+        return -1;
+    Py_DECREF(result);
+    return 0;
+}
+#endif
+
+PyDoc_STRVAR(partial_shuffle_doc, "See deck_of_cards.deck.partial_shuffle");
+
+static PyObject *
+partial_shuffle(PyObject *self, PyObject *args, PyObject *kwargs)
+{
+    static char *keywords[] = {"items", "top_k", "rng", NULL};
+    PyObject *items, *top_k_object = Py_None, *rng = Py_None, *randrange;
+    Py_ssize_t size, top_k, i;
+    int rng_is_true;
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "O|OO:partial_shuffle", keywords,
+                                     &items, &top_k_object, &rng))
+        return NULL;
+
+    size = PyObject_Size(items);
+    if (size == -1)
+        return NULL;
+
+    if (top_k_object == Py_None) {
+        top_k = size - 1;
+    }
+    else {
+        top_k = PyNumber_AsSsize_t(top_k_object, PyExc_OverflowError);
+        if (top_k == -1 && PyErr_Occurred())
+            return NULL;
+    }
+
+    if (top_k >= size - 1) {
+        if (rng == Py_None) {
+            if (shuffle_all(items, size) == -1)
+                return NULL;
+            Py_RETURN_NONE;
+        }
+        top_k = size - 1 > 0 ? size - 1 : 0;
+    }
+
+    rng_is_true = rng == Py_None ? 0 : PyObject_IsTrue(rng);
+    if (rng_is_true == -1)
+        return NULL;
+    randrange = PyObject_GetAttr(rng_is_true ? rng : random_module, str_randrange);
+    if (randrange == NULL)
+        return NULL;
+
+    for (i = size - 1; i > size - 1 - top_k; i--) {
+        Py_ssize_t j = call_randrange(randrange, i + 1);
+        if (j == -1 || swap_items(items, i, j) == -1) {
+            Py_DECREF(randrange);
+            return NULL;
+        }
+    }
+    Py_DECREF(randrange);
+    Py_RETURN_NONE;
+}
+
+/* Calls obj.name(arg) and drops the result */
+static int
+call_method_one(PyObject *obj, PyObject *name, PyObject *arg)
+{
+    PyObject *result;
+
+    result = PyObject_CallMethodObjArgs(obj, name, arg, NULL);
+    if (result == NULL)
+        return -1;
+    Py_DECREF(result);
+    return 0;
+}
+
+PyDoc_STRVAR(deal_doc, "See deck_of_cards.core.deal");
+
+static PyObject *
+deal(PyObject *self, PyObject *args)
+{
+    PyObject *d_deck, *index_object, *cards, *in_play_cards, *deal_card = NULL;
+    Py_ssize_t index, size;
+    int result;
+
+    if (!PyArg_UnpackTuple(args, "deal", 2, 2, &d_deck, &index_object))
+        return NULL;
+
+    cards = PyObject_GetAttr(d_deck, str_cards);
+    if (cards == NULL)
+        return NULL;
+
+    if (PyList_CheckExact(cards)) {
+        index = PyNumber_AsSsize_t(index_object, PyExc_IndexError);
+        if (index == -1 && PyErr_Occurred())
+            goto done;
+        size = PyList_GET_SIZE(cards);
+        if (size == 0) {
+            PyErr_SetString(PyExc_IndexError, "pop from empty list");
+            goto done;
+        }
+        if (index < 0)
+            index += size;
+        if (index < 0 || index >= size) {
+            PyErr_SetString(PyExc_IndexError, "pop index out of range");
+            goto done;
+        }
+        deal_card = PyList_GET_ITEM(cards, index);
+        Py_INCREF(deal_card);
+        if (PyList_SetSlice(cards, index, index + 1, NULL) == -1) {
+            Py_CLEAR(deal_card);
+            goto done;
+        }
+    }
+    else {
+        deal_card = PyObject_CallMethodObjArgs(cards, str_pop, index_object, NULL);
+        if (deal_card == NULL)
+            goto done;
+    }
+
+    in_play_cards = PyObject_GetAttr(d_deck, str_in_play_cards);
+    if (in_play_cards == NULL) {
+        Py_CLEAR(deal_card);
+        goto done;
+    }
+    if (PyList_CheckExact(in_play_cards))
+        result = PyList_Append(in_play_cards, deal_card);
+    else
+        result = call_method_one(in_play_cards, str_append, deal_card);
+    Py_DECREF(in_play_cards);
+
+    if (result == -1 || count_out_card(d_deck, deal_card) == -1)
+        Py_CLEAR(deal_card);
+
+done:
+    Py_DECREF(cards);
+    return deal_card;
+}
+
+/* Compares two cards like Card.__eq__, without calling it for plain cards */
+static int
+cards_equal(PyObject *item, PyObject *c_card, PyObject *rank, PyObject *suit)
+{
+    PyObject *item_rank, *item_suit;
+    int result;
+
+    if (item == c_card)
+        return 1;
+    if ((PyObject *)Py_TYPE(item) != card_type || (PyObject *)Py_TYPE(c_card) != card_type)
+        return PyObject_RichCompareBool(item, c_card, Py_EQ);
+
+    item_rank = PyObject_GetAttr(item, str_rank);
+    if (item_rank == NULL)
+        return -1;
+    result = PyObject_RichCompareBool(item_rank, rank, Py_EQ);
+    Py_DECREF(item_rank);
+    if (result != 1)
+        return result;
+
+    item_suit = PyObject_GetAttr(item, str_suit);
+    if (item_suit == NULL)
+        return -1;
+    result = PyObject_RichCompareBool(item_suit, suit, Py_EQ);
+    Py_DECREF(item_suit);
+    return result;
+}
+
+PyDoc_STRVAR(discard_doc, "See deck_of_cards.core.discard");
+
+static PyObject *
+discard(PyObject *self, PyObject *args)
+{
+    PyObject *d_deck, *c_card, *in_play_cards, *discarded_cards, *item;
+    PyObject *rank = NULL, *suit = NULL, *result = NULL;
+    Py_ssize_t i;
+    int found = 0, equal;
+
+    if (!PyArg_UnpackTuple(args, "discard", 2, 2, &d_deck, &c_card))
+        return NULL;
+
+    in_play_cards = PyObject_GetAttr(d_deck, str_in_play_cards);
+    if (in_play_cards == NULL)
+        return NULL;
+
+    if (PyList_CheckExact(in_play_cards)) {
+        if ((PyObject *)Py_TYPE(c_card) == card_type) {
+            rank = PyObject_GetAttr(c_card, str_rank);
+            suit = rank == NULL ? NULL : PyObject_GetAttr(c_card, str_suit);
+            if (suit == NULL)
+                goto done;
+        }
+        for (i = 0; i < PyList_GET_SIZE(in_play_cards); i++) {
+            item = PyList_GET_ITEM(in_play_cards, i);
+            Py_INCREF(item);
+            equal = cards_equal(item, c_card, rank, suit);
+            Py_DECREF(item);
+            if (equal == -1)
+                goto done;
+            if (equal) {
+                if (PyList_SetSlice(in_play_cards, i, i + 1, NULL) == -1)
+                    goto done;
+                found = 1;
+                break;
+            }
+        }
+    }
+    else if (call_method_one(in_play_cards, str_remove, c_card) == -1) {
+        if (!PyErr_ExceptionMatches(PyExc_ValueError))
+            goto done;
+        PyErr_Clear();
+    }
+    else {
+        found = 1;
+    }
+
+    if (!found) {
+        result = Py_False;
+        Py_INCREF(result);
+        goto done;
+    }
+
+    discarded_cards = PyObject_GetAttr(d_deck, str_discarded_cards);
+    if (discarded_cards == NULL)
+        goto done;
+    if (PyList_CheckExact(discarded_cards))
+        equal = PyList_Append(discarded_cards, c_card);
+    else
+        equal = call_method_one(discarded_cards, str_append, c_card);
+    Py_DECREF(discarded_cards);
+    if (equal == -1)
+        goto done;
+    result = Py_True;
+    Py_INCREF(result);
+
+done:
+    Py_DECREF(in_play_cards);
+    Py_XDECREF(rank);
+    Py_XDECREF(suit);
+    return result;
+}
+
+static PyMethodDef core_methods[] = {
+    {"pile_codes", (PyCFunction)pile_codes, METH_O, pile_codes_doc},
+    {"count_cards", (PyCFunction)count_cards, METH_O, count_cards_doc},
+    {"count_out", (PyCFunction)count_out, METH_VARARGS, count_out_doc},
+    {"bad_codes", (PyCFunction)bad_codes, METH_O, bad_codes_doc},
+    {"partial_shuffle", (PyCFunction)partial_shuffle, METH_VARARGS | METH_KEYWORDS,
+     partial_shuffle_doc},
+    {"deal", (PyCFunction)deal, METH_VARARGS, deal_doc},
+    {"discard", (PyCFunction)discard, METH_VARARGS, discard_doc},
+    {NULL, NULL, 0, NULL}
+};
+
+PyDoc_STRVAR(core_doc, "C implementation of deck_of_cards.core");
+
+/* Reads the card tables from deck_of_cards.card */
+static int
+load_card_tables(void)
+{
+    PyObject *card_module, *rank_suit_by_code, *pair, *object;
+    Py_ssize_t code, i, suit_index;
+    int result = -1;
+
+    card_module = PyImport_ImportModule("deck_of_cards.card");
+    if (card_module == NULL)
+        return -1;
+    rank_suit_by_code = PyObject_GetAttrString(card_module, "_RANK_SUIT_BY_CODE");
+    if (rank_suit_by_code == NULL)
+        goto done;
+
+    card_type = PyObject_GetAttrString(card_module, "Card");
+    code_by_rank_suit = PyObject_GetAttrString(card_module, "_CODE_BY_RANK_SUIT");
+    if (card_type == NULL || code_by_rank_suit == NULL)
+        goto done;
+
+    object = PyObject_GetAttrString(card_module, "JOKER_CODE");
+    if (object == NULL)
+        goto done;
+    joker_code = PyNumber_AsSsize_t(object, NULL);
+    Py_DECREF(object);
+
+    object = PyObject_GetAttrString(card_module, "POSSIBLE_RANK");
+    if (object == NULL)
+        goto done;
+    number_of_ranks = 1 + PyObject_Size(object);
+    Py_DECREF(object);
+
+    /* the suits in the order of core._SUITS, the joker suit last */
+    object = PyObject_GetAttrString(card_module, "POSSIBLE_SUIT");
+    if (object == NULL)
+        goto done;
+    suits = PySequence_List(object);
+    Py_DECREF(object);
+    if (suits == NULL)
+        goto done;
+    object = PyObject_GetAttrString(card_module, "JOKER_SUIT");
+    if (object == NULL || PyList_Append(suits, object) == -1) {
+        Py_XDECREF(object);
+        goto done;
+    }
+    Py_DECREF(object);
+
+    number_of_codes = PyObject_Size(rank_suit_by_code);
+    if (PyErr_Occurred())
+        goto done;
+    if (number_of_codes > MAX_CODES || number_of_ranks > MAX_CODES
+            || PyList_GET_SIZE(suits) > MAX_SUITS) {
+        PyErr_SetString(PyExc_ImportError, "too many card codes for the C core");
+        goto done;
+    }
+
+    for (suit_index = 0; suit_index < MAX_SUITS; suit_index++)
+        for (i = 0; i < MAX_CODES; i++)
+            code_of_suit_rank[suit_index][i] = -1;
+
+    for (code = 0; code < number_of_codes; code++) {
+        pair = PySequence_GetItem(rank_suit_by_code, code);
+        if (pair == NULL)
+            goto done;
+        object = PySequence_GetItem(pair, 0);
+        rank_of_code[code] = object == NULL ? -1 : PyNumber_AsSsize_t(object, NULL);
+        Py_XDECREF(object);
+        object = PySequence_GetItem(pair, 1);
+        Py_DECREF(pair);
+        if (object == NULL || PyErr_Occurred()) {
+            Py_XDECREF(object);
+            goto done;
+        }
+        suit_index = -1;
+        for (i = 0; i < PyList_GET_SIZE(suits); i++) {
+            if (PyObject_RichCompareBool(object, PyList_GET_ITEM(suits, i), Py_EQ) == 1) {
+                suit_index = i;
+                break;
+            }
+        }
+        Py_DECREF(object);
+        if (suit_index == -1 || rank_of_code[code] < 0 || rank_of_code[code] >= number_of_ranks) {
+            PyErr_SetString(PyExc_ImportError, "unexpected card tables for the C core");
+            goto done;
+        }
+        suit_of_code[code] = suit_index;
+        code_of_suit_rank[suit_index][rank_of_code[code]] = code;
+    }
+    result = 0;
+
+done:
+    Py_DECREF(card_module);
+    Py_XDECREF(rank_suit_by_code);
+    return result;
+}
+
+static int
+load_core(void)
+{
+    str_rank = String_InternFromString("_rank");
+    str_suit = String_InternFromString("_suit");
+    str_cards = String_InternFromString("_cards");
+    str_in_play_cards = String_InternFromString("_in_play_cards");
+    str_discarded_cards = String_InternFromString("_discarded_cards");
+    str_code_counts = String_InternFromString("_code_counts");
+    str_rank_counts = String_InternFromString("_rank_counts");
+    str_suit_counts = String_InternFromString("_suit_counts");
+    str_randrange = String_InternFromString("randrange");
+    str_random = String_InternFromString("random");
+    str_shuffle = String_InternFromString("shuffle");
+    str_pop = String_InternFromString("pop");
+    str_append = String_InternFromString("append");
+    str_remove = String_InternFromString("remove");
+    if (str_rank == NULL || str_suit == NULL || str_cards == NULL
+            || str_in_play_cards == NULL || str_discarded_cards == NULL
+            || str_code_counts == NULL || str_rank_counts == NULL
+            || str_suit_counts == NULL || str_randrange == NULL
+            || str_random == NULL || str_shuffle == NULL || str_pop == NULL
+            || str_append == NULL || str_remove == NULL)
+        return -1;
+
+    random_module = PyImport_ImportModule("random");
+    if (random_module == NULL)
+        return -1;
+    return load_card_tables();
+}
+
+#if PY_MAJOR_VERSION >= 3
+static struct PyModuleDef core_module = {
+    PyModuleDef_HEAD_INIT, "deck_of_cards._core", core_doc, -1, core_methods
+};
+
+PyMODINIT_FUNC
+PyInit__core(void)
+{
+    PyObject *module;
+
+    if (load_core() == -1)
+        return NULL;
+    module = PyModule_Create(&core_module);
+    if (module == NULL)
+        return NULL;
+    if (PyModule_AddStringConstant(module, "NAME", "c") == -1) {
+        Py_DECREF(module);
+        return NULL;
+    }
+    return module;
+}
+#else
+PyMODINIT_FUNC
+init_core(void)
+{
+    PyObject *module;
+
+    if (load_core() == -1)
+        return;
+    module = Py_InitModule3("deck_of_cards._core", core_methods, core_doc);
+    if (module == NULL)
+        return;
+    PyModule_AddStringConstant(module, "NAME", "c");
+}
+#endif
@@ -3,6 +3,9 @@
 This module also has 5 constant attributes that help validate or string format
 the :class:`Card` object: :attr:`POSSIBLE_SUIT`, :attr:`POSSIBLE_RANK`,
 , :attr:`JOKER_SUIT`, :attr:`JOKER_RANK`, and :attr:`RANK_TRANSLATION`
+
+Every card also has a small integer code (see :meth:`Card.get_code`) which
+fits in a byte, so whole decks can be stored and compared as byte strings.
 """
 
 #: an array with all the possible suit strings
@@ -25,6 +28,43 @@ RANK_TRANSLATION = {
     13 : 'king',
 }
 
+#: the code of a joker, see :meth:`Card.get_code`
+JOKER_CODE = 0
+
+#: the number of distinct card codes, the joker plus every normal card
+NUMBER_OF_CODES = 1 + len(POSSIBLE_SUIT) * len(POSSIBLE_RANK)
+
+#: an array of (rank, suit) pairs indexed by card code. The codes follow the
+#: order of a new :class:`deck_of_cards.deck.Deck`
+_RANK_SUIT_BY_CODE = [(JOKER_RANK, JOKER_SUIT)] + [(rank, suit)
+                                                    for suit in POSSIBLE_SUIT
+                                                    for rank in POSSIBLE_RANK]
+
+#: a dictionary which translates a (rank, suit) pair to its card code
+_CODE_BY_RANK_SUIT = dict((rank_suit, code)
+                          for code, rank_suit in enumerate(_RANK_SUIT_BY_CODE))
+
+#: a dictionary of every suit string to itself, so that all cards share the
+#: suit strings of this module instead of holding a lowercased copy each
+_SUIT_BY_NAME = dict((suit, suit) for suit in POSSIBLE_SUIT + [JOKER_SUIT])
+
+def from_code(code):
+    """Create a :class:`Card` from a code returned by :meth:`Card.get_code`
+
+    :param int code: a card code in [0, :attr:`NUMBER_OF_CODES`)
+    :returns: a new card
+    :rtype: :class:`Card`
+    :raises: ValueError
+    """
+    if not 0 <= code < NUMBER_OF_CODES:
+        raise ValueError("A new Card cannot be created. Code (%s) is not in"
+                         " [0, %d)." % (code, NUMBER_OF_CODES))
+
+    # the table only holds valid pairs, so skip the validation in __init__
+    new_card = Card.__new__(Card)
+    new_card._rank, new_card._suit = _RANK_SUIT_BY_CODE[code]
+    return new_card
+
 class Card(object):
     """A Card object
     """
@@ -43,8 +83,9 @@ class Card(object):
         :raises: ValueError
         """
 
-        # convert to lowercase
+        # convert to lowercase, and share the suit string of this module
         suit = suit.lower()
+        suit = _SUIT_BY_NAME.get(suit, suit)
 
         base_error_str = 'A new Card cannot be created.'
 
@@ -81,10 +122,10 @@ class Card(object):
         """
         if self.is_joker():
             return JOKER_SUIT.title()
-        elif self.get_rank() in RANK_TRANSLATION:
-            return RANK_TRANSLATION[self.get_rank()].title()
+        elif self._rank in RANK_TRANSLATION:
+            return RANK_TRANSLATION[self._rank].title()
         else:
-            return self.get_rank()
+            return self._rank
 
     def __repr__(self):
         """This method returns an unambigious string representation of the card object
@@ -92,7 +133,7 @@ class Card(object):
         :returns: unambigious string represenation of card object
         :rtype: str
         """
-        return "Card(_rank=%s, _suit=%s)" % (self.get_rank(), self.get_suit())
+        return "Card(_rank=%s, _suit=%s)" % (self._rank, self._suit)
 
     def __str__(self):
         """This method returns a nice string representation of the card object
@@ -127,7 +168,17 @@ class Card(object):
         :returns: True if joker
         :rtype: bool
         """
-        return (JOKER_RANK == self.get_rank()) and (JOKER_SUIT == self.get_suit())
+        return (JOKER_RANK == self._rank) and (JOKER_SUIT == self._suit)
+
+    def get_code(self):
+        """The card code is :attr:`JOKER_CODE` for a joker and
+        1 + (suit index * 13) + (rank - 1) for a normal card, with the suit
+        index taken from :attr:`POSSIBLE_SUIT`
+
+        :returns: the card code, in [0, :attr:`NUMBER_OF_CODES`)
+        :rtype: int
+        """
+        return _CODE_BY_RANK_SUIT[(self._rank, self._suit)]
 
     def __eq__(self, other):
         """Override equality method
@@ -136,11 +187,20 @@ class Card(object):
         :rtype: bool
         """
         if type(other) is type(self):
-            if (other.get_rank() == self.get_rank()) and (other.get_suit() == self.get_suit()):
+            if (other._rank == self._rank) and (other._suit == self._suit):
                 return True
 
         return False
 
+    def __hash__(self):
+        """Equal cards hash the same, so cards can be used in sets and as
+        dictionary keys
+
+        :returns: hash of :attr:`_rank` and :attr:`_suit`
+        :rtype: int
+        """
+        return hash((self._rank, self._suit))
+
     def __ne__(self, other):
         """Override inequality method
 
@@ -0,0 +1,202 @@
+#!/usr/bin/python
+"""This module provides the :class:`CardArray` object, which holds many cards
+as a NumPy array of card codes (see :meth:`deck_of_cards.card.Card.get_code`)
+and works on all of them at once.
+
+Ranks, suits, joker flags and display strings come from small tables indexed
+by card code, so no :class:`deck_of_cards.card.Card` object is created or
+called per card. This module needs :mod:`numpy`.
+"""
+
+import numpy
+
+import deck_of_cards.card as card
+
+#: suits in the order of the indices returned by :meth:`CardArray.get_suits`
+SUITS = card.POSSIBLE_SUIT + [card.JOKER_SUIT]
+
+#: the rank of every card code
+_RANK_BY_CODE = numpy.array([rank for rank, _ in card._RANK_SUIT_BY_CODE], dtype=numpy.uint8)
+
+#: the index in :attr:`SUITS` of the suit of every card code
+_SUIT_BY_CODE = numpy.array([SUITS.index(suit) for _, suit in card._RANK_SUIT_BY_CODE],
+                            dtype=numpy.uint8)
+
+#: the :meth:`deck_of_cards.card.Card.__str__` of every card code
+_DISPLAY_BY_CODE = numpy.array([str(card.from_code(code))
+                                for code in xrange(card.NUMBER_OF_CODES)])
+
+def _to_codes(cards):
+    """
+    :param cards: a :class:`CardArray`, a :class:`deck_of_cards.card.Card`
+                  or an iterable of cards
+    :returns: the card codes
+    :rtype: :class:`numpy.ndarray`
+    """
+    if isinstance(cards, CardArray):
+        return cards._codes
+    if isinstance(cards, card.Card):
+        cards = [cards]
+    return CardArray.from_cards(cards)._codes
+
+class CardArray(object):
+    """A CardArray object
+
+    Wraps a buffer of uint8 card codes. Indexing with an int gives a
+    :class:`deck_of_cards.card.Card`, and with a slice or a mask gives another
+    CardArray. ``==`` and ``!=`` compare card by card and return a boolean
+    mask.
+    """
+
+    #: a one dimensional uint8 :class:`numpy.ndarray` of card codes
+    _codes = None
+
+    def __init__(self, codes):
+        """The codes are not copied when they come from a buffer (like
+        :class:`bytes`, :class:`bytearray` or an :class:`array.array` of
+        typecode 'B') or a uint8 :class:`numpy.ndarray`.
+
+        Raises a ValueError when a code is not a card code, or when an array
+        of codes does not have an integer dtype.
+
+        :param codes: card codes
+        :raises: ValueError
+        """
+        if not isinstance(codes, numpy.ndarray):
+            codes = numpy.frombuffer(codes, dtype=numpy.uint8)
+        elif not numpy.issubdtype(codes.dtype, numpy.integer):
+            raise ValueError("A new CardArray cannot be created. Codes must be"
+                             " integers, not %s." % codes.dtype)
+
+        # check the codes before the cast, which would wrap 256 around to 0
+        if codes.size:
+            for code in (codes.min(), codes.max()):
+                if code < 0 or code >= card.NUMBER_OF_CODES:
+                    raise ValueError("A new CardArray cannot be created. Code (%s) is"
+                                     " not in [0, %d)." % (code, card.NUMBER_OF_CODES))
+
+        if numpy.uint8 != codes.dtype:
+            codes = codes.astype(numpy.uint8)
+        if 1 != codes.ndim:
+            codes = codes.reshape(-1)
+        self._codes = codes
+
+    @classmethod
+    def from_cards(cls, cards):
+        """
+        :param cards: an iterable of :class:`deck_of_cards.card.Card` objects
+        :returns: a new CardArray with the same cards
+        :rtype: :class:`CardArray`
+        """
+        code_by_rank_suit = card._CODE_BY_RANK_SUIT
+        return cls(numpy.array([code_by_rank_suit[(c_card._rank, c_card._suit)]
+                                for c_card in cards], dtype=numpy.uint8))
+
+    def to_cards(self):
+        """
+        :returns: a new :class:`deck_of_cards.card.Card` for every code
+        :rtype: list
+        """
+        from_code = card.from_code
+        return [from_code(code) for code in self._codes.tolist()]
+
+    def to_strings(self):
+        """
+        :returns: the human readable string of every card, see
+                  :meth:`deck_of_cards.card.Card.__str__`
+        :rtype: :class:`numpy.ndarray`
+        """
+        return _DISPLAY_BY_CODE[self._codes]
+
+    def get_codes(self):
+        """
+        :returns: the card codes, without a copy
+        :rtype: :class:`numpy.ndarray`
+        """
+        return self._codes
+
+    def get_ranks(self):
+        """
+        :returns: the rank of every card
+        :rtype: :class:`numpy.ndarray`
+        """
+        return _RANK_BY_CODE[self._codes]
+
+    def get_suits(self):
+        """
+        :returns: the index in :attr:`SUITS` of the suit of every card
+        :rtype: :class:`numpy.ndarray`
+        """
+        return _SUIT_BY_CODE[self._codes]
+
+    def is_joker(self):
+        """
+        :returns: a boolean mask which is True for jokers
+        :rtype: :class:`numpy.ndarray`
+        """
+        return card.JOKER_CODE == self._codes
+
+    def isin(self, cards):
+        """
+        :param cards: a :class:`CardArray`, a :class:`deck_of_cards.card.Card`
+                      or an iterable of cards
+        :returns: a boolean mask which is True for the cards found in `cards`
+        :rtype: :class:`numpy.ndarray`
+        """
+        found = numpy.zeros(card.NUMBER_OF_CODES, dtype=bool)
+        found[_to_codes(cards)] = True
+        return found[self._codes]
+
+    def __len__(self):
+        """
+        :returns: number of cards
+        :rtype: int
+        """
+        return len(self._codes)
+
+    def __getitem__(self, index):
+        """
+        :param index: an int, a slice or a boolean or int index array
+        :returns: a new :class:`deck_of_cards.card.Card` for an int, a
+                  CardArray otherwise
+        """
+        codes = self._codes[index]
+        if isinstance(codes, numpy.ndarray):
+            return CardArray(codes)
+        return card.from_code(int(codes))
+
+    def __eq__(self, other):
+        """Compare card by card with a :class:`deck_of_cards.card.Card`, or
+        with a CardArray or array of cards of the same length
+
+        Raises a ValueError when the lengths differ.
+
+        :returns: a boolean mask
+        :rtype: :class:`numpy.ndarray`
+        :raises: ValueError
+        """
+        if isinstance(other, card.Card):
+            return other.get_code() == self._codes
+
+        other_codes = _to_codes(other)
+        if len(other_codes) != len(self._codes):
+            raise ValueError("Cannot compare %d cards with %d cards."
+                             % (len(self._codes), len(other_codes)))
+        return other_codes == self._codes
+
+    def __ne__(self, other):
+        """
+        :returns: not :meth:`__eq__`, card by card
+        :rtype: :class:`numpy.ndarray`
+        """
+        return numpy.logical_not(self.__eq__(other))
+
+    #: a CardArray compares card by card, so it cannot be hashed
+    __hash__ = None
+
+    def __repr__(self):
+        """
+        :returns: unambigious string represenation of the card array
+        :rtype: str
+        """
+        return "CardArray(_codes=%s)" % self._codes.tolist()
@@ -0,0 +1,163 @@
+#!/usr/bin/python
+"""This module is the pure Python implementation of the core which
+:class:`deck_of_cards.deck.Deck` runs its hot paths on: card codes, shuffles,
+moving cards between piles and counting cards for the invariant checks.
+
+``deck_of_cards._core`` is an optional C implementation of the same functions
+with the same behaviour, built by ``python setup.py build_ext --inplace``.
+:mod:`deck_of_cards.deck` picks the backend with :func:`load_backend` when it
+is first imported. Set the ``DECK_OF_CARDS_BACKEND`` environment variable to
+``python`` or ``c`` to choose one, otherwise the C core is used when it was
+built.
+"""
+
+import os
+import random
+import sys
+
+import deck_of_cards.card as card
+
+#: the name of this backend
+NAME = 'python'
+
+#: the names of every backend, see :func:`load_backend`
+BACKENDS = ('c', 'python')
+
+#: the environment variable which selects the backend
+BACKEND_VARIABLE = 'DECK_OF_CARDS_BACKEND'
+
+#: a dictionary which translates a (rank, suit) pair to its card code
+_CODE_BY_RANK_SUIT = card._CODE_BY_RANK_SUIT
+
+#: the number of ranks, the joker rank included
+_NUMBER_OF_RANKS = 1 + len(card.POSSIBLE_RANK)
+
+#: every suit, the joker suit last
+_SUITS = card.POSSIBLE_SUIT + [card.JOKER_SUIT]
+
+def load_backend(name=None):
+    """Import a core backend
+
+    Raises a ValueError for an unknown name, and an ImportError when the C
+    core is asked for but was not built.
+
+    :param str name: a name in :attr:`BACKENDS`. Uses the
+                     :attr:`BACKEND_VARIABLE` environment variable if None, and
+                     the C core when it was built if that is not set either
+    :returns: the module implementing the core
+    :rtype: module
+    :raises: ValueError, ImportError
+    """
+    if name is None:
+        name = os.environ.get(BACKEND_VARIABLE) or None
+    if name is not None and name not in BACKENDS:
+        raise ValueError("Backend (%s) is not in %s." % (name, BACKENDS))
+
+    if name != 'python':
+        try:
+            import deck_of_cards._core as c_core
+            return c_core
+        except ImportError:
+            if name == 'c':
+                raise
+    return sys.modules[__name__]
+
+def pile_codes(cards):
+    """
+    :param list cards: :class:`deck_of_cards.card.Card` objects
+    :returns: the code of every card, see
+              :meth:`deck_of_cards.card.Card.get_code`
+    :rtype: list
+    """
+    return [_CODE_BY_RANK_SUIT[(c_card._rank, c_card._suit)] for c_card in cards]
+
+def count_cards(cards):
+    """
+    :param list cards: :class:`deck_of_cards.card.Card` objects
+    :returns: the counts of `cards` indexed by card code, the counts indexed
+              by rank and the counts by suit, see
+              :meth:`deck_of_cards.deck.Deck.remaining_count`
+    :rtype: tuple
+    """
+    code_counts = [0] * card.NUMBER_OF_CODES
+    rank_counts = [0] * _NUMBER_OF_RANKS
+    suit_counts = dict((suit, 0) for suit in _SUITS)
+    for c_card in cards:
+        rank = c_card._rank
+        suit = c_card._suit
+        code_counts[_CODE_BY_RANK_SUIT[(rank, suit)]] += 1
+        rank_counts[rank] += 1
+        suit_counts[suit] += 1
+    return code_counts, rank_counts, suit_counts
+
+def count_out(d_deck, c_card):
+    """Take a card which left the unused cards of `d_deck` out of its
+    remaining counts
+
+    :param d_deck: a :class:`deck_of_cards.deck.Deck`
+    :param c_card: the :class:`deck_of_cards.card.Card` which left
+    """
+    rank = c_card._rank
+    suit = c_card._suit
+    d_deck._code_counts[_CODE_BY_RANK_SUIT[(rank, suit)]] -= 1
+    d_deck._rank_counts[rank] -= 1
+    d_deck._suit_counts[suit] -= 1
+
+def bad_codes(codes):
+    """Find the codes which occur too often. Every card may occur once, and
+    the joker twice.
+
+    :param codes: an iterable of card codes
+    :returns: the codes which occur too often, in code order
+    :rtype: list
+    """
+    code_counts = [0] * card.NUMBER_OF_CODES
+    for code in codes:
+        code_counts[code] += 1
+
+    return [code for code, occurrences in enumerate(code_counts)
+            if occurrences > (2 if card.JOKER_CODE == code else 1)]
+
+def partial_shuffle(items, top_k=None, rng=None):
+    """See :func:`deck_of_cards.deck.partial_shuffle`
+    """
+    if top_k is None or top_k >= len(items) - 1:
+        if rng is None:
+            random.shuffle(items)
+            return
+        top_k = max(len(items) - 1, 0)
+
+    randrange = (rng or random).randrange
+    for i in xrange(len(items) - 1, len(items) - 1 - top_k, -1):
+        j = randrange(i + 1)
+        items[i], items[j] = items[j], items[i]
+
+def deal(d_deck, index):
+    """Move a card from the unused cards of `d_deck` to its dealt cards
+
+    :param d_deck: a :class:`deck_of_cards.deck.Deck`
+    :param int index: position of the card in the unused cards
+    :returns: the dealt card
+    :rtype: :class:`deck_of_cards.card.Card`
+    :raises: IndexError
+    """
+    deal_card = d_deck._cards.pop(index)
+    d_deck._in_play_cards.append(deal_card)
+    count_out(d_deck, deal_card)
+    return deal_card
+
+def discard(d_deck, c_card):
+    """Move the oldest dealt card equal to `c_card` from `d_deck` to its
+    discarded cards
+
+    :param d_deck: a :class:`deck_of_cards.deck.Deck`
+    :param c_card: a :class:`deck_of_cards.card.Card`
+    :returns: False if no dealt card is equal to `c_card`
+    :rtype: bool
+    """
+    try:
+        d_deck._in_play_cards.remove(c_card)
+    except ValueError:
+        return False
+    d_deck._discarded_cards.append(c_card)
+    return True
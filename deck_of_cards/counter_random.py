@@ -0,0 +1,84 @@
+#!/usr/bin/python
+"""This module provides the :class:`CounterRandom` object, a counter-based
+random number generator.
+
+The numbers for a (seed, index) pair are the SHA-256 digests of the pair and a
+block counter, so any index of a stream can be generated directly without
+generating the indexes before it, in any process and on any platform. This is
+what :meth:`deck_of_cards.deck.Deck.from_shuffle_index` uses to build the
+`index`-th shuffled deck of a simulation in constant time.
+"""
+
+import hashlib
+import struct
+
+#: a prefix which separates these digests from other uses of SHA-256
+_DOMAIN = b'deck_of_cards.counter_random'
+
+#: number of 64-bit words in a SHA-256 digest
+_WORDS_PER_BLOCK = 4
+
+#: one more than the largest word
+_WORD_RANGE = 1 << 64
+
+class CounterRandom(object):
+    """A CounterRandom object
+
+    Generates the random stream of a single (seed, index) pair. It provides
+    :meth:`randrange`, so it can stand in for the :mod:`random` module in
+    :func:`deck_of_cards.deck.partial_shuffle`.
+    """
+
+    #: a SHA-256 object which has already hashed the seed and index
+    _hash = None
+
+    #: number of blocks generated so far
+    _counter = 0
+
+    #: an array of unused 64-bit words from the current block
+    _words = []
+
+    def __init__(self, seed, index):
+        """
+        :param int seed: a non-negative stream seed
+        :param int index: a non-negative position in the stream
+        :raises: ValueError
+        """
+        if seed < 0 or index < 0:
+            raise ValueError("seed (%s) and index (%s) cannot be negative."
+                             % (seed, index))
+
+        key = ('%d:%d:' % (seed, index)).encode('ascii')
+        self._hash = hashlib.sha256(_DOMAIN + b':' + key)
+        self._counter = 0
+        self._words = []
+
+    def getrandbits64(self):
+        """
+        :returns: the next uniformly distributed 64-bit integer
+        :rtype: int
+        """
+        if not self._words:
+            block_hash = self._hash.copy()
+            block_hash.update(struct.pack('>Q', self._counter))
+            self._counter += 1
+            # pop() takes from the end, so reverse to use the words in order
+            self._words = list(reversed(struct.unpack('>4Q', block_hash.digest())))
+        return self._words.pop()
+
+    def randrange(self, stop):
+        """Rejection sampling keeps every value exactly equally likely
+
+        :param int stop: an integer in [1, 2 ** 64]
+        :returns: a uniformly distributed integer in [0, `stop`)
+        :rtype: int
+        :raises: ValueError
+        """
+        if not 0 < stop <= _WORD_RANGE:
+            raise ValueError("stop (%s) is not in [1, 2 ** 64]." % stop)
+
+        limit = _WORD_RANGE - _WORD_RANGE % stop
+        word = self.getrandbits64()
+        while word >= limit:
+            word = self.getrandbits64()
+        return word % stop
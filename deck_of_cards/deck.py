@@ -3,12 +3,32 @@
 """
 
 import deck_of_cards.card as card
+import deck_of_cards.core as core
+import deck_of_cards.counter_random as counter_random
+import deck_of_cards.lehmer as lehmer
 import random
 import logging
 
 #: a logger object
 LOGGER = logging.getLogger(__name__)
 
+#: the module which runs the hot paths, the C core when it was built, see
+#: :func:`deck_of_cards.core.load_backend`
+_core = core.load_backend()
+
+#: every rank, the joker rank first
+_RANKS = [card.JOKER_RANK] + list(card.POSSIBLE_RANK)
+
+#: every suit, the joker suit last
+_SUITS = card.POSSIBLE_SUIT + [card.JOKER_SUIT]
+
+#: a dictionary of with_jokers flag to the number of cards of every code, in
+#: code order, in a whole deck
+_DECK_CODE_COUNTS = {
+    True : [2] + [1] * (card.NUMBER_OF_CODES - 1),
+    False : [0] + [1] * (card.NUMBER_OF_CODES - 1),
+}
+
 class Deck(object):
     """A Deck object
 
@@ -32,6 +52,28 @@ class Deck(object):
     #: an array of :class:`deck_of_cards.card.Card` objects that have been dealt
     _in_play_cards = []
 
+    #: an array of the number of cards in :attr:`_cards` indexed by card
+    #: code, see :meth:`deck_of_cards.card.Card.get_code`
+    _code_counts = []
+
+    #: an array of the number of cards in :attr:`_cards` indexed by rank
+    _rank_counts = []
+
+    #: a dictionary of suit to its number of cards in :attr:`_cards`
+    _suit_counts = {}
+
+    #: a boolean which is True after a lazy :meth:`shuffle`. The order of
+    #: :attr:`_cards` is then meaningless and :meth:`deal` draws a random card
+    _lazy_shuffle = False
+
+    #: a tuple of objects which are told about every change to the deck, see
+    #: :meth:`add_listener`
+    _listeners = ()
+
+    #: a :class:`deck_of_cards.metrics.DeckMetrics` object which collects
+    #: operation stats, None when instrumentation is disabled
+    _metrics = None
+
     def __init__(self, with_jokers=True):
         """
         :param bool with_jokers: include jokers if True
@@ -52,6 +94,62 @@ class Deck(object):
             for rank in card.POSSIBLE_RANK:
                 self._cards.append(card.Card(rank, suit))
 
+        self._recount()
+
+    @classmethod
+    def from_shuffle_index(cls, seed, index, with_jokers=True):
+        """Create the `index`-th shuffled deck of the stream `seed`
+
+        The order only depends on `seed` and `index` (see
+        :class:`deck_of_cards.counter_random.CounterRandom`), so any deck of a
+        simulation can be rebuilt on its own, and processes can split a
+        simulation by index ranges without sharing any random state.
+
+        :param int seed: a non-negative stream seed
+        :param int index: a non-negative position in the stream
+        :param bool with_jokers: include jokers if True
+        :returns: a new deck with :attr:`_cards` shuffled
+        :rtype: :class:`Deck`
+        :raises: ValueError
+        """
+        new_deck = cls(with_jokers)
+        partial_shuffle(new_deck._cards, rng=counter_random.CounterRandom(seed, index))
+        return new_deck
+
+    @classmethod
+    def from_order_rank(cls, rank, with_jokers=True):
+        """Create a deck whose :attr:`_cards` are in the order with the rank
+        `rank`, see :meth:`order_rank`
+
+        :param int rank: a rank in [0, n!) for a deck of n cards
+        :param bool with_jokers: include jokers if True
+        :returns: a new deck
+        :rtype: :class:`Deck`
+        :raises: ValueError
+        """
+        new_deck = cls(with_jokers)
+        items = lehmer.unrank(rank, len(new_deck._cards))
+        new_deck._cards = [card.from_code(code)
+                           for code in lehmer.items_to_codes(items, with_jokers)]
+        new_deck._recount()
+        return new_deck
+
+    def order_rank(self):
+        """Rank the order of :attr:`_cards` among all the orders of a deck, see
+        :mod:`deck_of_cards.lehmer`. A new deck has the rank 0.
+
+        Raises a ValueError when cards have been dealt.
+
+        :returns: the rank, in [0, n!) for a deck of n cards
+        :rtype: int
+        :raises: ValueError
+        """
+        if self._in_play_cards or self._discarded_cards:
+            raise ValueError('Only a deck with every card in _cards has an order rank.')
+
+        codes = _core.pile_codes(self._cards)
+        return lehmer.rank(lehmer.codes_to_items(codes))
+
     def __repr__(self):
         """
         :returns: unambigious string represenation of deck object
@@ -102,11 +200,44 @@ class Deck(object):
 
         return str_str
 
-    def shuffle(self):
+    def shuffle(self, top_k=None, lazy=False):
         """Shuffle the unused set of cards in :attr:`_cards`
+
+        With `top_k`, only the next `top_k` cards to be dealt are randomized,
+        which takes `top_k` random numbers instead of one per card. Those cards
+        are the same as the top cards of a full shuffle from the same random
+        state.
+
+        With `lazy`, nothing is moved now and every following :meth:`deal`
+        draws uniformly from the remaining cards instead.
+
+        Raises a ValueError when `top_k` is negative or combined with `lazy`.
+
+        :param int top_k: number of cards at the top of the deck to randomize
+        :param bool lazy: shuffle on demand while dealing if True
+        :raises: ValueError
+        """
+        if self._metrics is not None:
+            return self._metrics.observe('shuffle', self._shuffle, top_k, lazy)
+        return self._shuffle(top_k, lazy)
+
+    def _shuffle(self, top_k=None, lazy=False):
+        """Uninstrumented implementation of :meth:`shuffle`
         """
-        LOGGER.debug("Shuffling deck")
-        random.shuffle(self._cards)
+        if top_k is not None:
+            if lazy:
+                raise ValueError('A shuffle cannot be both lazy and partial.')
+            if top_k < 0:
+                raise ValueError("top_k (%s) cannot be negative." % top_k)
+
+        LOGGER.debug("Shuffling deck (top_k:%s, lazy:%s)", top_k, lazy)
+
+        self._lazy_shuffle = lazy
+        if not lazy:
+            partial_shuffle(self._cards, top_k)
+
+        for listener in self._listeners:
+            listener.deck_shuffled(self)
 
     def deal(self):
         """Deals a single :class:`deck_of_cards.card.Card` from :attr:`_cards`
@@ -117,18 +248,33 @@ class Deck(object):
         :rtype: :class:`deck_of_cards.card.Card`
         :raises: IndexError
         """
+        if self._metrics is not None:
+            return self._metrics.observe('deal', self._deal)
+        return self._deal()
+
+    def _deal(self):
+        """Uninstrumented implementation of :meth:`deal`
+        """
         LOGGER.debug("Number of cards left : %d", len(self._cards))
 
-        try:
-            # deal the last card from the unused _cards array
-            deal_card = self._cards.pop()
-        except IndexError:
+        if not self._cards:
             raise IndexError('Trying to deal from an empty deck.')
 
-        # add the newly dealt card to the _in_play_cards array
-        self._in_play_cards.append(deal_card)
+        if self._lazy_shuffle:
+            # draw a random card from the lazily shuffled _cards array
+            index = random.randrange(len(self._cards))
+        else:
+            # deal the last card from the unused _cards array
+            index = -1
+
+        # move the card to the _in_play_cards array
+        deal_card = _core.deal(self, index)
 
         LOGGER.info("Dealing : %s", deal_card)
+
+        for listener in self._listeners:
+            listener.deck_dealt(self, deal_card)
+
         return deal_card
 
     def discard(self, cards):
@@ -142,16 +288,181 @@ class Deck(object):
                             or a single :class:`deck_of_cards.card.Card`
         :raises: ValueError
         """
+        if self._metrics is not None:
+            return self._metrics.observe('discard', self._discard, cards)
+        return self._discard(cards)
+
+    def _discard(self, cards):
+        """Uninstrumented implementation of :meth:`discard`
+        """
         if not isinstance(cards, list):
             cards = [cards]
 
         for discard_card in cards:
-            try:
-                self._in_play_cards.remove(discard_card)
-                LOGGER.info("Discarding %s", discard_card)
-            except ValueError:
+            if not _core.discard(self, discard_card):
                 raise ValueError("%s not found in self._in_play_cards" % discard_card)
-            self._discarded_cards.append(discard_card)
+            LOGGER.info("Discarding %s", discard_card)
+
+            for listener in self._listeners:
+                listener.deck_discarded(self, discard_card)
+
+    def add_listener(self, listener):
+        """Tell `listener` about every change to this deck. After each
+        operation the deck calls one of these methods of the listener:
+
+        * ``deck_dealt(deck, card)`` after a card was dealt
+        * ``deck_discarded(deck, card)`` after each discarded card
+        * ``deck_shuffled(deck)`` after a shuffle
+
+        :param listener: an object with the three methods above
+        """
+        self._listeners = self._listeners + (listener,)
+
+    def remove_listener(self, listener):
+        """Stop telling `listener` about changes to this deck
+
+        Raises a ValueError when `listener` was not added.
+
+        :param listener: an object passed to :meth:`add_listener`
+        :raises: ValueError
+        """
+        listeners = list(self._listeners)
+        listeners.remove(listener)
+        self._listeners = tuple(listeners)
+
+    def remaining_count(self, rank=None, suit=None):
+        """Count the cards left in :attr:`_cards` with the given rank and/or
+        suit, or all of them if both are None. Takes constant time, the
+        counts are kept up to date by :meth:`deal`.
+
+        Raises a ValueError for an unknown rank or suit, or a rank and suit no
+        card has.
+
+        :param int rank: a rank in :attr:`deck_of_cards.card.POSSIBLE_RANK`
+                         or :attr:`deck_of_cards.card.JOKER_RANK`
+        :param str suit: a case-independent string in
+                         :attr:`deck_of_cards.card.POSSIBLE_SUIT` or
+                         :attr:`deck_of_cards.card.JOKER_SUIT`
+        :returns: number of matching cards waiting to be dealt
+        :rtype: int
+        :raises: ValueError
+        """
+        if suit is not None:
+            suit = suit.lower()
+            if suit not in _SUITS:
+                raise ValueError("Suit ('%s') is not in %s." % (suit, _SUITS))
+        if rank is not None and rank not in _RANKS:
+            raise ValueError("Rank (%s) is not in %s." % (rank, _RANKS))
+
+        if rank is None:
+            if suit is None:
+                return len(self._cards)
+            return self._suit_counts[suit]
+        if suit is None:
+            return self._rank_counts[rank]
+
+        if (rank, suit) not in card._CODE_BY_RANK_SUIT:
+            raise ValueError("No card has the rank %s and the suit '%s'." % (rank, suit))
+        return self._code_counts[card._CODE_BY_RANK_SUIT[(rank, suit)]]
+
+    def remaining_by_rank(self):
+        """
+        :returns: a dictionary of rank to the number of cards with that rank
+                  left in :attr:`_cards`. The joker rank is only included for
+                  a deck with jokers.
+        :rtype: dict
+        """
+        rank_counts = self._rank_counts
+        by_rank = dict((rank, rank_counts[rank]) for rank in card.POSSIBLE_RANK)
+        if self._with_jokers:
+            by_rank[card.JOKER_RANK] = rank_counts[card.JOKER_RANK]
+        return by_rank
+
+    def remaining_by_suit(self):
+        """
+        :returns: a dictionary of suit to the number of cards with that suit
+                  left in :attr:`_cards`. The joker suit is only included for
+                  a deck with jokers.
+        :rtype: dict
+        """
+        by_suit = dict(self._suit_counts)
+        if not self._with_jokers:
+            del by_suit[card.JOKER_SUIT]
+        return by_suit
+
+    def _recount(self):
+        """Rebuild the counts behind :meth:`remaining_count` from
+        :attr:`_cards`, after the pile was replaced as a whole
+        """
+        self._code_counts, self._rank_counts, self._suit_counts = _core.count_cards(self._cards)
+
+    def _count_out(self, c_card):
+        """Take a card which left :attr:`_cards` out of the counts behind
+        :meth:`remaining_count`
+
+        :param c_card: the :class:`deck_of_cards.card.Card` which left
+        """
+        _core.count_out(self, c_card)
+
+    def sample_consistent(self, known, n, rng=None, as_codes=False):
+        """Sample `n` random orders of the cards which are not known, for
+        simulations where some cards of a deck like this one have been seen
+
+        The hidden cards are a whole deck minus every card in `known`. They
+        are found once with a count per card code, so each sample only costs
+        a shuffle. Each sample is a pile like :attr:`_cards`, the last card is
+        dealt first.
+
+        With `as_codes`, the samples are returned as a
+        :class:`numpy.ndarray` of card codes with one row per sample, made by
+        sorting a matrix of random numbers in one NumPy call.
+
+        Raises a ValueError when `n` is negative, or a known card is not in
+        the deck or known too many times.
+
+        :param dict known: a dictionary of position or player to the
+                           :class:`deck_of_cards.card.Card` or array of
+                           cards seen there. Only the cards are used.
+        :param int n: number of samples
+        :param rng: an object with a `randrange` method, or a
+                    :class:`numpy.random.RandomState` with `as_codes`. Uses
+                    the :mod:`random` module (or :mod:`numpy.random`) if None
+        :param bool as_codes: return a code matrix instead of
+                              :class:`deck_of_cards.card.Card` arrays if True
+        :returns: `n` arrays of :class:`deck_of_cards.card.Card` objects, or
+                  an (`n`, number of hidden cards) uint8 matrix of card codes
+        :rtype: list or :class:`numpy.ndarray`
+        :raises: ValueError
+        """
+        if n < 0:
+            raise ValueError("The number of samples (%s) cannot be negative." % n)
+
+        code_counts = list(_DECK_CODE_COUNTS[bool(self._with_jokers)])
+        for cards in known.values():
+            if not isinstance(cards, list):
+                cards = [cards]
+            for known_card in cards:
+                code = known_card.get_code()
+                if not code_counts[code]:
+                    raise ValueError("%s is not in the deck or known too many times." % known_card)
+                code_counts[code] -= 1
+
+        hidden_codes = [code for code, count in enumerate(code_counts) for _ in xrange(count)]
+
+        if as_codes:
+            import numpy
+            if rng is None:
+                rng = numpy.random
+            order = numpy.argsort(rng.random_sample((n, len(hidden_codes))), axis=1)
+            return numpy.array(hidden_codes, dtype=numpy.uint8)[order]
+
+        hidden_cards = [card.from_code(code) for code in hidden_codes]
+        samples = []
+        for _ in xrange(n):
+            sample = list(hidden_cards)
+            partial_shuffle(sample, rng=rng)
+            samples.append(sample)
+        return samples
 
     def is_empty(self):
         """This method returns true if the deck(:attr:`_cards`) is empty
@@ -167,6 +478,13 @@ class Deck(object):
         :returns: True if all cards are accounted
         :rtype: bool
         """
+        if self._metrics is not None:
+            return self._metrics.observe('check_deck', self._check_deck)
+        return self._check_deck()
+
+    def _check_deck(self):
+        """Uninstrumented implementation of :meth:`check_deck`
+        """
 
         # start with a simple card count check
         total_possible_cards = (13*4) + (2 if self._with_jokers else 0)
@@ -175,34 +493,46 @@ class Deck(object):
                                     + len(self._discarded_cards)):
             return False
 
-        return_value = True
-
-        # go through all piles of cards and create a dictionary with
-        # [suit][rank] = number of occurrences of card
-        card_dict = {}
-        for pile in [self._cards, self._in_play_cards, self._discarded_cards]:
-            for c_card in pile:
-                suit = c_card.get_suit()
-                rank = c_card.get_rank()
-
-                if not suit in card_dict:
-                    card_dict[suit] = {}
-
-                if not rank in card_dict[suit]:
-                    card_dict[suit][rank] = 1
-                else:
-                    card_dict[suit][rank] += 1
-
-        # go through generated card_dictionary to make sure that there are the
-        # appropriate rank of occurrences for each card
-        for suit in card_dict.keys():
-            for rank in card_dict[suit].keys():
-                if 2 == card_dict[suit][rank]:
-                    # check for 2 jokers
-                    if not (card.JOKER_SUIT == suit and card.JOKER_RANK == rank):
-                        return_value = False
-                elif 1 != card_dict[suit][rank]:
-                    LOGGER.info("Something is wrong with the %s", card.Card(rank, suit))
-                    return_value = False
-
-        return return_value
+        codes = (_core.pile_codes(self._cards)
+                 + _core.pile_codes(self._in_play_cards)
+                 + _core.pile_codes(self._discarded_cards))
+        if not check_codes(codes, self._with_jokers):
+            return False
+
+        # the remaining counts must match the unused cards
+        counts = (self._code_counts, self._rank_counts, self._suit_counts)
+        if counts != _core.count_cards(self._cards):
+            LOGGER.info("The remaining counts do not match self._cards")
+            return False
+
+        return True
+
+def partial_shuffle(items, top_k=None, rng=None):
+    """Randomize the last `top_k` positions of `items` in place with the first
+    `top_k` steps of a Fisher-Yates shuffle. Those positions end up exactly as
+    :func:`random.shuffle` would leave them from the same random state.
+
+    :param list items: the list to shuffle, its end is the top of a deck
+    :param int top_k: number of positions to randomize, all of them if None
+    :param rng: an object with a `randrange` method, like
+                :class:`deck_of_cards.counter_random.CounterRandom`. Uses the
+                :mod:`random` module if None
+    """
+    _core.partial_shuffle(items, top_k, rng)
+
+def check_codes(codes, with_jokers=True):
+    """Check that `codes` hold as many cards as a deck, and that every card
+    occurs at most once except the joker, which may occur twice
+
+    :param list codes: card codes, see :meth:`deck_of_cards.card.Card.get_code`
+    :param bool with_jokers: expect the cards of a deck with jokers if True
+    :returns: True if all cards are accounted
+    :rtype: bool
+    """
+    if len(codes) != sum(_DECK_CODE_COUNTS[bool(with_jokers)]):
+        return False
+
+    bad_codes = _core.bad_codes(codes)
+    for code in bad_codes:
+        LOGGER.info("Something is wrong with the %s", card.from_code(code))
+    return not bad_codes
@@ -0,0 +1,377 @@
+#!/usr/bin/python
+"""This module tests that a shuffle produces uniform deck orders, by counting
+the cards of many shuffled decks and comparing the counts with the counts of
+a perfect shuffle.
+
+Two tables of counts are kept in a :class:`FairnessCounts` object:
+
+* the number of times each card code lands on each position
+* the number of times each card code directly follows each other card code
+
+:func:`run` shuffles decks in chunks with a backend from :attr:`BACKENDS` (or
+any module-level function with the same arguments), counts them in worker
+processes and adds up the counts. It can save its progress to a checkpoint
+file and resume from it. :meth:`FairnessCounts.report` turns the counts into
+chi-square statistics. This module needs :mod:`numpy`.
+
+A cell of either table counts at most one card per shuffle, so a cell with
+probability p per shuffle contributes 1 - p to the mean of its chi-square
+statistic. The degrees of freedom are set to that mean, and p-values use the
+Wilson-Hilferty approximation.
+"""
+
+import math
+import multiprocessing
+import os
+import random
+
+import numpy
+
+import deck_of_cards.card as card
+import deck_of_cards.deck as deck
+
+def _deck_size(with_jokers):
+    """
+    :param bool with_jokers: include jokers if True
+    :returns: number of cards in a deck
+    :rtype: int
+    """
+    return sum(deck._DECK_CODE_COUNTS[bool(with_jokers)])
+
+def deck_backend(seed, start, count, with_jokers):
+    """Shuffle new decks with :meth:`deck_of_cards.deck.Deck.shuffle`, seeding
+    the :mod:`random` module from `seed` and `start` and restoring its state
+    afterwards
+
+    :param int seed: a non-negative seed of the run
+    :param int start: index of the first shuffle
+    :param int count: number of shuffles
+    :param bool with_jokers: include jokers if True
+    :returns: a (`count`, deck size) uint8 matrix of card codes, the last
+              column is the top of the deck
+    :rtype: :class:`numpy.ndarray`
+    """
+    # the state of the random module is put back, so a run in this process
+    # does not change the random numbers of the caller
+    state = random.getstate()
+    random.seed((seed << 32) + start)
+    try:
+        code_by_rank_suit = card._CODE_BY_RANK_SUIT
+        codes = bytearray()
+        for _ in xrange(count):
+            d_deck = deck.Deck(with_jokers)
+            d_deck.shuffle()
+            codes.extend(code_by_rank_suit[(c_card._rank, c_card._suit)]
+                         for c_card in d_deck._cards)
+    finally:
+        random.setstate(state)
+    return numpy.frombuffer(codes, dtype=numpy.uint8).reshape(count, _deck_size(with_jokers))
+
+def shuffle_index_backend(seed, start, count, with_jokers):
+    """Build decks with :meth:`deck_of_cards.deck.Deck.from_shuffle_index`,
+    see :func:`deck_backend`
+    """
+    code_by_rank_suit = card._CODE_BY_RANK_SUIT
+    codes = bytearray()
+    for index in xrange(start, start + count):
+        d_deck = deck.Deck.from_shuffle_index(seed, index, with_jokers)
+        codes.extend(code_by_rank_suit[(c_card._rank, c_card._suit)] for c_card in d_deck._cards)
+    return numpy.frombuffer(codes, dtype=numpy.uint8).reshape(count, _deck_size(with_jokers))
+
+def numpy_backend(seed, start, count, with_jokers):
+    """Sort random numbers with :meth:`deck_of_cards.deck.Deck.sample_consistent`,
+    see :func:`deck_backend`
+    """
+    rng = numpy.random.RandomState([seed, start])
+    return deck.Deck(with_jokers).sample_consistent({}, count, rng, as_codes=True)
+
+#: a dictionary of backend name to backend function
+BACKENDS = {
+    'deck' : deck_backend,
+    'shuffle_index' : shuffle_index_backend,
+    'numpy' : numpy_backend,
+}
+
+def _upper_tail(chi_square, degrees_of_freedom):
+    """
+    :param float chi_square: a chi-square statistic
+    :param float degrees_of_freedom: its degrees of freedom
+    :returns: the Wilson-Hilferty approximation of the probability of a
+              statistic at least as large
+    :rtype: float
+    """
+    variance = 2.0 / (9 * degrees_of_freedom)
+    z = ((chi_square / degrees_of_freedom) ** (1.0 / 3) - (1 - variance)) / math.sqrt(variance)
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+def _test(observed, probabilities, shuffles):
+    """Compare a table of counts with the probabilities of its cells
+
+    :param observed: a :class:`numpy.ndarray` of counts
+    :param probabilities: the probability per shuffle of each cell
+    :param int shuffles: number of shuffles counted
+    :returns: the statistics, see :meth:`FairnessCounts.report`
+    :rtype: dict
+    """
+    possible = probabilities > 0
+    expected = shuffles * probabilities[possible]
+    difference = observed[possible] - expected
+    chi_square = float((difference ** 2 / expected).sum())
+    degrees_of_freedom = float((1 - probabilities[possible]).sum())
+
+    # standardized residuals, each cell is a binomial count
+    z = numpy.zeros(observed.shape)
+    z[possible] = difference / numpy.sqrt(expected * (1 - probabilities[possible]))
+    cell = numpy.unravel_index(numpy.abs(z).argmax(), z.shape)
+    max_z = float(z[cell])
+
+    return {
+        'chi_square' : chi_square,
+        'degrees_of_freedom' : degrees_of_freedom,
+        'p_value' : _upper_tail(chi_square, degrees_of_freedom),
+        'max_z' : max_z,
+        'max_z_cell' : tuple(int(index) for index in cell),
+        'max_z_p_value' : min(1.0, int(possible.sum()) * math.erfc(abs(max_z) / math.sqrt(2))),
+    }
+
+class FairnessCounts(object):
+    """A FairnessCounts object
+
+    Accumulates the position and adjacency counts of shuffled decks.
+    """
+
+    #: a boolean which is True for decks with jokers
+    _with_jokers = True
+
+    #: number of shuffles counted
+    _shuffles = 0
+
+    #: a (deck size, :attr:`deck_of_cards.card.NUMBER_OF_CODES`) matrix of
+    #: the number of times each code was at each position
+    _positions = None
+
+    #: a (:attr:`deck_of_cards.card.NUMBER_OF_CODES`,
+    #: :attr:`deck_of_cards.card.NUMBER_OF_CODES`) matrix of the number of
+    #: times the second code directly followed the first one
+    _pairs = None
+
+    def __init__(self, with_jokers=True):
+        """
+        :param bool with_jokers: count decks with jokers if True
+        """
+        self._with_jokers = bool(with_jokers)
+        self._shuffles = 0
+        self._positions = numpy.zeros((_deck_size(with_jokers), card.NUMBER_OF_CODES),
+                                      dtype=numpy.int64)
+        self._pairs = numpy.zeros((card.NUMBER_OF_CODES, card.NUMBER_OF_CODES),
+                                  dtype=numpy.int64)
+
+    def add(self, codes):
+        """Count shuffled decks
+
+        Raises a ValueError when the rows are not as long as a deck.
+
+        :param codes: a (shuffles, deck size) matrix of card codes, as returned
+                      by the backends
+        :raises: ValueError
+        """
+        codes = numpy.asarray(codes, dtype=numpy.intp)
+        shuffles, size = codes.shape
+        if size != len(self._positions):
+            raise ValueError("A deck has %d cards, not %d." % (len(self._positions), size))
+
+        cells = numpy.arange(size) * card.NUMBER_OF_CODES + codes
+        self._positions += numpy.bincount(cells.ravel(), minlength=self._positions.size
+                                          ).reshape(self._positions.shape)
+        pairs = codes[:, :-1] * card.NUMBER_OF_CODES + codes[:, 1:]
+        self._pairs += numpy.bincount(pairs.ravel(), minlength=self._pairs.size
+                                      ).reshape(self._pairs.shape)
+        self._shuffles += shuffles
+
+    def merge(self, other):
+        """Add the counts of another FairnessCounts object
+
+        :param other: a :class:`FairnessCounts` of decks of the same size
+        :raises: ValueError
+        """
+        if other._with_jokers != self._with_jokers:
+            raise ValueError('Cannot merge counts of decks with and without jokers.')
+        self._positions += other._positions
+        self._pairs += other._pairs
+        self._shuffles += other._shuffles
+
+    def get_shuffles(self):
+        """
+        :returns: number of shuffles counted
+        :rtype: int
+        """
+        return self._shuffles
+
+    def report(self):
+        """Compare the counts with the counts expected from uniform shuffles
+
+        Both the ``'position'`` and the ``'adjacency'`` tests are a
+        dictionary with the keys:
+
+        * ``'chi_square'``, the chi-square statistic over every possible cell
+        * ``'degrees_of_freedom'``, the mean of the statistic
+        * ``'p_value'``, the probability of a larger statistic
+        * ``'max_z'``, the standardized residual furthest from 0
+        * ``'max_z_cell'``, the (position or first code, code) of that cell
+        * ``'max_z_p_value'``, its Bonferroni corrected two-sided p-value
+
+        Raises a ValueError when nothing was counted.
+
+        :returns: a dictionary with the number of ``'shuffles'`` and the
+                  ``'position'`` and ``'adjacency'`` tests
+        :rtype: dict
+        :raises: ValueError
+        """
+        if not self._shuffles:
+            raise ValueError('No shuffles were counted.')
+
+        code_counts = numpy.array(deck._DECK_CODE_COUNTS[self._with_jokers], dtype=float)
+        size = code_counts.sum()
+
+        # every position holds a code with probability count / size, and a
+        # code follows another one at one of the size - 1 positions
+        position_probabilities = numpy.tile(code_counts / size, (len(self._positions), 1))
+        pair_probabilities = (numpy.outer(code_counts, code_counts)
+                              - numpy.diag(code_counts)) / size
+
+        return {
+            'shuffles' : self._shuffles,
+            'position' : _test(self._positions, position_probabilities, self._shuffles),
+            'adjacency' : _test(self._pairs, pair_probabilities, self._shuffles),
+        }
+
+    def save(self, path, **extra):
+        """Write the counts to `path` with :func:`numpy.savez`
+
+        The file is written next to `path` and renamed over it, so an
+        interrupted save leaves the previous file in place.
+
+        :param str path: destination file path
+        :param extra: more arrays or values to store
+        """
+        temp_path = '%s.%d.tmp' % (path, os.getpid())
+        with open(temp_path, 'wb') as temp_file:
+            numpy.savez(temp_file, with_jokers=self._with_jokers, shuffles=self._shuffles,
+                        positions=self._positions, pairs=self._pairs, **extra)
+        os.rename(temp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        :param str path: a file written by :meth:`save`
+        :returns: the counts and a dictionary of the extra values
+        :rtype: tuple
+        """
+        with numpy.load(path) as data:
+            counts = cls(bool(data['with_jokers']))
+            counts._shuffles = int(data['shuffles'])
+            counts._positions = data['positions']
+            counts._pairs = data['pairs']
+            extra = dict((name, data[name][()]) for name in data.files
+                         if name not in ('with_jokers', 'shuffles', 'positions', 'pairs'))
+        return counts, extra
+
+def _backend_name(backend):
+    """
+    :param backend: a key of :attr:`BACKENDS` or a backend function
+    :returns: the name stored in checkpoints
+    :rtype: str
+    """
+    if backend in BACKENDS:
+        return backend
+    return '%s.%s' % (backend.__module__, backend.__name__)
+
+def _count_chunk(task):
+    """Shuffle and count one chunk in a worker
+
+    :param tuple task: (backend, seed, start, count, with_jokers)
+    :returns: the counts of the chunk
+    :rtype: :class:`FairnessCounts`
+    """
+    backend, seed, start, count, with_jokers = task
+    backend = BACKENDS.get(backend, backend)
+    chunk_counts = FairnessCounts(with_jokers)
+    chunk_counts.add(backend(seed, start, count, with_jokers))
+    return chunk_counts
+
+def run(shuffles, backend='deck', seed=0, with_jokers=True, processes=None,
+        chunk_size=10000, checkpoint=None):
+    """Shuffle `shuffles` decks and count them
+
+    Chunks of `chunk_size` shuffles are handed to a
+    :class:`multiprocessing.Pool` of `processes` workers, or counted in this
+    process if `processes` is 1. Each chunk is seeded from `seed` and the
+    index of its first shuffle, so a run gives the same counts for any number
+    of processes.
+
+    With `checkpoint`, the counts are saved to that file after every chunk.
+    A run started with an existing checkpoint file resumes after the last
+    saved chunk, and may ask for more shuffles than the run which wrote it.
+    Raises a ValueError when the checkpoint was written with other arguments,
+    when it holds more shuffles than `shuffles`, or when it ends with a
+    partial chunk and more shuffles are asked for, as the resumed chunks
+    would not be seeded like the chunks of a run which was not interrupted.
+
+    :param int shuffles: total number of shuffles
+    :param backend: a key of :attr:`BACKENDS` or a module-level function with
+                    the arguments of :func:`deck_backend`, so that it can be
+                    sent to worker processes
+    :param int seed: a non-negative seed
+    :param bool with_jokers: shuffle decks with jokers if True
+    :param int processes: number of worker processes, the number of CPUs if
+                          None
+    :param int chunk_size: number of shuffles per chunk
+    :param str checkpoint: a file path for :meth:`FairnessCounts.save`
+    :returns: the counts
+    :rtype: :class:`FairnessCounts`
+    :raises: ValueError
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1, not %s" % chunk_size)
+
+    settings = {
+        'backend' : _backend_name(backend),
+        'seed' : seed,
+        'chunk_size' : chunk_size,
+    }
+
+    counts = FairnessCounts(with_jokers)
+    if checkpoint is not None and os.path.exists(checkpoint):
+        counts, saved_settings = FairnessCounts.load(checkpoint)
+        if saved_settings != settings or counts._with_jokers != bool(with_jokers):
+            raise ValueError("The checkpoint %s was written by another run: %s"
+                             % (checkpoint, saved_settings))
+        if counts.get_shuffles() > shuffles:
+            raise ValueError("The checkpoint %s holds %d shuffles, more than %d."
+                             % (checkpoint, counts.get_shuffles(), shuffles))
+        if counts.get_shuffles() % chunk_size and counts.get_shuffles() < shuffles:
+            raise ValueError("The checkpoint %s ends with a partial chunk after %d"
+                             " shuffles, it cannot be resumed."
+                             % (checkpoint, counts.get_shuffles()))
+
+    tasks = [(backend, seed, start, min(chunk_size, shuffles - start), with_jokers)
+             for start in xrange(counts.get_shuffles(), shuffles, chunk_size)]
+
+    pool = None
+    if 1 == processes:
+        results = (_count_chunk(task) for task in tasks)
+    else:
+        pool = multiprocessing.Pool(processes)
+        results = pool.imap(_count_chunk, tasks)
+
+    try:
+        for chunk_counts in results:
+            counts.merge(chunk_counts)
+            if checkpoint is not None:
+                counts.save(checkpoint, **settings)
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+    return counts
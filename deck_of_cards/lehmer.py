@@ -0,0 +1,203 @@
+#!/usr/bin/python
+"""This module ranks and unranks permutations with Lehmer codes, so that a
+deck order can be stored, sorted and deduplicated as a single integer.
+
+A permutation of ``range(n)`` is ranked by its position in lexicographic
+order, in [0, n!). :func:`rank` and :func:`unrank` use a Fenwick tree and take
+O(n log n) steps. :func:`rank_codes_batch` ranks many deck orders at once with
+NumPy, and returns fixed-width :attr:`RANK_BYTES` byte ranks.
+
+Card codes (see :meth:`deck_of_cards.card.Card.get_code`) are turned into
+items by their position in a new deck. The two jokers are equal cards, so
+they are numbered by order of appearance. A deck with jokers therefore only
+reaches the ranks where the first joker comes before the second one.
+"""
+
+import binascii
+
+import deck_of_cards.card as card
+
+#: number of bytes which hold the rank of any deck order, 54! < 256 ** 30
+RANK_BYTES = 30
+
+def _new_tree(size):
+    """
+    :param int size: number of items
+    :returns: a 1-indexed Fenwick tree with a count of 1 for every item
+    :rtype: list
+    """
+    # with every count set to 1, node i holds the length of its range
+    return [i & -i for i in xrange(size + 1)]
+
+def _remove(tree, item):
+    """Decrement the count of `item` in a Fenwick tree
+
+    :param list tree: a Fenwick tree
+    :param int item: a 0-indexed item
+    """
+    index = item + 1
+    size = len(tree)
+    while index < size:
+        tree[index] -= 1
+        index += index & -index
+
+def _count_below(tree, item):
+    """
+    :param list tree: a Fenwick tree
+    :param int item: a 0-indexed item
+    :returns: the total count of the items smaller than `item`
+    :rtype: int
+    """
+    total = 0
+    index = item
+    while index > 0:
+        total += tree[index]
+        index -= index & -index
+    return total
+
+def _find(tree, position):
+    """
+    :param list tree: a Fenwick tree
+    :param int position: a 0-indexed position among the items with a count
+    :returns: the item at `position`
+    :rtype: int
+    """
+    index = 0
+    step = 1
+    while step * 2 < len(tree):
+        step *= 2
+
+    while step:
+        next_index = index + step
+        if next_index < len(tree) and tree[next_index] <= position:
+            index = next_index
+            position -= tree[next_index]
+        step //= 2
+
+    return index
+
+def rank(items):
+    """
+    :param list items: a permutation of ``range(len(items))``
+    :returns: the lexicographic rank of `items`, in [0, len(items)!)
+    :rtype: int
+    :raises: ValueError
+    """
+    size = len(items)
+    if sorted(items) != list(xrange(size)):
+        raise ValueError("%s is not a permutation of range(%d)." % (items, size))
+
+    tree = _new_tree(size)
+    rank_value = 0
+    for i, item in enumerate(items):
+        # horner's rule for the sum of digit * (size - 1 - i)!
+        rank_value = rank_value * (size - i) + _count_below(tree, item)
+        _remove(tree, item)
+
+    return rank_value
+
+def unrank(rank_value, size):
+    """
+    :param int rank_value: a rank in [0, `size`!)
+    :param int size: number of items
+    :returns: the permutation of ``range(size)`` with the rank `rank_value`
+    :rtype: list
+    :raises: ValueError
+    """
+    if rank_value < 0:
+        raise ValueError("rank (%s) cannot be negative." % rank_value)
+
+    # digits of the factorial number system, least significant digit last
+    digits = [0] * size
+    remainder = rank_value
+    for i in xrange(size - 1, -1, -1):
+        remainder, digits[i] = divmod(remainder, size - i)
+    if remainder:
+        raise ValueError("rank (%s) is not below %d!." % (rank_value, size))
+
+    tree = _new_tree(size)
+    items = []
+    for digit in digits:
+        item = _find(tree, digit)
+        items.append(item)
+        _remove(tree, item)
+
+    return items
+
+def codes_to_items(codes):
+    """
+    :param list codes: the card codes of a whole deck
+    :returns: the position of every card in a new deck, jokers numbered in
+              order of appearance
+    :rtype: list
+    """
+    number_of_jokers = codes.count(card.JOKER_CODE)
+    items = []
+    jokers_seen = 0
+    for code in codes:
+        if card.JOKER_CODE == code:
+            items.append(jokers_seen)
+            jokers_seen += 1
+        else:
+            items.append(number_of_jokers + code - 1)
+    return items
+
+def items_to_codes(items, with_jokers=True):
+    """
+    :param list items: positions of cards in a new deck
+    :param bool with_jokers: the deck includes jokers if True
+    :returns: the card codes of the items
+    :rtype: list
+    """
+    if with_jokers:
+        return [card.JOKER_CODE if item < 2 else item - 1 for item in items]
+    return [item + 1 for item in items]
+
+def rank_to_bytes(rank_value):
+    """
+    :param int rank_value: a rank in [0, 256 ** :attr:`RANK_BYTES`)
+    :returns: the big-endian, fixed-width bytes of `rank_value`
+    :rtype: bytes
+    """
+    return binascii.unhexlify('%0*x' % (2 * RANK_BYTES, rank_value))
+
+def rank_from_bytes(data):
+    """
+    :param bytes data: bytes returned by :func:`rank_to_bytes`
+    :returns: the rank
+    :rtype: int
+    """
+    return int(binascii.hexlify(data), 16)
+
+def rank_codes_batch(codes):
+    """Rank many deck orders at once. Rows of the result compare
+    lexicographically in the same order as their ranks, so they can be
+    sorted and deduplicated as fixed-width records.
+
+    :param codes: an (m, n) array-like of card codes, one deck per row
+    :returns: an (m, :attr:`RANK_BYTES`) uint8 array of big-endian ranks
+    :rtype: :class:`numpy.ndarray`
+    :raises: ImportError
+    """
+    # numpy is optional and slow to import, so only load it for batches
+    import numpy
+
+    codes = numpy.asarray(codes, dtype=numpy.int64)
+    rows, size = codes.shape
+
+    # turn codes into items like codes_to_items, row by row
+    jokers = codes == card.JOKER_CODE
+    items = codes + jokers.sum(axis=1)[:, numpy.newaxis] - 1
+    items[jokers] = (numpy.cumsum(jokers, axis=1) - 1)[jokers]
+
+    # little-endian base 256 limbs, updated with the same horner's rule as rank
+    limbs = numpy.zeros((rows, RANK_BYTES), dtype=numpy.int64)
+    for i in xrange(size):
+        digits = (items[:, i + 1:] < items[:, i:i + 1]).sum(axis=1)
+        limbs *= size - i
+        limbs[:, 0] += digits
+        for limb in xrange(RANK_BYTES - 1):
+            limbs[:, limb + 1] += limbs[:, limb] >> 8
+            limbs[:, limb] &= 0xff
+
+    return limbs[:, ::-1].astype(numpy.uint8)
@@ -0,0 +1,125 @@
+#!/usr/bin/python
+"""This module measures how much memory cards and decks take, to size hosts
+by the number of live decks they can hold.
+
+:func:`deep_sizeof` adds up :func:`sys.getsizeof` over an object and every
+object it references, counting each object once. Classes, modules and
+functions are not followed. The footprint functions also skip the objects
+every card shares, like the suit strings and the small rank integers, so they
+report what one more card or deck costs.
+"""
+
+import gc
+import sys
+import types
+
+import deck_of_cards.card as card
+
+#: the attributes of a :class:`deck_of_cards.deck.Deck` which hold its piles
+PILES = ('_cards', '_in_play_cards', '_discarded_cards')
+
+#: the attributes of a :class:`deck_of_cards.deck.Deck` which hold its
+#: remaining counts
+COUNTS = ('_code_counts', '_rank_counts', '_suit_counts')
+
+#: attributes of a :class:`deck_of_cards.deck.Deck` which refer to objects it
+#: does not own
+_NOT_OWNED = ('_listeners', '_metrics')
+
+#: types whose instances are shared code, not data
+_NOT_FOLLOWED = (type, types.ModuleType, types.FunctionType,
+                 types.BuiltinFunctionType, types.MethodType)
+
+def deep_sizeof(obj, seen=None):
+    """
+    :param obj: any object
+    :param set seen: ids of objects which are not counted, and to which the
+                     ids of the counted objects are added
+    :returns: size in bytes of `obj` and everything it references
+    :rtype: int
+    """
+    if seen is None:
+        seen = set()
+
+    size = 0
+    pending = [obj]
+    while pending:
+        current = pending.pop()
+        if id(current) in seen or isinstance(current, _NOT_FOLLOWED):
+            continue
+        seen.add(id(current))
+        size += sys.getsizeof(current)
+        pending.extend(gc.get_referents(current))
+    return size
+
+def shared_ids():
+    """
+    :returns: ids of the objects which every card and deck shares, the suit
+              strings, the ranks, the attribute names of a card, None and the
+              booleans
+    :rtype: set
+    """
+    shared = [None, True, False, card.JOKER_SUIT, card.JOKER_RANK,
+              intern('_rank'), intern('_suit')]
+    shared.extend(card.POSSIBLE_SUIT)
+    shared.extend(card.POSSIBLE_RANK)
+    return set(id(obj) for obj in shared)
+
+def card_footprint(c_card):
+    """
+    :param c_card: a :class:`deck_of_cards.card.Card`
+    :returns: bytes taken by the card itself
+    :rtype: int
+    """
+    return deep_sizeof(c_card, shared_ids())
+
+def pile_footprint(pile):
+    """
+    :param list pile: :class:`deck_of_cards.card.Card` objects
+    :returns: bytes taken by the pile and its cards
+    :rtype: int
+    """
+    return deep_sizeof(pile, shared_ids())
+
+def deck_footprint(d_deck):
+    """Measure a :class:`deck_of_cards.deck.Deck`, without the listeners and
+    metrics attached to it
+
+    The dictionary has the keys:
+
+    * ``'total'``, the whole deck
+    * ``'deck'``, the deck object and its attribute dictionary
+    * ``'cards'``, every card of the deck
+    * each name in :attr:`PILES`, the pile with its cards
+    * ``'counts'``, the remaining counts (see
+      :meth:`deck_of_cards.deck.Deck.remaining_count`)
+
+    :param d_deck: a :class:`deck_of_cards.deck.Deck`
+    :returns: a dictionary of part to bytes
+    :rtype: dict
+    """
+    # attribute names are interned strings shared by every deck
+    not_owned = shared_ids()
+    not_owned.update(id(name) for name in vars(d_deck))
+    for name in _NOT_OWNED:
+        not_owned.add(id(getattr(d_deck, name)))
+
+    footprint = {
+        'total' : deep_sizeof(d_deck, set(not_owned)),
+        'deck' : sys.getsizeof(d_deck) + sys.getsizeof(vars(d_deck)),
+        'cards' : 0,
+        'counts' : 0,
+    }
+
+    cards_seen = set(not_owned)
+    for name in PILES:
+        pile = getattr(d_deck, name)
+        footprint[name] = deep_sizeof(pile, set(not_owned))
+        for c_card in pile:
+            footprint['cards'] += deep_sizeof(c_card, cards_seen)
+
+    counts_seen = set(not_owned)
+    for name in COUNTS:
+        footprint['counts'] += deep_sizeof(getattr(d_deck, name), counts_seen)
+
+    return footprint
@@ -0,0 +1,254 @@
+#!/usr/bin/python
+"""This module provides the :class:`DeckMetrics` object which collects
+operation counters and sampled latency histograms from
+:class:`deck_of_cards.deck.Deck` objects.
+
+Instrumentation is off by default. A deck only pays for a single ``None``
+check per operation until a :class:`DeckMetrics` object is attached to it
+(or to the :class:`deck_of_cards.deck.Deck` class to instrument every deck).
+"""
+
+import contextlib
+import os
+import timeit
+
+import deck_of_cards.deck as deck
+
+#: the deck operations that are instrumented
+OPERATIONS = ('deal', 'discard', 'shuffle', 'check_deck')
+
+#: upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5,
+                   1e-4, 2.5e-4, 5e-4, 1e-3, 1e-2, 1e-1)
+
+#: a clock suitable for measuring short intervals
+_timer = timeit.default_timer
+
+class DeckMetrics(object):
+    """A DeckMetrics object
+
+    Counts every call, error and :meth:`deck_of_cards.deck.Deck.check_deck`
+    failure, and times one call out of every `sample_every` calls per
+    operation.
+    """
+
+    #: time one call out of this many calls of each operation
+    _sample_every = 1
+
+    #: a dictionary of operation to number of calls
+    _calls = {}
+
+    #: a dictionary of operation to number of calls which raised
+    _errors = {}
+
+    #: number of :meth:`deck_of_cards.deck.Deck.check_deck` calls which
+    #: returned False
+    _check_deck_failures = 0
+
+    #: a dictionary of operation to an array of non-cumulative bucket counts,
+    #: the last bucket holds latencies above every :attr:`LATENCY_BUCKETS`
+    _buckets = {}
+
+    #: a dictionary of operation to the sum of sampled latencies in seconds
+    _latency_sums = {}
+
+    def __init__(self, sample_every=1):
+        """
+        :param int sample_every: time one call out of this many calls of each
+                                 operation
+        :raises: ValueError
+        """
+        if sample_every < 1:
+            raise ValueError("sample_every must be at least 1, not %s" % sample_every)
+
+        self._sample_every = sample_every
+        self.reset()
+
+    def reset(self):
+        """Set every counter and histogram back to zero
+        """
+        self._calls = dict((operation, 0) for operation in OPERATIONS)
+        self._errors = dict((operation, 0) for operation in OPERATIONS)
+        self._check_deck_failures = 0
+        self._buckets = dict((operation, [0] * (len(LATENCY_BUCKETS) + 1))
+                             for operation in OPERATIONS)
+        self._latency_sums = dict((operation, 0.0) for operation in OPERATIONS)
+
+    def observe(self, operation, method, *args):
+        """Call `method` with `args`, counting the call and timing it if it is
+        sampled. This is what an instrumented deck calls for each operation.
+
+        :param str operation: a name in :attr:`OPERATIONS`
+        :param method: the uninstrumented implementation of the operation
+        :returns: whatever `method` returns
+        """
+        calls = self._calls[operation] + 1
+        self._calls[operation] = calls
+        sampled = 0 == calls % self._sample_every
+
+        if sampled:
+            start = _timer()
+        try:
+            result = method(*args)
+        except Exception:
+            self._errors[operation] += 1
+            raise
+        finally:
+            if sampled:
+                self._record_latency(operation, _timer() - start)
+
+        if result is False and 'check_deck' == operation:
+            self._check_deck_failures += 1
+
+        return result
+
+    def _record_latency(self, operation, latency):
+        """Add a single latency to the operation's histogram
+
+        :param str operation: a name in :attr:`OPERATIONS`
+        :param float latency: seconds
+        """
+        buckets = self._buckets[operation]
+        for index, upper_bound in enumerate(LATENCY_BUCKETS):
+            if latency <= upper_bound:
+                buckets[index] += 1
+                break
+        else:
+            buckets[-1] += 1
+        self._latency_sums[operation] += latency
+
+    def attach(self, target=None):
+        """Start collecting stats from `target`
+
+        :param target: a :class:`deck_of_cards.deck.Deck`, or None to
+                       instrument every deck without its own metrics
+        """
+        if target is None:
+            target = deck.Deck
+        target._metrics = self
+
+    @staticmethod
+    def detach(target=None):
+        """Stop collecting stats from `target`
+
+        :param target: a :class:`deck_of_cards.deck.Deck`, or None for the
+                       class wide metrics
+        """
+        if target is None:
+            deck.Deck._metrics = None
+        elif '_metrics' in vars(target):
+            del target._metrics
+
+    @contextlib.contextmanager
+    def profile(self, *decks):
+        """Context manager which collects stats from `decks`, or from every
+        deck when none are given, for the duration of a with block
+
+        :param decks: :class:`deck_of_cards.deck.Deck` objects, a deck given
+                      more than once is profiled once
+        :returns: this :class:`DeckMetrics` object
+        """
+        targets = []
+        for target in decks or (deck.Deck,):
+            if not any(target is other for other in targets):
+                targets.append(target)
+        previous = [vars(target).get('_metrics', None) for target in targets]
+        for target in targets:
+            target._metrics = self
+        try:
+            yield self
+        finally:
+            for target, metrics in zip(targets, previous):
+                if metrics is None and target is not deck.Deck:
+                    del target._metrics
+                else:
+                    target._metrics = metrics
+
+    def to_dict(self):
+        """
+        :returns: a snapshot of every counter and histogram. Histogram buckets
+                  are cumulative (upper bound, count) pairs, like Prometheus
+        :rtype: dict
+        """
+        operations = {}
+        for operation in OPERATIONS:
+            cumulative = 0
+            buckets = []
+            for upper_bound, count in zip(LATENCY_BUCKETS + (float('inf'),),
+                                          self._buckets[operation]):
+                cumulative += count
+                buckets.append((upper_bound, cumulative))
+
+            operations[operation] = {
+                'calls' : self._calls[operation],
+                'errors' : self._errors[operation],
+                'latency' : {
+                    'buckets' : buckets,
+                    'count' : cumulative,
+                    'sum' : self._latency_sums[operation],
+                },
+            }
+
+        return {
+            'operations' : operations,
+            'check_deck_failures' : self._check_deck_failures,
+            'sample_every' : self._sample_every,
+        }
+
+    def to_prometheus(self):
+        """
+        :returns: a snapshot in the Prometheus text exposition format
+        :rtype: str
+        """
+        snapshot = self.to_dict()
+        lines = [
+            '# HELP deck_operations_total Deck operations performed.',
+            '# TYPE deck_operations_total counter',
+        ]
+        for operation in OPERATIONS:
+            lines.append('deck_operations_total{operation="%s"} %d'
+                         % (operation, snapshot['operations'][operation]['calls']))
+
+        lines.extend([
+            '# HELP deck_operation_errors_total Deck operations which raised.',
+            '# TYPE deck_operation_errors_total counter',
+        ])
+        for operation in OPERATIONS:
+            lines.append('deck_operation_errors_total{operation="%s"} %d'
+                         % (operation, snapshot['operations'][operation]['errors']))
+
+        lines.extend([
+            '# HELP deck_check_deck_failures_total check_deck calls which returned False.',
+            '# TYPE deck_check_deck_failures_total counter',
+            'deck_check_deck_failures_total %d' % snapshot['check_deck_failures'],
+            '# HELP deck_operation_latency_seconds Sampled deck operation latency.',
+            '# TYPE deck_operation_latency_seconds histogram',
+        ])
+        for operation in OPERATIONS:
+            latency = snapshot['operations'][operation]['latency']
+            for upper_bound, count in latency['buckets']:
+                if float('inf') == upper_bound:
+                    upper_bound_str = '+Inf'
+                else:
+                    upper_bound_str = repr(upper_bound)
+                lines.append('deck_operation_latency_seconds_bucket{operation="%s",le="%s"} %d'
+                             % (operation, upper_bound_str, count))
+            lines.append('deck_operation_latency_seconds_sum{operation="%s"} %r'
+                         % (operation, latency['sum']))
+            lines.append('deck_operation_latency_seconds_count{operation="%s"} %d'
+                         % (operation, latency['count']))
+
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        """Write :meth:`to_prometheus` to `path`
+
+        The file is written next to `path` and renamed over it, so a collector
+        reading the file never sees a partial snapshot.
+
+        :param str path: destination file path
+        """
+        temp_path = '%s.%d.tmp' % (path, os.getpid())
+        with open(temp_path, 'w') as temp_file:
+            temp_file.write(self.to_prometheus())
+        os.rename(temp_path, path)
@@ -0,0 +1,331 @@
+#!/usr/bin/python
+"""This module provides the :class:`DealRecorder` object, which records every
+card dealt or discarded by :class:`deck_of_cards.deck.Deck` objects as rows of
+a columnar table:
+
+* ``deck_id``, the id given to the deck by :meth:`DealRecorder.attach`
+* ``seq``, the position of the event among the events of its deck
+* ``op``, :attr:`OP_DEAL` or :attr:`OP_DISCARD`
+* ``rank``, the card rank
+* ``suit``, the index of the card suit in :attr:`SUITS`
+
+Each attached deck gets its own listener, which appends an event to plain
+lists with no more work than a few list appends. The lists are converted to
+typed :mod:`array` columns in bulk and written out in chunks of `chunk_size`
+rows. With the ``'arrow'`` format, each chunk is a record
+batch of an Apache Arrow IPC file, which needs :mod:`pyarrow`. With the
+``'binary'`` format, the path is a directory holding a raw file per column
+and a ``schema.json`` with the NumPy dtype of each file, so a column can be
+loaded with :func:`numpy.fromfile`. :func:`read_columns` reads both formats.
+"""
+
+import array
+import json
+import os
+import sys
+
+import deck_of_cards.card as card
+import deck_of_cards.deck as deck
+
+#: op of a dealt card
+OP_DEAL = 0
+
+#: op of a discarded card
+OP_DISCARD = 1
+
+#: suits in the order of their index in the ``suit`` column
+SUITS = card.POSSIBLE_SUIT + [card.JOKER_SUIT]
+
+#: (name, :mod:`array` typecode) of every column
+COLUMNS = (
+    ('deck_id', 'I'),
+    ('seq', 'L'),
+    ('op', 'B'),
+    ('rank', 'B'),
+    ('suit', 'B'),
+)
+
+#: name of the file describing the columns of the binary format
+SCHEMA_FILE = 'schema.json'
+
+#: a dictionary of suit to its index in :attr:`SUITS`
+_SUIT_INDEX = dict((suit, index) for index, suit in enumerate(SUITS))
+
+#: a dictionary of column name to its :mod:`array` typecode
+_TYPECODES = dict(COLUMNS)
+
+#: :meth:`bytes.translate` tables from card code to rank and to suit index,
+#: to split a whole chunk of codes at once
+_RANK_BY_CODE = bytes(bytearray([rank for rank, _ in card._RANK_SUIT_BY_CODE]
+                                + [0] * (256 - card.NUMBER_OF_CODES)))
+_SUIT_INDEX_BY_CODE = bytes(bytearray([_SUIT_INDEX[suit] for _, suit in card._RANK_SUIT_BY_CODE]
+                                      + [0] * (256 - card.NUMBER_OF_CODES)))
+
+def _to_array(name, values):
+    """Convert buffered values in bulk, bytes go through :class:`bytearray`
+    which converts them fastest
+
+    :param str name: a column name in :attr:`COLUMNS`
+    :param list values: the values of the column
+    :returns: the column
+    :rtype: :class:`array.array`
+    """
+    column = array.array(_TYPECODES[name])
+    if 1 == column.itemsize:
+        column.fromstring(bytes(bytearray(values)))
+    else:
+        column.fromlist(values)
+    return column
+
+def _dtype(typecode):
+    """
+    :param str typecode: an unsigned :mod:`array` typecode
+    :returns: the NumPy dtype string of the typecode on this machine
+    :rtype: str
+    """
+    itemsize = array.array(typecode).itemsize
+    if 1 == itemsize:
+        return '|u1'
+    return '%su%d' % ('<' if 'little' == sys.byteorder else '>', itemsize)
+
+class DealRecorder(object):
+    """A DealRecorder object
+
+    Attach decks with :meth:`attach`, and call :meth:`close` at the end to
+    write the last rows.
+    """
+
+    #: the output file (arrow) or directory (binary)
+    _path = None
+
+    #: 'arrow' or 'binary'
+    _file_format = None
+
+    #: number of rows buffered before they are written
+    _chunk_size = 0
+
+    #: a dictionary of buffer name to the list of buffered values, the
+    #: ``deck_id``, ``seq`` and ``op`` columns and the ``card`` objects. The
+    #: lists are cleared in place, so the listeners can keep their bound
+    #: append methods
+    _buffers = {}
+
+    #: a dictionary of attached :class:`deck_of_cards.deck.Deck` to its
+    #: listener
+    _decks = {}
+
+    #: a set of every deck id used so far
+    _deck_ids = set()
+
+    #: the next deck id handed out by :meth:`attach`
+    _next_deck_id = 0
+
+    #: the open :class:`pyarrow.ipc.RecordBatchFileWriter` of the arrow format
+    _writer = None
+
+    def __init__(self, path, chunk_size=65536, file_format=None):
+        """
+        :param str path: the output file for the arrow format, or the output
+                         directory for the binary format
+        :param int chunk_size: number of rows written at once
+        :param str file_format: 'arrow', 'binary', or None for 'arrow' when
+                                :mod:`pyarrow` is installed and 'binary' if not
+        :raises: ValueError, ImportError
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1, not %s" % chunk_size)
+
+        if file_format is None:
+            try:
+                import pyarrow
+                file_format = 'arrow'
+            except ImportError:
+                file_format = 'binary'
+
+        self._path = path
+        self._file_format = file_format
+        self._chunk_size = chunk_size
+        self._buffers = dict((name, []) for name in ('deck_id', 'seq', 'op', 'card'))
+        self._decks = {}
+        self._deck_ids = set()
+        self._next_deck_id = 0
+
+        if 'arrow' == file_format:
+            import pyarrow
+            import pyarrow.ipc
+            self._writer = pyarrow.ipc.new_file(path, _arrow_schema(pyarrow))
+        elif 'binary' == file_format:
+            if not os.path.isdir(path):
+                os.makedirs(path)
+            with open(os.path.join(path, SCHEMA_FILE), 'w') as schema_file:
+                json.dump(dict((name, _dtype(typecode)) for name, typecode in COLUMNS),
+                          schema_file, sort_keys=True)
+            for name, _ in COLUMNS:
+                open(os.path.join(path, '%s.bin' % name), 'wb').close()
+        else:
+            raise ValueError("Unknown file format %r." % file_format)
+
+    def attach(self, d_deck, deck_id=None):
+        """Record every card dealt or discarded by `d_deck`
+
+        Raises a ValueError when the deck is already attached or the deck id
+        was already used, so the rows of two decks never share an id.
+
+        :param d_deck: a :class:`deck_of_cards.deck.Deck`
+        :param int deck_id: the id to record, the next unused one if None
+        :returns: the deck id
+        :rtype: int
+        :raises: ValueError
+        """
+        if d_deck in self._decks:
+            raise ValueError("The deck is already attached.")
+        if deck_id is None:
+            deck_id = self._next_deck_id
+        if deck_id in self._deck_ids:
+            raise ValueError("Deck id %s is already used." % deck_id)
+        self._deck_ids.add(deck_id)
+        self._next_deck_id = max(self._next_deck_id, deck_id + 1)
+
+        listener = _DeckListener(self, deck_id)
+        self._decks[d_deck] = listener
+        d_deck.add_listener(listener)
+        return deck_id
+
+    def detach(self, d_deck):
+        """Stop recording `d_deck`. Its deck id stays used.
+
+        :param d_deck: an attached :class:`deck_of_cards.deck.Deck`
+        """
+        d_deck.remove_listener(self._decks.pop(d_deck))
+
+    def flush(self):
+        """Write the buffered rows as one chunk
+        """
+        buffers = self._buffers
+        if not buffers['op']:
+            return
+
+        codes = bytes(bytearray(deck._core.pile_codes(buffers['card'])))
+        columns = {
+            'deck_id' : _to_array('deck_id', buffers['deck_id']),
+            'seq' : _to_array('seq', buffers['seq']),
+            'op' : _to_array('op', buffers['op']),
+            'rank' : array.array('B', codes.translate(_RANK_BY_CODE)),
+            'suit' : array.array('B', codes.translate(_SUIT_INDEX_BY_CODE)),
+        }
+
+        if 'arrow' == self._file_format:
+            import pyarrow
+            arrays = [pyarrow.Array.from_buffers(_arrow_type(pyarrow, typecode),
+                                                 len(columns[name]),
+                                                 [None, pyarrow.py_buffer(columns[name])])
+                      for name, typecode in COLUMNS]
+            self._writer.write_batch(pyarrow.RecordBatch.from_arrays(
+                arrays, [name for name, _ in COLUMNS]))
+        else:
+            for name, _ in COLUMNS:
+                with open(os.path.join(self._path, '%s.bin' % name), 'ab') as column_file:
+                    columns[name].tofile(column_file)
+
+        for values in buffers.values():
+            del values[:]
+
+    def close(self):
+        """Write the buffered rows, close the output and detach every deck
+        """
+        self.flush()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+        for d_deck in list(self._decks):
+            self.detach(d_deck)
+
+class _DeckListener(object):
+    """Listens to one deck of a :class:`DealRecorder` and appends its events
+    to the buffers of the recorder
+    """
+
+    __slots__ = ('_recorder', '_deck_id', '_seq', '_append_deck_id', '_append_seq',
+                 '_append_op', '_append_card', '_ops', '_chunk_size')
+
+    def __init__(self, deal_recorder, deck_id):
+        """
+        :param deal_recorder: the :class:`DealRecorder`
+        :param int deck_id: the id of the deck
+        """
+        buffers = deal_recorder._buffers
+        self._recorder = deal_recorder
+        self._deck_id = deck_id
+        self._seq = 0
+        self._append_deck_id = buffers['deck_id'].append
+        self._append_seq = buffers['seq'].append
+        self._append_op = buffers['op'].append
+        self._append_card = buffers['card'].append
+        self._ops = buffers['op']
+        self._chunk_size = deal_recorder._chunk_size
+
+    def deck_dealt(self, d_deck, c_card):
+        """Listener method, see :meth:`deck_of_cards.deck.Deck.add_listener`
+        """
+        self._append_deck_id(self._deck_id)
+        self._append_seq(self._seq)
+        self._seq += 1
+        self._append_op(OP_DEAL)
+        self._append_card(c_card)
+        if len(self._ops) >= self._chunk_size:
+            self._recorder.flush()
+
+    def deck_discarded(self, d_deck, c_card):
+        """Listener method, see :meth:`deck_of_cards.deck.Deck.add_listener`
+        """
+        self._append_deck_id(self._deck_id)
+        self._append_seq(self._seq)
+        self._seq += 1
+        self._append_op(OP_DISCARD)
+        self._append_card(c_card)
+        if len(self._ops) >= self._chunk_size:
+            self._recorder.flush()
+
+    def deck_shuffled(self, d_deck):
+        """Listener method, shuffles are not recorded
+        """
+
+def _arrow_type(pyarrow, typecode):
+    """
+    :param pyarrow: the :mod:`pyarrow` module
+    :param str typecode: an unsigned :mod:`array` typecode
+    :returns: the Arrow type with the same width
+    """
+    return {
+        1 : pyarrow.uint8(),
+        2 : pyarrow.uint16(),
+        4 : pyarrow.uint32(),
+        8 : pyarrow.uint64(),
+    }[array.array(typecode).itemsize]
+
+def _arrow_schema(pyarrow):
+    """
+    :param pyarrow: the :mod:`pyarrow` module
+    :returns: the Arrow schema of :attr:`COLUMNS`
+    """
+    return pyarrow.schema([(name, _arrow_type(pyarrow, typecode)) for name, typecode in COLUMNS])
+
+def read_columns(path):
+    """Read a recording written by :class:`DealRecorder` in either format
+
+    :param str path: the output file or directory of the recorder
+    :returns: a dictionary of column name to :class:`numpy.ndarray`
+    :rtype: dict
+    """
+    import numpy
+
+    if os.path.isdir(path):
+        with open(os.path.join(path, SCHEMA_FILE)) as schema_file:
+            schema = json.load(schema_file)
+        return dict((name, numpy.fromfile(os.path.join(path, '%s.bin' % name), dtype=str(dtype)))
+                    for name, dtype in schema.items())
+
+    import pyarrow.ipc
+    table = pyarrow.ipc.open_file(path).read_all()
+    return dict((name, table.column(name).to_numpy()) for name, _ in COLUMNS)
@@ -0,0 +1,219 @@
+#!/usr/bin/python
+"""This module encodes changes to :class:`deck_of_cards.deck.Deck` objects as
+compact binary records. The same records make up the
+:mod:`deck_of_cards.journal` and the :mod:`deck_of_cards.replication` stream.
+
+Every record starts with a one byte record type and a 32-bit id. The journal
+stores a deck id there and a replication stream a sequence number. Cards are
+stored as their codes, see :meth:`deck_of_cards.card.Card.get_code`.
+"""
+
+import struct
+
+import deck_of_cards.card as card
+import deck_of_cards.deck as deck
+
+#: record type of a dealt card: id, card code
+DEAL = b'D'
+
+#: record type of a discarded card: id, card code
+DISCARD = b'X'
+
+#: record type of a shuffle: id, lazy flag, number of cards, card codes
+SHUFFLE = b'S'
+
+#: record type of a whole deck: id, with_jokers flag, lazy flag, pile lengths,
+#: card codes
+SNAPSHOT = b'C'
+
+#: record type of a deck which is no longer followed: id
+DETACH = b'R'
+
+#: a deal or discard record
+_CARD_RECORD = struct.Struct('<cIB')
+
+#: a detach record
+_DETACH_RECORD = struct.Struct('<cI')
+
+#: the fixed part of a shuffle record
+_SHUFFLE_RECORD = struct.Struct('<cIBB')
+
+#: the fixed part of a snapshot record
+_SNAPSHOT_RECORD = struct.Struct('<cIBBBBB')
+
+def _codes(pile):
+    """
+    :param list pile: :class:`deck_of_cards.card.Card` objects
+    :returns: the card codes of the pile as bytes
+    :rtype: bytes
+    """
+    return bytes(bytearray(c_card.get_code() for c_card in pile))
+
+def _pile(codes):
+    """
+    :param bytes codes: card codes
+    :returns: :class:`deck_of_cards.card.Card` objects
+    :rtype: list
+    """
+    return [card.from_code(code) for code in bytearray(codes)]
+
+def encode_deal(record_id, c_card):
+    """
+    :param int record_id: a deck id or sequence number
+    :param c_card: the dealt :class:`deck_of_cards.card.Card`
+    :returns: a :attr:`DEAL` record
+    :rtype: bytes
+    """
+    return _CARD_RECORD.pack(DEAL, record_id, c_card.get_code())
+
+def encode_discard(record_id, c_card):
+    """
+    :param int record_id: a deck id or sequence number
+    :param c_card: the discarded :class:`deck_of_cards.card.Card`
+    :returns: a :attr:`DISCARD` record
+    :rtype: bytes
+    """
+    return _CARD_RECORD.pack(DISCARD, record_id, c_card.get_code())
+
+def encode_shuffle(record_id, d_deck):
+    """
+    :param int record_id: a deck id or sequence number
+    :param d_deck: the shuffled :class:`deck_of_cards.deck.Deck`
+    :returns: a :attr:`SHUFFLE` record with the new order of the unused cards
+    :rtype: bytes
+    """
+    cards = d_deck._cards
+    return (_SHUFFLE_RECORD.pack(SHUFFLE, record_id,
+                                 1 if d_deck._lazy_shuffle else 0, len(cards))
+            + _codes(cards))
+
+def encode_snapshot(record_id, d_deck):
+    """
+    :param int record_id: a deck id or sequence number
+    :param d_deck: a :class:`deck_of_cards.deck.Deck`
+    :returns: a :attr:`SNAPSHOT` record of the whole deck
+    :rtype: bytes
+    """
+    cards = d_deck._cards
+    in_play_cards = d_deck._in_play_cards
+    discarded_cards = d_deck._discarded_cards
+    return (_SNAPSHOT_RECORD.pack(SNAPSHOT, record_id,
+                                  1 if d_deck._with_jokers else 0,
+                                  1 if d_deck._lazy_shuffle else 0,
+                                  len(cards), len(in_play_cards), len(discarded_cards))
+            + _codes(cards) + _codes(in_play_cards) + _codes(discarded_cards))
+
+def encode_detach(record_id):
+    """
+    :param int record_id: a deck id or sequence number
+    :returns: a :attr:`DETACH` record
+    :rtype: bytes
+    """
+    return _DETACH_RECORD.pack(DETACH, record_id)
+
+def decode(data, offset=0):
+    """Decode the record starting at `offset`
+
+    The value is a card code for :attr:`DEAL` and :attr:`DISCARD`, a
+    (lazy, codes) pair for :attr:`SHUFFLE`, a new
+    :class:`deck_of_cards.deck.Deck` for :attr:`SNAPSHOT` and None for
+    :attr:`DETACH`.
+
+    Raises a ValueError for an unknown record type.
+
+    :param bytes data: records
+    :param int offset: start of the record in `data`
+    :returns: (record type, id, value, offset of the next record), or None if
+              `data` ends before the record does
+    :rtype: tuple
+    :raises: ValueError
+    """
+    record_type = data[offset:offset + 1]
+
+    if record_type in (DEAL, DISCARD):
+        end = offset + _CARD_RECORD.size
+        if end > len(data):
+            return None
+        _, record_id, code = _CARD_RECORD.unpack_from(data, offset)
+        return record_type, record_id, code, end
+
+    elif SHUFFLE == record_type:
+        start = offset + _SHUFFLE_RECORD.size
+        if start > len(data):
+            return None
+        _, record_id, lazy, length = _SHUFFLE_RECORD.unpack_from(data, offset)
+        end = start + length
+        if end > len(data):
+            return None
+        return record_type, record_id, (bool(lazy), data[start:end]), end
+
+    elif SNAPSHOT == record_type:
+        start = offset + _SNAPSHOT_RECORD.size
+        if start > len(data):
+            return None
+        (_, record_id, with_jokers, lazy, cards_length, in_play_length,
+         discarded_length) = _SNAPSHOT_RECORD.unpack_from(data, offset)
+        if start + cards_length + in_play_length + discarded_length > len(data):
+            return None
+
+        d_deck = deck.Deck(bool(with_jokers))
+        d_deck._lazy_shuffle = bool(lazy)
+        for pile_name, length in (('_cards', cards_length),
+                                  ('_in_play_cards', in_play_length),
+                                  ('_discarded_cards', discarded_length)):
+            setattr(d_deck, pile_name, _pile(data[start:start + length]))
+            start += length
+        d_deck._recount()
+        return record_type, record_id, d_deck, start
+
+    elif DETACH == record_type:
+        end = offset + _DETACH_RECORD.size
+        if end > len(data):
+            return None
+        _, record_id = _DETACH_RECORD.unpack_from(data, offset)
+        return record_type, record_id, None, end
+
+    elif not record_type:
+        return None
+
+    raise ValueError("Unknown record type %r." % record_type)
+
+def apply(d_deck, record_type, value):
+    """Replay a :attr:`DEAL`, :attr:`DISCARD` or :attr:`SHUFFLE` record on
+    `d_deck`, without telling its listeners
+
+    Raises a ValueError when the record moves a card the deck does not have in
+    the right pile.
+
+    :param d_deck: a :class:`deck_of_cards.deck.Deck`
+    :param bytes record_type: the record type from :func:`decode`
+    :param value: the value from :func:`decode`
+    :raises: ValueError
+    """
+    if SHUFFLE == record_type:
+        lazy, codes = value
+        d_deck._lazy_shuffle = lazy
+        d_deck._cards = _pile(codes)
+        d_deck._recount()
+        return
+
+    c_card = card.from_code(value)
+    if DEAL == record_type:
+        # the last matching card, a lazy deal may take either joker
+        source, destination = d_deck._cards, d_deck._in_play_cards
+        index = None
+        for i in xrange(len(source) - 1, -1, -1):
+            if source[i] == c_card:
+                index = i
+                break
+    elif DISCARD == record_type:
+        source, destination = d_deck._in_play_cards, d_deck._discarded_cards
+        index = source.index(c_card) if c_card in source else None
+    else:
+        raise ValueError("Record type %r cannot be applied to a deck." % record_type)
+
+    if index is None:
+        raise ValueError("The record moves %s which the deck does not have." % c_card)
+    destination.append(source.pop(index))
+    if DEAL == record_type:
+        d_deck._count_out(c_card)
@@ -0,0 +1,160 @@
+#!/usr/bin/python
+"""This module mirrors a :class:`deck_of_cards.deck.Deck` from a primary
+process to read-only observers.
+
+A :class:`DeckReplicator` listens to the primary deck and sends every change
+as a :mod:`deck_of_cards.records` record whose id is a sequence number. A deal
+or a discard takes 6 bytes. A :class:`DeckReplica` applies the records. When
+a sequence number is missing it stops applying changes until it gets a
+snapshot, which the primary sends with :meth:`DeckReplicator.send_snapshot`.
+
+Records are self-delimiting, so they can be sent as separate messages (like
+:meth:`multiprocessing.Connection.send_bytes`) or written to a byte stream
+(like :meth:`socket.socket.sendall`) and fed to the replica in any chunks.
+"""
+
+import deck_of_cards.records as records
+
+#: sequence numbers wrap around at this value
+SEQUENCE_RANGE = 1 << 32
+
+class DeckReplicator(object):
+    """A DeckReplicator object
+
+    Sends a snapshot of the deck when it is created, then a record for every
+    change to it.
+    """
+
+    #: the primary :class:`deck_of_cards.deck.Deck`
+    _deck = None
+
+    #: a callable which sends bytes to the replicas
+    _send = None
+
+    #: the sequence number of the next record
+    _sequence = 0
+
+    def __init__(self, d_deck, send):
+        """
+        :param d_deck: the primary :class:`deck_of_cards.deck.Deck`
+        :param send: a callable which takes the bytes of a record and sends
+                     them to the replicas
+        """
+        self._deck = d_deck
+        self._send = send
+        self._sequence = 0
+
+        d_deck.add_listener(self)
+        self.send_snapshot()
+
+    def _next_sequence(self):
+        """
+        :returns: the sequence number for a new record
+        :rtype: int
+        """
+        sequence = self._sequence
+        self._sequence = (sequence + 1) % SEQUENCE_RANGE
+        return sequence
+
+    def send_snapshot(self):
+        """Send the whole deck, so that replicas which missed a record can
+        resynchronize
+        """
+        self._send(records.encode_snapshot(self._next_sequence(), self._deck))
+
+    def deck_dealt(self, d_deck, c_card):
+        """Listener method, see :meth:`deck_of_cards.deck.Deck.add_listener`
+        """
+        self._send(records.encode_deal(self._next_sequence(), c_card))
+
+    def deck_discarded(self, d_deck, c_card):
+        """Listener method, see :meth:`deck_of_cards.deck.Deck.add_listener`
+        """
+        self._send(records.encode_discard(self._next_sequence(), c_card))
+
+    def deck_shuffled(self, d_deck):
+        """Listener method, see :meth:`deck_of_cards.deck.Deck.add_listener`
+        """
+        self._send(records.encode_shuffle(self._next_sequence(), d_deck))
+
+    def close(self):
+        """Stop sending changes
+        """
+        self._deck.remove_listener(self)
+
+class DeckReplica(object):
+    """A DeckReplica object
+
+    Holds a copy of the primary deck, built from the records fed to it.
+    """
+
+    #: the replicated :class:`deck_of_cards.deck.Deck`, None before the first
+    #: snapshot
+    _deck = None
+
+    #: the sequence number of the record expected next
+    _expected_sequence = 0
+
+    #: a boolean which is True when records are missing and a snapshot is needed
+    _stale = True
+
+    #: received bytes which do not make up a whole record yet
+    _buffer = b''
+
+    def __init__(self):
+        self._deck = None
+        self._expected_sequence = 0
+        self._stale = True
+        self._buffer = b''
+
+    def feed(self, data):
+        """Apply every complete record in `data`, keeping a partial record at
+        the end for the next call
+
+        :param bytes data: bytes received from a :class:`DeckReplicator`
+        :returns: number of records applied
+        :rtype: int
+        """
+        buf = self._buffer + data
+        offset = 0
+        applied = 0
+
+        while True:
+            decoded = records.decode(buf, offset)
+            if decoded is None:
+                break
+            record_type, sequence, value, offset = decoded
+
+            if records.SNAPSHOT == record_type:
+                self._deck = value
+                self._stale = False
+            elif self._stale:
+                continue
+            elif sequence != self._expected_sequence:
+                # a gap, ignore everything until the next snapshot
+                self._stale = True
+                continue
+            else:
+                records.apply(self._deck, record_type, value)
+
+            self._expected_sequence = (sequence + 1) % SEQUENCE_RANGE
+            applied += 1
+
+        self._buffer = buf[offset:]
+        return applied
+
+    def needs_snapshot(self):
+        """
+        :returns: True if records were missed and the replica waits for a
+                  snapshot
+        :rtype: bool
+        """
+        return self._stale
+
+    def get_deck(self):
+        """The deck must not be changed, it is updated by :meth:`feed`
+
+        :returns: the replicated deck, None before the first snapshot
+        :rtype: :class:`deck_of_cards.deck.Deck`
+        """
+        return self._deck
@@ -0,0 +1,491 @@
+#!/usr/bin/python
+"""This module provides the :class:`TableScheduler` object, which owns the
+decks of many tables and runs the operations queued for them in batches.
+
+Operations are queued with :meth:`TableScheduler.deal`,
+:meth:`TableScheduler.discard` and :meth:`TableScheduler.shuffle`, and run by
+:meth:`TableScheduler.tick`. Within a tick, the consecutive operations of the
+same kind on a table are coalesced:
+
+* deals move all their cards from the unused to the dealt pile with one slice
+* discards move all their cards to the discarded pile with one pass over the
+  dealt pile
+* shuffles are done once, as a shuffle of a shuffled deck is a shuffle
+
+:attr:`deck_of_cards.deck.LOGGER` gets the same records as from the deck
+methods. Decks which need per-card work (with listeners like a
+:class:`deck_of_cards.journal.DeckJournal`, which must see each card move
+before the next one, with :class:`deck_of_cards.metrics.DeckMetrics`
+attached, lazily shuffled, or a subclass like
+:class:`deck_of_cards.shared.SharedDeck`) and batches which would fail run
+one operation at a time, so the outcome is always the same as calling the
+deck methods in order.
+
+With `workers` > 1, a tick hands the tables to a thread pool, partitioned by
+:func:`partition`, so that each deck is only touched by one thread. To spread
+tables over processes, run one scheduler per process on its own
+``partition(table_ids, processes)`` share.
+"""
+
+import logging
+import multiprocessing.pool
+import numbers
+import timeit
+import zlib
+
+import deck_of_cards.deck as deck
+
+#: queued operation kinds
+DEAL = 'deal'
+DISCARD = 'discard'
+SHUFFLE = 'shuffle'
+
+#: a clock suitable for measuring short intervals
+_timer = timeit.default_timer
+
+def partition(table_ids, partitions):
+    """Split tables into `partitions` shares by table id, so the same table
+    always lands in the same share, in any process. Integer ids are shared
+    out by value, and other ids by the CRC-32 of their :func:`repr`, which
+    unlike :func:`hash` of a string is not randomized per process.
+
+    :param table_ids: an iterable of hashable table ids
+    :param int partitions: number of shares
+    :returns: `partitions` arrays of table ids
+    :rtype: list
+    :raises: ValueError
+    """
+    if partitions < 1:
+        raise ValueError("partitions must be at least 1, not %s" % partitions)
+
+    shares = [[] for _ in xrange(partitions)]
+    for table_id in table_ids:
+        shares[_stable_hash(table_id) % partitions].append(table_id)
+    return shares
+
+def _stable_hash(table_id):
+    """
+    :param table_id: a table id
+    :returns: a non-negative hash of the id which is the same in every process
+    :rtype: int
+    """
+    if isinstance(table_id, numbers.Integral):
+        return abs(table_id)
+    return zlib.crc32(repr(table_id).encode('utf-8')) & 0xffffffff
+
+def _is_batchable(d_deck):
+    """
+    :param d_deck: a :class:`deck_of_cards.deck.Deck`
+    :returns: True if pile moves can be batched on the deck
+    :rtype: bool
+    """
+    return (type(d_deck) is deck.Deck
+            and not d_deck._listeners
+            and d_deck._metrics is None
+            and not d_deck._lazy_shuffle)
+
+def _deal_batch(d_deck, count):
+    """Deal `count` cards with a single pile move
+
+    :param d_deck: a :class:`deck_of_cards.deck.Deck`
+    :param int count: number of cards
+    :returns: the dealt cards in dealing order, or None when the deck cannot
+              be batched or has too few cards, in which case it is untouched
+    :rtype: list
+    """
+    cards = d_deck._cards
+    if not _is_batchable(d_deck) or count > len(cards):
+        return None
+
+    left = len(cards)
+    dealt_cards = cards[left - count:]
+    dealt_cards.reverse()
+    del cards[left - count:]
+    d_deck._in_play_cards.extend(dealt_cards)
+
+    # the logging levels are checked once per batch instead of once per card
+    debug = deck.LOGGER.isEnabledFor(logging.DEBUG)
+    info = deck.LOGGER.isEnabledFor(logging.INFO)
+    count_out = d_deck._count_out
+    for deal_card in dealt_cards:
+        if debug:
+            deck.LOGGER.debug("Number of cards left : %d", left)
+            left -= 1
+        count_out(deal_card)
+        if info:
+            deck.LOGGER.info("Dealing : %s", deal_card)
+
+    return dealt_cards
+
+def _discard_batch(d_deck, cards):
+    """Discard `cards` with a single pass over the dealt cards
+
+    :param d_deck: a :class:`deck_of_cards.deck.Deck`
+    :param list cards: :class:`deck_of_cards.card.Card` objects
+    :returns: False when the deck cannot be batched or some cards are not
+              dealt, in which case it is untouched
+    :rtype: bool
+    """
+    if not _is_batchable(d_deck):
+        return False
+
+    # how many of each (rank, suit) pair to take, the oldest first like
+    # Deck.discard. Pairs hash and compare without calling Card methods
+    wanted = {}
+    for discard_card in cards:
+        rank_suit = (discard_card._rank, discard_card._suit)
+        wanted[rank_suit] = wanted.get(rank_suit, 0) + 1
+
+    kept_cards = []
+    for in_play_card in d_deck._in_play_cards:
+        rank_suit = (in_play_card._rank, in_play_card._suit)
+        if wanted.get(rank_suit):
+            wanted[rank_suit] -= 1
+        else:
+            kept_cards.append(in_play_card)
+
+    if any(wanted.values()):
+        return False
+
+    d_deck._in_play_cards[:] = kept_cards
+    d_deck._discarded_cards.extend(cards)
+    if deck.LOGGER.isEnabledFor(logging.INFO):
+        for discard_card in cards:
+            deck.LOGGER.info("Discarding %s", discard_card)
+    return True
+
+class TableScheduler(object):
+    """A TableScheduler object
+
+    Owns a :class:`deck_of_cards.deck.Deck` per table id. Queue operations
+    and call :meth:`tick` to run them. Queueing and ticking must happen on the
+    same thread. With `workers` > 1, listeners shared by several decks must be
+    thread-safe.
+    """
+
+    #: a dictionary of table id to :class:`deck_of_cards.deck.Deck`
+    _tables = {}
+
+    #: a dictionary of table id to an array of queued
+    #: (kind, argument, queued time) operations
+    _queues = {}
+
+    #: number of threads a tick runs on
+    _workers = 1
+
+    #: the :class:`multiprocessing.pool.ThreadPool` of the workers, None for a
+    #: single worker
+    _pool = None
+
+    #: number of ticks run
+    _ticks = 0
+
+    #: number of operations run
+    _operations = 0
+
+    #: number of batches the operations were coalesced into
+    _batches = 0
+
+    #: seconds spent in :meth:`tick`
+    _busy_seconds = 0.0
+
+    #: sum of the seconds operations waited in a queue
+    _latency_sum = 0.0
+
+    #: longest seconds an operation waited in a queue
+    _latency_max = 0.0
+
+    def __init__(self, workers=1):
+        """
+        :param int workers: number of threads a tick runs on
+        :raises: ValueError
+        """
+        if workers < 1:
+            raise ValueError("workers must be at least 1, not %s" % workers)
+
+        self._tables = {}
+        self._queues = {}
+        self._workers = workers
+        self._pool = multiprocessing.pool.ThreadPool(workers) if workers > 1 else None
+        self.reset_stats()
+
+    def add_table(self, table_id, d_deck=None, with_jokers=True):
+        """
+        Raises a ValueError when the table already exists.
+
+        :param table_id: a hashable table id
+        :param d_deck: the :class:`deck_of_cards.deck.Deck` of the table, a
+                       new one if None
+        :param bool with_jokers: include jokers in a new deck if True
+        :returns: the deck of the table
+        :rtype: :class:`deck_of_cards.deck.Deck`
+        :raises: ValueError
+        """
+        if table_id in self._tables:
+            raise ValueError("Table %r already exists." % (table_id,))
+        if d_deck is None:
+            d_deck = deck.Deck(with_jokers)
+        self._tables[table_id] = d_deck
+        return d_deck
+
+    def remove_table(self, table_id):
+        """Remove a table and drop its queued operations
+
+        :param table_id: an existing table id
+        :returns: the deck of the table
+        :rtype: :class:`deck_of_cards.deck.Deck`
+        :raises: ValueError
+        """
+        d_deck = self.get_deck(table_id)
+        del self._tables[table_id]
+        self._queues.pop(table_id, None)
+        return d_deck
+
+    def get_deck(self, table_id):
+        """
+        Raises a ValueError for an unknown table.
+
+        :param table_id: an existing table id
+        :returns: the deck of the table
+        :rtype: :class:`deck_of_cards.deck.Deck`
+        :raises: ValueError
+        """
+        try:
+            return self._tables[table_id]
+        except KeyError:
+            raise ValueError("Table %r does not exist." % (table_id,))
+
+    def _queue(self, table_id, kind, argument):
+        """
+        :param table_id: an existing table id
+        :param str kind: :attr:`DEAL`, :attr:`DISCARD` or :attr:`SHUFFLE`
+        :param argument: number of cards to deal, or cards to discard
+        :raises: ValueError
+        """
+        if table_id not in self._tables:
+            raise ValueError("Table %r does not exist." % (table_id,))
+        queue = self._queues.get(table_id)
+        if queue is None:
+            queue = self._queues[table_id] = []
+        queue.append((kind, argument, _timer()))
+
+    def deal(self, table_id, count=1):
+        """Queue dealing `count` cards at a table
+
+        :param table_id: an existing table id
+        :param int count: number of cards
+        :raises: ValueError
+        """
+        if count < 1:
+            raise ValueError("count must be at least 1, not %s" % count)
+        self._queue(table_id, DEAL, count)
+
+    def discard(self, table_id, cards):
+        """Queue discarding cards at a table
+
+        :param table_id: an existing table id
+        :param array cards: an array of :class:`deck_of_cards.card.Card`
+                            objects or a single :class:`deck_of_cards.card.Card`
+        :raises: ValueError
+        """
+        if not isinstance(cards, list):
+            cards = [cards]
+        self._queue(table_id, DISCARD, cards)
+
+    def shuffle(self, table_id):
+        """Queue shuffling the unused cards of a table
+
+        :param table_id: an existing table id
+        :raises: ValueError
+        """
+        self._queue(table_id, SHUFFLE, None)
+
+    def queued(self):
+        """
+        :returns: number of operations waiting for the next :meth:`tick`
+        :rtype: int
+        """
+        return sum(len(queue) for queue in self._queues.values())
+
+    def tick(self):
+        """Run every queued operation
+
+        An operation which raises does not stop the others, its exception
+        object is returned in place of its result. The operations of a deck
+        with listeners run one at a time, so a listener which raises only
+        fails its own operation, and the cards already moved stay moved, as
+        with :meth:`deck_of_cards.deck.Deck.deal`.
+
+        :returns: a dictionary of table id to an array with the result of each
+                  operation queued for the table, in order: the dealt cards
+                  for a deal, None for a discard or a shuffle
+        :rtype: dict
+        """
+        start = _timer()
+        queues, self._queues = self._queues, {}
+
+        if self._pool is None or len(queues) < 2:
+            shares = [list(queues.items())]
+        else:
+            shares = [[(table_id, queues[table_id]) for table_id in share]
+                      for share in partition(queues, self._workers)]
+        shares = [(self._tables, share) for share in shares if share]
+
+        if self._pool is None:
+            share_results = [_run_share(share) for share in shares]
+        else:
+            share_results = self._pool.map(_run_share, shares)
+
+        end = _timer()
+        results = {}
+        for share_result, operations, batches, latency_sum, latency_max in share_results:
+            results.update(share_result)
+            self._operations += operations
+            self._batches += batches
+            self._latency_sum += latency_sum
+            self._latency_max = max(self._latency_max, latency_max)
+
+        self._ticks += 1
+        self._busy_seconds += end - start
+        return results
+
+    def reset_stats(self):
+        """Set every stat back to zero
+        """
+        self._ticks = 0
+        self._operations = 0
+        self._batches = 0
+        self._busy_seconds = 0.0
+        self._latency_sum = 0.0
+        self._latency_max = 0.0
+
+    def get_stats(self):
+        """The dictionary has the keys:
+
+        * ``'tables'``, number of tables
+        * ``'queued'``, number of operations waiting for the next tick
+        * ``'ticks'``, number of ticks run
+        * ``'operations'``, number of operations run
+        * ``'batches'``, number of batches the operations were coalesced into
+        * ``'busy_seconds'``, seconds spent in :meth:`tick`
+        * ``'operations_per_second'``, operations run per busy second
+        * ``'mean_queue_latency'``, mean seconds from queueing an operation
+          to the end of its batch
+        * ``'max_queue_latency'``, longest of those
+
+        :returns: a dictionary of stat name to value
+        :rtype: dict
+        """
+        operations = self._operations
+        return {
+            'tables' : len(self._tables),
+            'queued' : self.queued(),
+            'ticks' : self._ticks,
+            'operations' : operations,
+            'batches' : self._batches,
+            'busy_seconds' : self._busy_seconds,
+            'operations_per_second' : (operations / self._busy_seconds
+                                       if self._busy_seconds else 0.0),
+            'mean_queue_latency' : self._latency_sum / operations if operations else 0.0,
+            'max_queue_latency' : self._latency_max,
+        }
+
+    def close(self):
+        """Stop the worker threads
+        """
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+def _run_share(share):
+    """Run the queued operations of some tables
+
+    :param tuple share: the dictionary of table id to deck, and an array of
+                        (table id, queued operations) pairs
+    :returns: (dictionary of table id to results, number of operations,
+              number of batches, sum of queue latencies, longest queue latency)
+    :rtype: tuple
+    """
+    tables, queues = share
+    results = {}
+    operations = batches = 0
+    latency_sum = latency_max = 0.0
+
+    for table_id, queue in queues:
+        d_deck = tables[table_id]
+        table_results = results[table_id] = []
+        index = 0
+        while index < len(queue):
+            # coalesce the run of operations of the same kind
+            kind = queue[index][0]
+            end = index + 1
+            while end < len(queue) and queue[end][0] == kind:
+                end += 1
+            batch = queue[index:end]
+
+            try:
+                table_results.extend(_run_batch(d_deck, kind, batch))
+            except Exception as error:
+                table_results.extend([error] * len(batch))
+
+            done = _timer()
+            for _, _, queued_time in batch:
+                latency = done - queued_time
+                latency_sum += latency
+                if latency > latency_max:
+                    latency_max = latency
+
+            operations += len(batch)
+            batches += 1
+            index = end
+
+    return results, operations, batches, latency_sum, latency_max
+
+def _run_batch(d_deck, kind, batch):
+    """Run a run of queued operations of the same kind on the deck
+
+    :param d_deck: a :class:`deck_of_cards.deck.Deck`
+    :param str kind: :attr:`DEAL`, :attr:`DISCARD` or :attr:`SHUFFLE`
+    :param list batch: the queued (kind, argument, queued time) operations
+    :returns: the result of each operation, see :meth:`TableScheduler.tick`
+    :rtype: list
+    """
+    if DEAL == kind:
+        counts = [argument for _, argument, _ in batch]
+        dealt_cards = _deal_batch(d_deck, sum(counts))
+        if dealt_cards is None:
+            return [_run_one(d_deck, kind, count) for count in counts]
+
+        batch_results = []
+        position = 0
+        for count in counts:
+            batch_results.append(dealt_cards[position:position + count])
+            position += count
+        return batch_results
+    elif DISCARD == kind:
+        if _discard_batch(d_deck, [discard_card for _, argument, _ in batch
+                                   for discard_card in argument]):
+            return [None] * len(batch)
+        return [_run_one(d_deck, kind, argument) for _, argument, _ in batch]
+    else:
+        return [_run_one(d_deck, kind, None)] + [None] * (len(batch) - 1)
+
+def _run_one(d_deck, kind, argument):
+    """Run a single operation on the deck, one card at a time
+
+    :param d_deck: a :class:`deck_of_cards.deck.Deck`
+    :param str kind: :attr:`DEAL`, :attr:`DISCARD` or :attr:`SHUFFLE`
+    :param argument: number of cards to deal, or cards to discard
+    :returns: the result of the operation or the exception it raised, see
+              :meth:`TableScheduler.tick`
+    """
+    try:
+        if DEAL == kind:
+            return [d_deck.deal() for _ in xrange(argument)]
+        elif DISCARD == kind:
+            d_deck.discard(argument)
+        else:
+            d_deck.shuffle()
+    except Exception as error:
+        return error
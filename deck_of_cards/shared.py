@@ -0,0 +1,432 @@
+#!/usr/bin/python
+"""This module provides the :class:`SharedDeckStore` object, which keeps many
+decks in one block of shared memory, and the :class:`SharedDeck` view which
+works on a single deck of the store in place.
+
+Each deck lives in a fixed-width slot of :attr:`SLOT_WIDTH` bytes::
+
+    [with_jokers, cards_end, in_play_end, code, code, ..., count, count, ...]
+
+The codes (see :meth:`deck_of_cards.card.Card.get_code`) are split into the
+three piles by the two boundaries:
+
+* ``codes[:cards_end]`` are the unused cards, the last one is dealt next
+* ``codes[cards_end:in_play_end]`` are the dealt cards, newest first
+* ``codes[in_play_end:]`` are the discarded cards, newest first
+
+The :attr:`SLOT_COUNTS` count bytes after the codes hold the remaining
+counts of the unused cards: one per card code, then one per rank, then one
+per suit. Dealing only moves the ``cards_end`` boundary and takes the card
+out of the counts, and discarding moves a single code, so neither copies or
+pickles a deck.
+
+Pass the store to :class:`multiprocessing.Process` (or to a
+:class:`multiprocessing.Pool` initializer) when the worker is created. The
+worker then shares the same memory and locks as the parent.
+"""
+
+import contextlib
+import multiprocessing
+import multiprocessing.sharedctypes
+
+import deck_of_cards.card as card
+import deck_of_cards.deck as deck
+
+#: number of header bytes at the start of each slot
+SLOT_HEADER = 3
+
+#: number of card codes a slot can hold, a deck with jokers
+SLOT_CARDS = 2 + 4 * 13
+
+#: number of remaining count bytes after the codes of each slot
+SLOT_COUNTS = card.NUMBER_OF_CODES + len(deck._RANKS) + len(deck._SUITS)
+
+#: number of bytes used by each slot
+SLOT_WIDTH = SLOT_HEADER + SLOT_CARDS + SLOT_COUNTS
+
+#: the most locks a store creates. Each lock is an OS semaphore, so slots share
+#: a fixed number of locks instead of taking one each
+LOCK_STRIPES = 64
+
+#: header offset of the with_jokers flag
+_WITH_JOKERS = 0
+
+#: header offset of the end of the unused cards
+_CARDS_END = 1
+
+#: header offset of the end of the dealt cards
+_IN_PLAY_END = 2
+
+#: offsets of the code, rank and suit counts from the first code of a slot
+_CODE_COUNTS = SLOT_CARDS
+_RANK_COUNTS = _CODE_COUNTS + card.NUMBER_OF_CODES
+_SUIT_COUNTS = _RANK_COUNTS + len(deck._RANKS)
+
+#: an array of the three count offsets of each card code
+_COUNT_OFFSETS_BY_CODE = [(_CODE_COUNTS + code, _RANK_COUNTS + rank,
+                           _SUIT_COUNTS + deck._SUITS.index(suit))
+                          for code, (rank, suit) in enumerate(card._RANK_SUIT_BY_CODE)]
+
+def _new_deck_codes(with_jokers):
+    """
+    :param bool with_jokers: include jokers if True
+    :returns: the codes of a new, ordered deck
+    :rtype: list
+    """
+    codes = list(range(1, card.NUMBER_OF_CODES))
+    if with_jokers:
+        codes = [card.JOKER_CODE, card.JOKER_CODE] + codes
+    return codes
+
+def _count_codes(codes):
+    """
+    :param list codes: the codes of the unused cards
+    :returns: the :attr:`SLOT_COUNTS` count bytes of the codes
+    :rtype: list
+    """
+    counts = [0] * SLOT_COUNTS
+    for code in codes:
+        for offset in _COUNT_OFFSETS_BY_CODE[code]:
+            counts[offset - SLOT_CARDS] += 1
+    return counts
+
+class SharedDeckStore(object):
+    """A SharedDeckStore object
+
+    Holds `slots` decks in shared memory. Every slot starts out as a new,
+    ordered deck. Slot `slot` is guarded by lock ``slot % locks``, so a
+    worker may hold the locks of several slots, but workers which do should
+    take them in the same order.
+    """
+
+    #: number of decks in the store
+    _slots = 0
+
+    #: a shared array of `_slots` * :attr:`SLOT_WIDTH` unsigned bytes
+    _buffer = None
+
+    #: an array of :func:`multiprocessing.RLock` objects shared by the slots,
+    #: reentrant so that a worker can hold two slots of the same lock
+    _locks = []
+
+    def __init__(self, slots, with_jokers=True, locks=None):
+        """
+        :param int slots: number of decks in the store
+        :param bool with_jokers: include jokers in the initial decks if True
+        :param int locks: number of locks guarding the slots, the smaller of
+                          `slots` and :attr:`LOCK_STRIPES` if None
+        :raises: ValueError
+        """
+        if slots < 1:
+            raise ValueError("A SharedDeckStore needs at least 1 slot, not %s" % slots)
+        if locks is None:
+            locks = min(slots, LOCK_STRIPES)
+        if locks < 1:
+            raise ValueError("A SharedDeckStore needs at least 1 lock, not %s" % locks)
+
+        self._slots = slots
+        self._buffer = multiprocessing.sharedctypes.RawArray('B', slots * SLOT_WIDTH)
+        self._locks = [multiprocessing.RLock() for _ in range(locks)]
+
+        for slot in range(slots):
+            self.reset(slot, with_jokers)
+
+    def __len__(self):
+        """
+        :returns: number of decks in the store
+        :rtype: int
+        """
+        return self._slots
+
+    def _offset(self, slot):
+        """
+        :param int slot: a slot index
+        :returns: index of the slot's first byte in :attr:`_buffer`
+        :rtype: int
+        :raises: IndexError
+        """
+        if not 0 <= slot < self._slots:
+            raise IndexError("Slot %s is not in [0, %d)." % (slot, self._slots))
+        return slot * SLOT_WIDTH
+
+    def reset(self, slot, with_jokers=True):
+        """Replace the deck in `slot` with a new, ordered deck
+
+        :param int slot: a slot index
+        :param bool with_jokers: include jokers if True
+        """
+        codes = _new_deck_codes(with_jokers)
+        self._write(slot, with_jokers, codes, len(codes), len(codes))
+
+    def load(self, slot, d_deck):
+        """Copy a :class:`deck_of_cards.deck.Deck` into `slot`
+
+        :param int slot: a slot index
+        :param d_deck: the :class:`deck_of_cards.deck.Deck` to copy
+        """
+        codes = [c_card.get_code() for c_card in d_deck._cards]
+        cards_end = len(codes)
+        codes.extend(c_card.get_code() for c_card in reversed(d_deck._in_play_cards))
+        in_play_end = len(codes)
+        codes.extend(c_card.get_code() for c_card in reversed(d_deck._discarded_cards))
+        self._write(slot, d_deck._with_jokers, codes, cards_end, in_play_end)
+
+    def _write(self, slot, with_jokers, codes, cards_end, in_play_end):
+        """Overwrite a whole slot
+
+        :param int slot: a slot index
+        :param bool with_jokers: the deck includes jokers if True
+        :param list codes: all the card codes of the deck
+        :param int cards_end: boundary of the unused cards
+        :param int in_play_end: boundary of the dealt cards
+        """
+        offset = self._offset(slot)
+        self._buffer[offset + _WITH_JOKERS] = 1 if with_jokers else 0
+        self._buffer[offset + _CARDS_END] = cards_end
+        self._buffer[offset + _IN_PLAY_END] = in_play_end
+        start = offset + SLOT_HEADER
+        self._buffer[start:start + len(codes)] = codes
+        self._buffer[start + SLOT_CARDS:start + SLOT_CARDS + SLOT_COUNTS] = \
+            _count_codes(codes[:cards_end])
+
+    def deck(self, slot):
+        """Get a view over `slot` without taking its lock. Use :meth:`locked`
+        when other processes may touch the same slot.
+
+        :param int slot: a slot index
+        :returns: a view working on the shared memory in place
+        :rtype: :class:`SharedDeck`
+        """
+        return SharedDeck(self, slot)
+
+    def to_deck(self, slot):
+        """
+        :param int slot: a slot index
+        :returns: a private copy of the deck in `slot`
+        :rtype: :class:`deck_of_cards.deck.Deck`
+        """
+        shared_deck = self.deck(slot)
+        new_deck = deck.Deck(shared_deck._with_jokers)
+        new_deck._cards = shared_deck._cards
+        new_deck._in_play_cards = shared_deck._in_play_cards
+        new_deck._discarded_cards = shared_deck._discarded_cards
+        new_deck._recount()
+        return new_deck
+
+    def lock(self, slot):
+        """
+        :param int slot: a slot index
+        :returns: the lock which guards `slot`, shared with the other slots
+                  of the same stripe
+        """
+        self._offset(slot)
+        return self._locks[slot % len(self._locks)]
+
+    @contextlib.contextmanager
+    def locked(self, slot):
+        """Context manager which holds the lock of `slot` and yields a view
+        over it, so no other worker can change the deck meanwhile
+
+        :param int slot: a slot index
+        :returns: a view working on the shared memory in place
+        :rtype: :class:`SharedDeck`
+        """
+        with self.lock(slot):
+            yield self.deck(slot)
+
+class SharedDeck(deck.Deck):
+    """A SharedDeck object
+
+    A :class:`deck_of_cards.deck.Deck` whose piles live in a slot of a
+    :class:`SharedDeckStore`. The pile attributes are rebuilt from the slot on
+    every access, so they are read-only copies.
+    """
+
+    #: the store that holds the deck
+    _store = None
+
+    #: the slot that holds the deck
+    _slot = 0
+
+    #: index of the slot's first code in the store's buffer
+    _start = 0
+
+    def __init__(self, store, slot):
+        """
+        :param store: a :class:`SharedDeckStore`
+        :param int slot: a slot index
+        :raises: IndexError
+        """
+        self._store = store
+        self._slot = slot
+        self._start = store._offset(slot) + SLOT_HEADER
+
+    def _header(self, index):
+        """
+        :param int index: a header offset
+        :returns: the header byte
+        :rtype: int
+        """
+        return self._store._buffer[self._start - SLOT_HEADER + index]
+
+    def _set_header(self, index, value):
+        """
+        :param int index: a header offset
+        :param int value: the new header byte
+        """
+        self._store._buffer[self._start - SLOT_HEADER + index] = value
+
+    def _codes(self, begin, end):
+        """
+        :returns: the codes between two positions of the slot
+        :rtype: list
+        """
+        return self._store._buffer[self._start + begin:self._start + end]
+
+    def _pile(self, begin, end, newest_first):
+        """
+        :returns: :class:`deck_of_cards.card.Card` objects in :class:`Deck` order
+        :rtype: list
+        """
+        codes = self._codes(begin, end)
+        if newest_first:
+            codes.reverse()
+        return [card.from_code(code) for code in codes]
+
+    @property
+    def _with_jokers(self):
+        return bool(self._header(_WITH_JOKERS))
+
+    @property
+    def _cards(self):
+        return self._pile(0, self._header(_CARDS_END), False)
+
+    @property
+    def _in_play_cards(self):
+        return self._pile(self._header(_CARDS_END), self._header(_IN_PLAY_END), True)
+
+    @property
+    def _discarded_cards(self):
+        return self._pile(self._header(_IN_PLAY_END), self._size(), True)
+
+    # the remaining counts are read from the count bytes of the slot, which
+    # every deal keeps up to date, in any process
+
+    @property
+    def _code_counts(self):
+        return self._codes(_CODE_COUNTS, _RANK_COUNTS)
+
+    @property
+    def _rank_counts(self):
+        return self._codes(_RANK_COUNTS, _SUIT_COUNTS)
+
+    @property
+    def _suit_counts(self):
+        return dict(zip(deck._SUITS,
+                        self._codes(_SUIT_COUNTS, _SUIT_COUNTS + len(deck._SUITS))))
+
+    def _size(self):
+        """
+        :returns: number of cards in the deck
+        :rtype: int
+        """
+        return SLOT_CARDS if self._header(_WITH_JOKERS) else SLOT_CARDS - 2
+
+    def _shuffle(self, top_k=None, lazy=False):
+        """Shuffle the unused cards in place. A slot has no room for the lazy
+        flag, so a lazy shuffle shuffles every unused card right away, which
+        deals the cards with the same distribution.
+        """
+        if top_k is not None:
+            if lazy:
+                raise ValueError('A shuffle cannot be both lazy and partial.')
+            if top_k < 0:
+                raise ValueError("top_k (%s) cannot be negative." % top_k)
+
+        deck.LOGGER.debug("Shuffling deck (top_k:%s, lazy:%s)", top_k, lazy)
+
+        cards_end = self._header(_CARDS_END)
+        codes = self._codes(0, cards_end)
+        deck.partial_shuffle(codes, top_k)
+        self._store._buffer[self._start:self._start + cards_end] = codes
+
+        for listener in self._listeners:
+            listener.deck_shuffled(self)
+
+    def _deal(self):
+        """Deal by moving the unused cards boundary down by one
+        """
+        cards_end = self._header(_CARDS_END)
+        deck.LOGGER.debug("Number of cards left : %d", cards_end)
+        if not cards_end:
+            raise IndexError('Trying to deal from an empty deck.')
+
+        cards_end -= 1
+        self._set_header(_CARDS_END, cards_end)
+        buf = self._store._buffer
+        code = buf[self._start + cards_end]
+        for offset in _COUNT_OFFSETS_BY_CODE[code]:
+            buf[self._start + offset] -= 1
+        deal_card = card.from_code(code)
+
+        deck.LOGGER.info("Dealing : %s", deal_card)
+
+        for listener in self._listeners:
+            listener.deck_dealt(self, deal_card)
+
+        return deal_card
+
+    def _discard(self, cards):
+        """Discard by moving each code to the front of the discarded cards
+        """
+        if not isinstance(cards, list):
+            cards = [cards]
+
+        buf = self._store._buffer
+        for discard_card in cards:
+            code = discard_card.get_code()
+            begin = self._start + self._header(_CARDS_END)
+            end = self._start + self._header(_IN_PLAY_END)
+
+            in_play_codes = buf[begin:end]
+            if code not in in_play_codes:
+                raise ValueError("%s not found in self._in_play_cards" % discard_card)
+
+            # take the oldest matching card like Deck.discard, which matters
+            # for the two equal jokers. Close the gap in the dealt cards and
+            # put the code right in front of the discarded cards
+            index = end - 1 - in_play_codes[::-1].index(code)
+            buf[index:end - 1] = buf[index + 1:end]
+            buf[end - 1] = code
+            self._set_header(_IN_PLAY_END, end - 1 - self._start)
+            deck.LOGGER.info("Discarding %s", discard_card)
+
+            for listener in self._listeners:
+                listener.deck_discarded(self, discard_card)
+
+    def is_empty(self):
+        """
+        :returns: True if deck is empty
+        :rtype: bool
+        """
+        return not self._header(_CARDS_END)
+
+    def _check_deck(self):
+        """Check the slot boundaries, codes and remaining counts
+        """
+        cards_end = self._header(_CARDS_END)
+        in_play_end = self._header(_IN_PLAY_END)
+        size = self._size()
+        if not cards_end <= in_play_end <= size:
+            return False
+
+        codes = self._codes(0, size)
+        if max(codes) >= card.NUMBER_OF_CODES:
+            return False
+
+        counts = self._codes(SLOT_CARDS, SLOT_CARDS + SLOT_COUNTS)
+        if _count_codes(codes[:cards_end]) != counts:
+            deck.LOGGER.info("The remaining counts do not match self._cards")
+            return False
+
+        return deck.check_codes(codes, self._with_jokers)
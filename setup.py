@@ -0,0 +1,60 @@
+#!/usr/bin/python
+"""Install the deck_of_cards package
+
+The C core (``deck_of_cards._core``) is optional. When it cannot be compiled,
+the install goes on and :mod:`deck_of_cards.core` runs in pure Python. Build
+it in place for the tests with ``python setup.py build_ext --inplace``.
+"""
+
+from distutils.errors import CCompilerError, DistutilsExecError, DistutilsPlatformError
+
+from setuptools import setup, Extension
+from setuptools.command.build_ext import build_ext
+
+class optional_build_ext(build_ext):
+    """A build_ext command which warns instead of failing when the C core
+    cannot be built
+    """
+
+    #: the extensions which could not be built
+    _skipped = ()
+
+    def run(self):
+        self._skipped = []
+        try:
+            build_ext.run(self)
+        except DistutilsPlatformError as error:
+            self._skip(error)
+
+    def build_extension(self, ext):
+        try:
+            build_ext.build_extension(self, ext)
+        except (CCompilerError, DistutilsExecError, DistutilsPlatformError) as error:
+            self._skip(error)
+            self._skipped.append(ext)
+
+    def copy_extensions_to_source(self):
+        # only copy the extensions which were built into the source tree
+        extensions = self.extensions
+        self.extensions = [ext for ext in extensions if ext not in self._skipped]
+        try:
+            build_ext.copy_extensions_to_source(self)
+        finally:
+            self.extensions = extensions
+
+    def _skip(self, error):
+        self.warn("The C core could not be built (%s), deck_of_cards will use"
+                  " the pure Python core." % error)
+
+setup(
+    name='deck-of-cards',
+    version='0.0.1',
+    description='A Python Implementation Of A Deck of Cards',
+    url='https://github.com/suhasgaddam/deck-of-cards-python',
+    license='MIT',
+    packages=['deck_of_cards'],
+    ext_modules=[
+        Extension('deck_of_cards._core', ['deck_of_cards/_core.c']),
+    ],
+    cmdclass={'build_ext' : optional_build_ext},
+)
@@ -0,0 +1,27 @@
+#!/usr/bin/python
+
+import os
+import sys
+file_path = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.join(file_path, './../'))
+
+import pytest
+import deck_of_cards.core as core
+import deck_of_cards.deck as deck
+
+def load_backend(name):
+    # the core module of a backend, None when it was not built
+    try:
+        return core.load_backend(name)
+    except ImportError:
+        return None
+
+@pytest.fixture(autouse=True, params=core.BACKENDS)
+def backend(request, monkeypatch):
+    # run every test once on each core, build the C core with
+    # python setup.py build_ext --inplace
+    backend_core = load_backend(request.param)
+    if backend_core is None:
+        pytest.skip("The %s core is not built." % request.param)
+    monkeypatch.setattr(deck, '_core', backend_core)
+    return backend_core
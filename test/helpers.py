@@ -0,0 +1,35 @@
+#!/usr/bin/python
+"""Helpers shared by the test modules
+"""
+
+#: chi-square critical value for 51 degrees of freedom at p = 0.001
+CHI_SQUARE_51_CRITICAL = 87.97
+
+#: chi-square critical value for 38 degrees of freedom at p = 0.001
+CHI_SQUARE_38_CRITICAL = 70.70
+
+def chi_square(counts):
+    # Pearson's statistic of counts which should all be equal
+    expected = float(sum(counts)) / len(counts)
+    return sum((count - expected) ** 2 / expected for count in counts)
+
+def pile_codes(pile):
+    return [c_card.get_code() for c_card in pile]
+
+def deck_state(d_deck):
+    # everything a restored or replicated copy of a deck must agree on
+    return (d_deck._with_jokers, d_deck._lazy_shuffle,
+            pile_codes(d_deck._cards),
+            pile_codes(d_deck._in_play_cards),
+            pile_codes(d_deck._discarded_cards),
+            d_deck.remaining_by_rank(), d_deck.remaining_by_suit())
+
+def assert_same_deck(a_deck, b_deck):
+    # same piles and counts, a SharedDeck has no room for the lazy flag
+    assert a_deck._with_jokers == b_deck._with_jokers
+    assert pile_codes(a_deck._cards) == pile_codes(b_deck._cards)
+    assert pile_codes(a_deck._in_play_cards) == pile_codes(b_deck._in_play_cards)
+    assert pile_codes(a_deck._discarded_cards) == pile_codes(b_deck._discarded_cards)
+    assert a_deck.remaining_by_rank() == b_deck.remaining_by_rank()
+    assert a_deck.remaining_by_suit() == b_deck.remaining_by_suit()
+    assert b_deck.check_deck()
@@ -113,3 +113,30 @@ def test_ineqality():
     ace_of_spades = card.Card(1, 'spades')
     ace_of_clubs = card.Card(1, 'clubs')
     assert ace_of_spades != ace_of_clubs
+
+def test_codes():
+    codes = set()
+    for suit in ('hearts', 'diamonds', 'spades', 'clubs'):
+        for rank in xrange(1, 14):
+            new_card = card.Card(rank, suit)
+            code = new_card.get_code()
+            assert 0 < code < card.NUMBER_OF_CODES
+            assert new_card == card.from_code(code)
+            assert repr(new_card) == repr(card.from_code(code))
+            codes.add(code)
+    assert card.NUMBER_OF_CODES - 1 == len(codes)
+
+    joker = card.Card(card.JOKER_RANK, card.JOKER_SUIT)
+    assert card.JOKER_CODE == joker.get_code()
+    assert card.from_code(card.JOKER_CODE).is_joker()
+
+def test_invalid_codes():
+    for code in (-1, card.NUMBER_OF_CODES, 1000):
+        with pytest.raises(ValueError):
+            card.from_code(code)
+
+def test_hash():
+    ace_of_spades_1 = card.Card(1, 'spades')
+    ace_of_spades_2 = card.Card(1, 'SPADES')
+    assert hash(ace_of_spades_1) == hash(ace_of_spades_2)
+    assert 1 == len(set([ace_of_spades_1, ace_of_spades_2]))
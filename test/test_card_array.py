@@ -0,0 +1,70 @@
+#!/usr/bin/python
+
+import os
+import sys
+file_path = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.join(file_path, './../'))
+
+import pytest
+import array
+import numpy
+import deck_of_cards.card as card
+import deck_of_cards.card_array as card_array
+import deck_of_cards.deck as deck
+
+def test_matches_cards():
+    new_deck = deck.Deck()
+    new_deck.shuffle()
+    cards = new_deck._cards
+    c_array = card_array.CardArray.from_cards(cards)
+
+    assert len(cards) == len(c_array)
+    assert [c_card.get_rank() for c_card in cards] == c_array.get_ranks().tolist()
+    assert ([card_array.SUITS.index(c_card.get_suit()) for c_card in cards]
+            == c_array.get_suits().tolist())
+    assert [c_card.is_joker() for c_card in cards] == c_array.is_joker().tolist()
+    assert [str(c_card) for c_card in cards] == c_array.to_strings().tolist()
+    assert cards == c_array.to_cards()
+    assert cards[5] == c_array[5]
+    assert cards[3:9] == c_array[3:9].to_cards()
+
+def test_zero_copy():
+    codes = array.array('B', [0, 1, 14, 27, 40])
+    c_array = card_array.CardArray(codes)
+    codes[1] = 2
+    assert card.Card(2, 'hearts') == c_array[1]
+
+    numpy_codes = numpy.array([1, 2, 3], dtype=numpy.uint8)
+    assert card_array.CardArray(numpy_codes).get_codes() is numpy_codes
+
+    c_array = card_array.CardArray(b'\x00\x01')
+    assert [True, False] == c_array.is_joker().tolist()
+
+def test_masks():
+    ace_of_hearts = card.Card(1, 'hearts')
+    joker = card.Card(card.JOKER_RANK, card.JOKER_SUIT)
+    c_array = card_array.CardArray.from_cards([ace_of_hearts, joker, card.Card(1, 'spades'), joker])
+
+    assert [False, True, False, True] == (c_array == joker).tolist()
+    assert [True, False, True, False] == (c_array != joker).tolist()
+    assert [True, True, False, False] == (c_array == [ace_of_hearts, joker, joker, ace_of_hearts]).tolist()
+    assert [True, True, False, True] == c_array.isin([joker, ace_of_hearts]).tolist()
+    assert [False, True, False, True] == c_array.isin(joker).tolist()
+
+    # masks select cards
+    assert [joker, joker] == c_array[c_array.is_joker()].to_cards()
+    assert [1, 1] == c_array.get_ranks()[c_array.get_ranks() == 1].tolist()
+
+def test_bad_arguments():
+    with pytest.raises(ValueError):
+        card_array.CardArray(bytearray([1, card.NUMBER_OF_CODES]))
+    # wider codes are checked before they are cast to uint8
+    for codes in [[256, 257, 300], [1, -1], [[1], [card.NUMBER_OF_CODES]], [1.7], [True]]:
+        with pytest.raises(ValueError):
+            card_array.CardArray(numpy.array(codes))
+    assert [0, 52] == list(card_array.CardArray(numpy.array([[0], [52]]))._codes)
+    c_array = card_array.CardArray(bytearray([1, 2]))
+    with pytest.raises(ValueError):
+        c_array == [card.Card(1, 'hearts')]
+    with pytest.raises(TypeError):
+        hash(c_array)
@@ -0,0 +1,102 @@
+#!/usr/bin/python
+
+import os
+import sys
+file_path = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.join(file_path, './../'))
+
+import pytest
+import random
+import deck_of_cards.card as card
+import deck_of_cards.core as core
+import deck_of_cards.counter_random as counter_random
+import deck_of_cards.deck as deck
+
+# the backend fixture of conftest.py runs each test on every built core, and
+# core is the pure Python reference
+
+def test_load_backend(monkeypatch):
+    assert core is core.load_backend('python')
+    with pytest.raises(ValueError):
+        core.load_backend('fortran')
+
+    monkeypatch.setenv(core.BACKEND_VARIABLE, 'python')
+    assert core is core.load_backend()
+    monkeypatch.setenv(core.BACKEND_VARIABLE, 'fortran')
+    with pytest.raises(ValueError):
+        core.load_backend()
+
+def test_backend_is_used(backend):
+    assert backend.NAME in core.BACKENDS
+    assert backend is deck._core
+
+def test_codes_and_counts(backend):
+    for with_jokers in [True, False]:
+        cards = deck.Deck(with_jokers)._cards
+        random.shuffle(cards)
+        assert core.pile_codes(cards) == backend.pile_codes(cards)
+        assert core.pile_codes(cards) == [c_card.get_code() for c_card in cards]
+        assert core.count_cards(cards) == backend.count_cards(cards)
+        assert core.count_cards(cards[:7]) == backend.count_cards(cards[:7])
+
+    assert [] == backend.pile_codes([])
+    assert core.count_cards([]) == backend.count_cards([])
+
+def test_bad_codes(backend):
+    codes = core.pile_codes(deck.Deck()._cards)
+    for changed_codes in [codes, codes + [0], codes + [5], codes[:10] + [5, 5, 5],
+                          [0, 0, 0, 1, 1], bytearray([3, 3, 0]), []]:
+        assert core.bad_codes(changed_codes) == backend.bad_codes(changed_codes)
+    assert [0, 5] == backend.bad_codes([0, 0, 0, 5, 5])
+
+    with pytest.raises(IndexError):
+        backend.bad_codes([card.NUMBER_OF_CODES])
+
+def test_invalid_cards(backend):
+    bad_card = card.Card(1, 'hearts')
+    bad_card._rank = 0
+    for function in [backend.pile_codes, backend.count_cards]:
+        with pytest.raises(KeyError):
+            function([bad_card])
+
+def _shuffled(shuffle, top_k=None, rng=None):
+    random.seed(7)
+    items = range(54)
+    shuffle(items, top_k, rng)
+    return items, random.random()
+
+def test_partial_shuffle_draws_the_same_numbers(backend):
+    for top_k in [None, 0, 1, 5, 53, 54, 100]:
+        assert _shuffled(core.partial_shuffle, top_k) == _shuffled(backend.partial_shuffle, top_k)
+        for rng_factory in [lambda: counter_random.CounterRandom(3, 4), lambda: random]:
+            assert (_shuffled(core.partial_shuffle, top_k, rng_factory())
+                    == _shuffled(backend.partial_shuffle, top_k, rng_factory()))
+
+    for items in [[], [1]]:
+        backend.partial_shuffle(items)
+        backend.partial_shuffle(items, 3, counter_random.CounterRandom(0, 0))
+
+def test_deal_and_discard(backend):
+    reference_deck = deck.Deck()
+    backend_deck = deck.Deck()
+    joker = card.Card(card.JOKER_RANK, card.JOKER_SUIT)
+
+    for index in [-1, 0, 10, -1]:
+        reference_card = core.deal(reference_deck, index)
+        assert reference_card == backend.deal(backend_deck, index)
+    for d_deck, module in [(reference_deck, core), (backend_deck, backend)]:
+        assert module.discard(d_deck, joker)
+        assert not module.discard(d_deck, card.Card(5, 'spades'))
+        assert not module.discard(d_deck, 'joker')
+
+    for pile in ('_cards', '_in_play_cards', '_discarded_cards'):
+        assert getattr(reference_deck, pile) == getattr(backend_deck, pile)
+    assert core.count_cards(backend_deck._cards)[0] == backend_deck._code_counts
+    assert reference_deck._suit_counts == backend_deck._suit_counts
+
+    with pytest.raises(IndexError):
+        backend.deal(backend_deck, 100)
+    empty_deck = deck.Deck()
+    empty_deck._cards = []
+    with pytest.raises(IndexError):
+        backend.deal(empty_deck, -1)
@@ -8,9 +8,11 @@ sys.path.append(os.path.join(file_path, './../'))
 import pytest
 import deck_of_cards.deck as deck
 import deck_of_cards.card as card
+import helpers
 
 import numpy
 import itertools
+import random
 
 def local_check_deck(d_deck):
     # another and different deck validation function
@@ -283,3 +285,175 @@ def test_deck_simple_empty_str():
 
     new_deck_str = "Deck(\n\t_cards : [],\n\t_discarded_cards : [],\n\t_in_play_cards : []\n)"
     assert new_deck_str == str(new_deck)
+
+def test_new_deck_codes_are_ordered():
+    for with_jokers in [True, False]:
+        codes = helpers.pile_codes(deck.Deck(with_jokers)._cards)
+        assert sorted(codes) == codes
+
+def test_partial_shuffle_matches_full_shuffle():
+    for top_k in (0, 1, 5, 52, 53, 60):
+        full_deck = deck.Deck()
+        partial_deck = deck.Deck()
+
+        random.seed(top_k)
+        full_deck.shuffle()
+        random.seed(top_k)
+        partial_deck.shuffle(top_k=top_k)
+
+        assert_good_deck(partial_deck)
+        if top_k:
+            assert full_deck._cards[-top_k:] == partial_deck._cards[-top_k:]
+
+def test_partial_shuffle_is_uniform():
+    random.seed(0)
+    ordered_cards = deck.Deck(with_jokers=False)._cards
+    new_deck = deck.Deck(with_jokers=False)
+    top_counts = [[0] * 52 for _ in xrange(3)]
+
+    for _ in xrange(5200):
+        new_deck._cards = list(ordered_cards)
+        new_deck.shuffle(top_k=3)
+        for position, counts in enumerate(top_counts):
+            counts[ordered_cards.index(new_deck._cards[-1 - position])] += 1
+
+    for counts in top_counts:
+        assert helpers.chi_square(counts) < helpers.CHI_SQUARE_51_CRITICAL
+
+def test_lazy_shuffle_is_uniform():
+    random.seed(1)
+    ordered_cards = deck.Deck(with_jokers=False)._cards
+    first_counts = [0] * 52
+    second_counts = [0] * 52
+
+    for _ in xrange(5200):
+        new_deck = deck.Deck(with_jokers=False)
+        new_deck.shuffle(lazy=True)
+        first_counts[ordered_cards.index(new_deck.deal())] += 1
+        second_counts[ordered_cards.index(new_deck.deal())] += 1
+        assert_good_deck(new_deck)
+
+    for counts in (first_counts, second_counts):
+        assert helpers.chi_square(counts) < helpers.CHI_SQUARE_51_CRITICAL
+
+def test_lazy_shuffle_deals_every_card():
+    new_deck = deck.Deck()
+    new_deck.shuffle(lazy=True)
+    while not new_deck.is_empty():
+        new_deck.discard(new_deck.deal())
+    assert_good_deck(new_deck)
+
+    # a normal shuffle turns lazy dealing off again
+    new_deck = deck.Deck()
+    new_deck.shuffle(lazy=True)
+    new_deck.shuffle()
+    top_card = new_deck._cards[-1]
+    assert top_card is new_deck.deal()
+
+def test_bad_shuffle_arguments():
+    new_deck = deck.Deck()
+    with pytest.raises(ValueError):
+        new_deck.shuffle(top_k=-1)
+    with pytest.raises(ValueError):
+        new_deck.shuffle(top_k=3, lazy=True)
+
+def _scan_count(d_deck, rank=None, suit=None):
+    return len([c_card for c_card in d_deck._cards
+                if rank in (None, c_card.get_rank()) and suit in (None, c_card.get_suit())])
+
+def test_remaining_counts():
+    for with_jokers, lazy in [(True, False), (True, True), (False, False)]:
+        new_deck = deck.Deck(with_jokers)
+        assert 4 == new_deck.remaining_count(rank=1)
+        assert 13 == new_deck.remaining_count(suit='Hearts')
+        assert (2 if with_jokers else 0) == new_deck.remaining_count(card.JOKER_RANK, card.JOKER_SUIT)
+
+        new_deck.shuffle(lazy=lazy)
+        for _ in xrange(30):
+            new_deck.discard(new_deck.deal())
+            assert_good_deck(new_deck)
+
+        assert _scan_count(new_deck) == new_deck.remaining_count()
+        for rank, count in new_deck.remaining_by_rank().items():
+            assert _scan_count(new_deck, rank=rank) == count
+            for suit in card.POSSIBLE_SUIT:
+                if rank != card.JOKER_RANK:
+                    assert _scan_count(new_deck, rank, suit) == new_deck.remaining_count(rank, suit)
+        for suit, count in new_deck.remaining_by_suit().items():
+            assert _scan_count(new_deck, suit=suit) == count
+
+        assert (card.JOKER_SUIT in new_deck.remaining_by_suit()) == with_jokers
+        assert sum(new_deck.remaining_by_rank().values()) == new_deck.remaining_count()
+
+def test_remaining_counts_of_rebuilt_decks():
+    ordered_deck = deck.Deck.from_order_rank(12345, with_jokers=False)
+    assert 4 == ordered_deck.remaining_count(rank=13)
+    assert_good_deck(ordered_deck)
+
+def test_bad_deck_when_counts_are_stale():
+    new_deck = deck.Deck()
+    new_deck.deal()
+    # put the card back without going through the deck
+    new_deck._cards.append(new_deck._in_play_cards.pop())
+    assert local_check_deck(new_deck)
+    assert not new_deck.check_deck()
+
+def test_bad_remaining_count_arguments():
+    new_deck = deck.Deck()
+    with pytest.raises(ValueError):
+        new_deck.remaining_count(rank=14)
+    with pytest.raises(ValueError):
+        new_deck.remaining_count(suit='stars')
+    with pytest.raises(ValueError):
+        new_deck.remaining_count(card.JOKER_RANK, 'hearts')
+
+def test_sample_consistent():
+    new_deck = deck.Deck()
+    joker = card.Card(card.JOKER_RANK, card.JOKER_SUIT)
+    known = {
+        'player_1' : [card.Card(1, 'spades'), joker],
+        'board' : card.Card(13, 'hearts'),
+    }
+    known_codes = [1 + 2 * 13, card.JOKER_CODE, 13]
+    hidden_codes = sorted(helpers.pile_codes(new_deck._cards))
+    for code in known_codes:
+        hidden_codes.remove(code)
+
+    samples = new_deck.sample_consistent(known, 20, rng=random.Random(5))
+    assert 20 == len(samples)
+    for sample in samples:
+        assert hidden_codes == sorted(helpers.pile_codes(sample))
+    assert samples != new_deck.sample_consistent(known, 20, rng=random.Random(6))
+    assert samples == new_deck.sample_consistent(known, 20, rng=random.Random(5))
+
+    code_matrix = new_deck.sample_consistent(known, 20, rng=numpy.random.RandomState(0), as_codes=True)
+    assert (20, 51) == code_matrix.shape
+    assert 'uint8' == code_matrix.dtype.name
+    assert (numpy.sort(code_matrix, axis=1) == hidden_codes).all()
+
+def test_sample_consistent_is_uniform():
+    new_deck = deck.Deck(with_jokers=False)
+    known = {0 : [card.Card(rank, 'clubs') for rank in card.POSSIBLE_RANK]}
+
+    # 39 hidden cards
+    code_matrix = new_deck.sample_consistent(known, 3900, rng=numpy.random.RandomState(2), as_codes=True)
+    for column in (0, 38):
+        counts = numpy.bincount(code_matrix[:, column], minlength=40)[1:40]
+        assert helpers.chi_square(counts.tolist()) < helpers.CHI_SQUARE_38_CRITICAL
+
+    random.seed(3)
+    top_counts = [0] * 39
+    for sample in new_deck.sample_consistent(known, 3900):
+        top_counts[sample[-1].get_code() - 1] += 1
+    assert helpers.chi_square(top_counts) < helpers.CHI_SQUARE_38_CRITICAL
+
+def test_bad_sample_consistent_arguments():
+    new_deck = deck.Deck(with_jokers=False)
+    joker = card.Card(card.JOKER_RANK, card.JOKER_SUIT)
+    ace_of_hearts = card.Card(1, 'hearts')
+    with pytest.raises(ValueError):
+        new_deck.sample_consistent({}, -1)
+    with pytest.raises(ValueError):
+        new_deck.sample_consistent({'player_1' : joker}, 1)
+    with pytest.raises(ValueError):
+        new_deck.sample_consistent({'player_1' : ace_of_hearts, 'player_2' : [ace_of_hearts]}, 1)
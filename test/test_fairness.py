@@ -0,0 +1,104 @@
+#!/usr/bin/python
+
+import os
+import sys
+file_path = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.join(file_path, './../'))
+
+import pytest
+import numpy
+import random
+import deck_of_cards.deck as deck
+import deck_of_cards.fairness as fairness
+import helpers
+
+def _biased_backend(seed, start, count, with_jokers):
+    # the classic mistake, swapping every card with any card
+    rng = random.Random((seed << 32) + start)
+    codes = []
+    for _ in xrange(count):
+        row = helpers.pile_codes(deck.Deck(with_jokers)._cards)
+        for i in xrange(len(row)):
+            j = rng.randrange(len(row))
+            row[i], row[j] = row[j], row[i]
+        codes.append(row)
+    return numpy.array(codes, dtype=numpy.uint8)
+
+def _assert_same_counts(a_counts, b_counts):
+    assert a_counts.get_shuffles() == b_counts.get_shuffles()
+    assert (a_counts._positions == b_counts._positions).all()
+    assert (a_counts._pairs == b_counts._pairs).all()
+
+def test_backends():
+    for name, backend in fairness.BACKENDS.items():
+        for with_jokers in (True, False):
+            new_codes = helpers.pile_codes(deck.Deck(with_jokers)._cards)
+            codes = backend(3, 100, 20, with_jokers)
+            assert (20, len(new_codes)) == codes.shape
+            assert (numpy.sort(codes, axis=1) == new_codes).all()
+            assert (codes == backend(3, 100, 20, with_jokers)).all()
+            assert (codes != backend(3, 120, 20, with_jokers)).any()
+
+def test_uniform_backends_pass():
+    for name in ('numpy', 'deck'):
+        counts = fairness.run(4000, name, seed=1, processes=1, chunk_size=1000)
+        report = counts.report()
+        assert 4000 == report['shuffles']
+        for test in ('position', 'adjacency'):
+            assert report[test]['p_value'] > 0.001
+            assert report[test]['max_z_p_value'] > 0.001
+
+def test_biased_backend_fails():
+    counts = fairness.run(4000, _biased_backend, with_jokers=False, processes=1)
+    report = counts.report()
+    assert report['position']['p_value'] < 1e-6
+    assert 2652 == round(report['position']['degrees_of_freedom'])
+    assert 2601 == round(report['adjacency']['degrees_of_freedom'])
+
+def test_processes_give_the_same_counts():
+    single = fairness.run(300, 'shuffle_index', seed=4, processes=1, chunk_size=70)
+    pool = fairness.run(300, 'shuffle_index', seed=4, processes=2, chunk_size=70)
+    _assert_same_counts(single, pool)
+
+def test_checkpoint_resume(tmpdir):
+    path = str(tmpdir.join('fairness.npz'))
+    fairness.run(200, 'numpy', seed=5, processes=1, chunk_size=100, checkpoint=path)
+    assert os.path.exists(path)
+    resumed = fairness.run(500, 'numpy', seed=5, processes=1, chunk_size=100, checkpoint=path)
+    _assert_same_counts(fairness.run(500, 'numpy', seed=5, processes=1, chunk_size=100), resumed)
+
+    counts, settings = fairness.FairnessCounts.load(path)
+    _assert_same_counts(counts, resumed)
+    assert 'numpy' == settings['backend']
+
+    with pytest.raises(ValueError):
+        fairness.run(600, 'numpy', seed=6, processes=1, chunk_size=100, checkpoint=path)
+
+    # a partial last chunk cannot be resumed without moving the chunk starts
+    partial_path = str(tmpdir.join('partial.npz'))
+    fairness.run(250, 'numpy', seed=5, processes=1, chunk_size=100, checkpoint=partial_path)
+    with pytest.raises(ValueError):
+        fairness.run(500, 'numpy', seed=5, processes=1, chunk_size=100, checkpoint=partial_path)
+    assert 250 == fairness.run(250, 'numpy', seed=5, processes=1, chunk_size=100,
+                               checkpoint=partial_path).get_shuffles()
+    # a checkpoint with more shuffles than asked for
+    with pytest.raises(ValueError):
+        fairness.run(200, 'numpy', seed=5, processes=1, chunk_size=100, checkpoint=partial_path)
+
+def test_deck_backend_keeps_the_random_state():
+    random.seed(11)
+    expected = [random.random() for _ in xrange(3)]
+    random.seed(11)
+    codes = fairness.deck_backend(1, 0, 2, True)
+    assert expected == [random.random() for _ in xrange(3)]
+    assert (codes == fairness.deck_backend(1, 0, 2, True)).all()
+
+def test_bad_arguments():
+    with pytest.raises(ValueError):
+        fairness.FairnessCounts().report()
+    with pytest.raises(ValueError):
+        fairness.FairnessCounts(with_jokers=False).add(numpy.zeros((1, 54), dtype=numpy.uint8))
+    with pytest.raises(ValueError):
+        fairness.FairnessCounts().merge(fairness.FairnessCounts(with_jokers=False))
+    with pytest.raises(ValueError):
+        fairness.run(10, chunk_size=0)
@@ -0,0 +1,82 @@
+#!/usr/bin/python
+
+import os
+import sys
+file_path = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.join(file_path, './../'))
+
+import pytest
+import subprocess
+
+import deck_of_cards
+
+#: seconds a cold ``import deck_of_cards`` may take
+IMPORT_TIME_BUDGET = 0.05
+
+#: modules a bare ``import deck_of_cards`` must not pull in
+EAGER_IMPORT_BLACKLIST = ('deck_of_cards.card', 'deck_of_cards.deck', 'logging', 'random')
+
+def _run_python(code, *options):
+    # run code in a fresh interpreter from the repository root
+    args = [sys.executable] + list(options) + ['-c', code]
+    process = subprocess.Popen(args, cwd=os.path.join(file_path, './../'),
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    out, err = process.communicate()
+    assert 0 == process.returncode, err
+    return out.decode('utf-8'), err.decode('utf-8')
+
+def test_top_level_api():
+    import deck_of_cards.card as card
+    import deck_of_cards.deck as deck
+
+    assert deck_of_cards.Card is card.Card
+    assert deck_of_cards.Deck is deck.Deck
+    assert deck_of_cards.POSSIBLE_SUIT is card.POSSIBLE_SUIT
+    assert deck_of_cards.POSSIBLE_RANK is card.POSSIBLE_RANK
+    assert deck_of_cards.JOKER_SUIT == card.JOKER_SUIT
+    assert deck_of_cards.JOKER_RANK == card.JOKER_RANK
+    assert deck_of_cards.RANK_TRANSLATION is card.RANK_TRANSLATION
+    assert deck_of_cards.deck is deck
+
+    for name in deck_of_cards.__all__:
+        assert name in dir(deck_of_cards)
+
+def test_unknown_attribute():
+    with pytest.raises(AttributeError):
+        deck_of_cards.not_a_real_attribute
+
+def test_import_is_lazy():
+    code = ("import sys\n"
+            "import deck_of_cards\n"
+            "print(' '.join(name for name in %r if name in sys.modules))\n"
+            % (EAGER_IMPORT_BLACKLIST,))
+    out, _ = _run_python(code)
+    assert '' == out.strip()
+
+def test_lazy_attribute_loads_submodule():
+    code = ("import sys\n"
+            "import deck_of_cards\n"
+            "new_deck = deck_of_cards.Deck()\n"
+            "print('deck_of_cards.deck' in sys.modules)\n")
+    out, _ = _run_python(code)
+    assert 'True' == out.strip()
+
+def test_import_time_budget():
+    if sys.version_info >= (3, 7):
+        # -X importtime reports "self | cumulative | name" in microseconds
+        _, err = _run_python('import deck_of_cards', '-X', 'importtime')
+        cumulative = 0
+        for line in err.splitlines():
+            fields = [field.strip() for field in line.split('|')]
+            if 3 == len(fields) and 'deck_of_cards' == fields[2]:
+                cumulative = int(fields[1])
+        import_time = cumulative / 1e6
+    else:
+        code = ("import timeit\n"
+                "start = timeit.default_timer()\n"
+                "import deck_of_cards\n"
+                "print(timeit.default_timer() - start)\n")
+        out, _ = _run_python(code)
+        import_time = float(out)
+
+    assert import_time < IMPORT_TIME_BUDGET
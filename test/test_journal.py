@@ -0,0 +1,146 @@
+#!/usr/bin/python
+
+import os
+import sys
+file_path = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.join(file_path, './../'))
+
+import pytest
+import random
+import deck_of_cards.deck as deck
+import deck_of_cards.card as card
+import deck_of_cards.journal as journal
+import deck_of_cards.records as records
+import helpers
+
+def _play(d_deck, rounds):
+    for round_number in xrange(rounds):
+        if 5 == round_number % 6:
+            d_deck.shuffle()
+        dealt_cards = [d_deck.deal() for _ in xrange(3)]
+        d_deck.discard(dealt_cards[1:])
+
+def test_recover(tmpdir):
+    path = str(tmpdir.join('decks.wal'))
+    random.seed(0)
+    decks = [deck.Deck(), deck.Deck(with_jokers=False), deck.Deck()]
+    decks[2].shuffle(lazy=True)
+
+    deck_journal = journal.DeckJournal(path, group_size=7, checkpoint_every=None)
+    for d_deck in decks:
+        deck_journal.attach(d_deck)
+    decks[0].shuffle(top_k=10)
+    for d_deck in decks:
+        _play(d_deck, 15)
+    deck_journal.close()
+
+    recovered = journal.recover(path)
+    assert [0, 1, 2] == sorted(recovered)
+    for deck_id, d_deck in enumerate(decks):
+        assert helpers.deck_state(d_deck) == helpers.deck_state(recovered[deck_id])
+
+def test_uncommitted_records_are_lost(tmpdir):
+    path = str(tmpdir.join('decks.wal'))
+    d_deck = deck.Deck()
+    deck_journal = journal.DeckJournal(path, group_size=4, checkpoint_every=None,
+                                       max_delay=None)
+    deck_journal.attach(d_deck, deck_id=5)
+
+    # the snapshot and 3 deals make a full group, the 4th deal is pending
+    for _ in xrange(4):
+        d_deck.deal()
+
+    recovered = journal.recover(path)[5]
+    assert 3 == len(recovered._in_play_cards)
+    assert recovered.check_deck()
+
+    deck_journal.commit()
+    assert helpers.deck_state(d_deck) == helpers.deck_state(journal.recover(path)[5])
+
+def test_max_delay(tmpdir):
+    path = str(tmpdir.join('decks.wal'))
+    d_deck = deck.Deck()
+    deck_journal = journal.DeckJournal(path, {0 : d_deck}, group_size=64,
+                                       checkpoint_every=None, max_delay=0)
+
+    # every record has waited long enough by the time it is appended
+    d_deck.deal()
+    d_deck.deal()
+    assert helpers.deck_state(d_deck) == helpers.deck_state(journal.recover(path)[0])
+    deck_journal.close()
+
+def test_torn_frame_is_ignored(tmpdir):
+    path = str(tmpdir.join('decks.wal'))
+    d_deck = deck.Deck()
+    deck_journal = journal.DeckJournal(path, group_size=1, checkpoint_every=None)
+    deck_journal.attach(d_deck)
+    d_deck.deal()
+    state = helpers.deck_state(d_deck)
+    d_deck.deal()
+    deck_journal.close()
+
+    # cut the last frame in half
+    size = os.path.getsize(path)
+    with open(path, 'rb+') as journal_file:
+        journal_file.truncate(size - 3)
+
+    assert state == helpers.deck_state(journal.recover(path)[0])
+
+def test_checkpoint(tmpdir):
+    path = str(tmpdir.join('decks.wal'))
+    d_deck = deck.Deck()
+    deck_journal = journal.DeckJournal(path, group_size=2, checkpoint_every=10)
+    deck_journal.attach(d_deck)
+    _play(d_deck, 16)
+    deck_journal.close()
+
+    # a checkpoint leaves a single snapshot, far less than 16 rounds of records
+    assert os.path.getsize(path) < 200
+    assert ['decks.wal'] == os.listdir(str(tmpdir))
+    assert helpers.deck_state(d_deck) == helpers.deck_state(journal.recover(path)[0])
+
+def test_restart_after_recover(tmpdir):
+    path = str(tmpdir.join('decks.wal'))
+    deck_journal = journal.DeckJournal(path, group_size=1)
+    deck_journal.attach(deck.Deck())
+    deck_journal.close()
+
+    decks = journal.recover(path)
+    deck_journal = journal.DeckJournal(path, decks, group_size=1)
+    decks[0].deal()
+    deck_journal.close()
+
+    assert helpers.deck_state(decks[0]) == helpers.deck_state(journal.recover(path)[0])
+
+def test_attach_errors(tmpdir):
+    deck_journal = journal.DeckJournal(str(tmpdir.join('decks.wal')))
+    d_deck = deck.Deck()
+    deck_journal.attach(d_deck, deck_id=1)
+    with pytest.raises(ValueError):
+        deck_journal.attach(d_deck)
+    with pytest.raises(ValueError):
+        deck_journal.attach(deck.Deck(), deck_id=1)
+    assert 2 == deck_journal.attach(deck.Deck())
+
+    deck_journal.detach(d_deck)
+    d_deck.deal()
+    deck_journal.close()
+    assert [2] == list(journal.recover(str(tmpdir.join('decks.wal'))))
+
+    with pytest.raises(ValueError):
+        journal.DeckJournal(str(tmpdir.join('other.wal')), group_size=0)
+
+def test_bad_journal(tmpdir):
+    path = str(tmpdir.join('decks.wal'))
+    d_deck = deck.Deck()
+    deck_journal = journal.DeckJournal(path, group_size=1)
+    deck_journal.attach(d_deck)
+    deck_journal.close()
+
+    # a deal of a card the deck does not have
+    d_deck._in_play_cards.append(card.Card(1, 'hearts'))
+    d_deck._listeners = ()
+    with open(path, 'ab') as journal_file:
+        journal_file.write(journal._frame(records.encode_discard(0, card.Card(1, 'hearts'))))
+    with pytest.raises(ValueError):
+        journal.recover(path)
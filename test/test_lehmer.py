@@ -0,0 +1,75 @@
+#!/usr/bin/python
+
+import os
+import sys
+file_path = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.join(file_path, './../'))
+
+import pytest
+import deck_of_cards.deck as deck
+import deck_of_cards.lehmer as lehmer
+import helpers
+
+import numpy
+import itertools
+import math
+
+def test_rank_is_lexicographic():
+    for size in xrange(6):
+        permutations = [list(permutation) for permutation in itertools.permutations(range(size))]
+        for expected_rank, permutation in enumerate(permutations):
+            assert expected_rank == lehmer.rank(permutation)
+            assert permutation == lehmer.unrank(expected_rank, size)
+
+def test_rank_errors():
+    with pytest.raises(ValueError):
+        lehmer.rank([0, 0, 1])
+    with pytest.raises(ValueError):
+        lehmer.unrank(-1, 3)
+    with pytest.raises(ValueError):
+        lehmer.unrank(math.factorial(3), 3)
+
+def test_deck_order_rank():
+    for with_jokers in [True, False]:
+        size = 54 if with_jokers else 52
+        assert 0 == deck.Deck(with_jokers).order_rank()
+
+        reversed_deck = deck.Deck(with_jokers)
+        reversed_deck._cards.reverse()
+        # the reversed jokers are the same order as the unreversed ones
+        last_rank = math.factorial(size) - (2 if with_jokers else 1)
+        assert last_rank == reversed_deck.order_rank()
+
+        for seed in xrange(20):
+            shuffled_deck = deck.Deck.from_shuffle_index(seed, 0, with_jokers)
+            rank = shuffled_deck.order_rank()
+            assert 0 <= rank < math.factorial(size)
+
+            ranked_deck = deck.Deck.from_order_rank(rank, with_jokers)
+            assert ranked_deck.check_deck()
+            assert helpers.pile_codes(shuffled_deck._cards) == helpers.pile_codes(ranked_deck._cards)
+            assert rank == lehmer.rank_from_bytes(lehmer.rank_to_bytes(rank))
+            assert lehmer.RANK_BYTES == len(lehmer.rank_to_bytes(rank))
+
+def test_order_rank_of_dealt_deck():
+    new_deck = deck.Deck()
+    new_deck.deal()
+    with pytest.raises(ValueError):
+        new_deck.order_rank()
+
+def test_rank_codes_batch():
+    for with_jokers in [True, False]:
+        decks = [deck.Deck.from_shuffle_index(7, index, with_jokers) for index in xrange(50)]
+        decks.append(deck.Deck(with_jokers))
+        codes = numpy.array([helpers.pile_codes(d_deck._cards) for d_deck in decks], dtype=numpy.uint8)
+
+        byte_ranks = lehmer.rank_codes_batch(codes)
+        assert (len(decks), lehmer.RANK_BYTES) == byte_ranks.shape
+        assert numpy.uint8 == byte_ranks.dtype
+
+        ranks = [d_deck.order_rank() for d_deck in decks]
+        assert [lehmer.rank_to_bytes(rank) for rank in ranks] == [row.tobytes() for row in byte_ranks]
+
+        # rows sort like the ranks
+        order = sorted(range(len(decks)), key=lambda i: byte_ranks[i].tobytes())
+        assert sorted(ranks) == [ranks[i] for i in order]
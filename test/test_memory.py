@@ -0,0 +1,133 @@
+#!/usr/bin/python
+
+import os
+import sys
+file_path = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.join(file_path, './../'))
+
+import pytest
+import gc
+import pickle
+import deck_of_cards.card as card
+import deck_of_cards.deck as deck
+import deck_of_cards.memory as memory
+
+try:
+    import tracemalloc
+except ImportError:
+    # Python 2, measure with deep sizes and gc object counts instead
+    tracemalloc = None
+
+#: number of live decks in the budget tests, set DECK_MEMORY_DECKS=100000
+#: to size a host
+DECKS = int(os.environ.get('DECK_MEMORY_DECKS', 1000))
+
+#: bytes a card with its ``__dict__`` may take
+CARD_BYTES_BUDGET = 384
+
+#: bytes a deck with its cards may take at any point of a game
+DECK_BYTES_BUDGET = 24576
+
+#: allocated blocks (or gc tracked objects) a deck with its cards may hold
+DECK_ALLOCATIONS_BUDGET = 80
+
+class _Measure(object):
+    # bytes and allocations held by the objects created since the start
+
+    def __init__(self):
+        gc.collect()
+        if tracemalloc is not None:
+            tracemalloc.start()
+            self._start = tracemalloc.take_snapshot()
+        else:
+            self._start = len(gc.get_objects())
+
+    def held(self, decks):
+        gc.collect()
+        if tracemalloc is not None:
+            stats = tracemalloc.take_snapshot().compare_to(self._start, 'filename')
+            return (sum(stat.size_diff for stat in stats),
+                    sum(stat.count_diff for stat in stats))
+
+        seen = memory.shared_ids()
+        return (sum(memory.deep_sizeof(d_deck, seen) for d_deck in decks),
+                len(gc.get_objects()) - self._start)
+
+    def stop(self):
+        if tracemalloc is not None:
+            tracemalloc.stop()
+
+def _assert_within_budget(measure, decks):
+    size, allocations = measure.held(decks)
+    assert size <= DECK_BYTES_BUDGET * len(decks)
+    assert allocations <= DECK_ALLOCATIONS_BUDGET * len(decks)
+
+def test_deck_budgets():
+    measure = _Measure()
+    try:
+        decks = [deck.Deck() for _ in xrange(DECKS)]
+        _assert_within_budget(measure, decks)
+
+        for d_deck in decks:
+            while not d_deck.is_empty():
+                d_deck.deal()
+        _assert_within_budget(measure, decks)
+
+        for d_deck in decks:
+            d_deck.discard(list(d_deck._in_play_cards))
+            assert d_deck.check_deck()
+        _assert_within_budget(measure, decks)
+    finally:
+        measure.stop()
+
+def test_card_footprint():
+    c_card = card.Card(1, 'HEARTS')
+    assert memory.card_footprint(c_card) <= CARD_BYTES_BUDGET
+    assert memory.card_footprint(c_card) == memory.card_footprint(card.from_code(5))
+
+    # the suit string is shared with the card module
+    assert c_card.get_suit() is card.POSSIBLE_SUIT[0]
+    assert c_card == pickle.loads(pickle.dumps(c_card))
+
+#: pickles of the Queen of Hearts made before card codes were added, at
+#: protocols 0 and 2
+BASELINE_PICKLES = [
+    "ccopy_reg\n_reconstructor\np0\n(cdeck_of_cards.card\nCard\np1\nc__builtin__\n"
+    "object\np2\nNtp3\nRp4\n(dp5\nS'_rank'\np6\nI12\nsS'_suit'\np7\nS'hearts'\n"
+    "p8\nsb.",
+    "\x80\x02cdeck_of_cards.card\nCard\nq\x00)\x81q\x01}q\x02(U\x05_rankq\x03K\x0c"
+    "U\x05_suitq\x04U\x06heartsq\x05ub.",
+]
+
+def test_baseline_pickles():
+    for baseline_pickle in BASELINE_PICKLES:
+        c_card = pickle.loads(baseline_pickle)
+        assert card.Card(12, 'hearts') == c_card
+        assert card.Card(12, 'hearts').get_code() == c_card.get_code()
+
+def test_deck_footprint():
+    d_deck = deck.Deck()
+    # listeners are not part of the deck
+    new_total = memory.deck_footprint(d_deck)['total']
+    listener = object()
+    d_deck.add_listener(listener)
+    assert new_total == memory.deck_footprint(d_deck)['total']
+    d_deck.remove_listener(listener)
+
+    for _ in xrange(10):
+        d_deck.discard(d_deck.deal())
+    d_deck.deal()
+    footprint = memory.deck_footprint(d_deck)
+
+    assert footprint['total'] <= DECK_BYTES_BUDGET
+    assert 54 * memory.card_footprint(d_deck._cards[0]) == footprint['cards']
+    assert (footprint['total'] == footprint['deck'] + footprint['counts']
+            + sum(footprint[name] for name in memory.PILES))
+    for name in memory.PILES:
+        pile = getattr(d_deck, name)
+        assert footprint[name] == memory.pile_footprint(pile)
+
+def test_deep_sizeof_counts_objects_once():
+    shared_list = [1.5]
+    assert (memory.deep_sizeof([shared_list, shared_list])
+            == sys.getsizeof([None, None]) + memory.deep_sizeof(shared_list))
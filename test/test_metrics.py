@@ -0,0 +1,113 @@
+#!/usr/bin/python
+
+import os
+import sys
+file_path = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.join(file_path, './../'))
+
+import pytest
+import deck_of_cards.deck as deck
+import deck_of_cards.card as card
+import deck_of_cards.metrics as metrics
+
+def _operations(snapshot, counter):
+    return dict((operation, values[counter])
+                for operation, values in snapshot['operations'].items())
+
+def test_disabled_by_default():
+    new_deck = deck.Deck()
+    assert new_deck._metrics is None
+    new_deck.shuffle()
+    new_deck.deal()
+
+def test_counters():
+    deck_metrics = metrics.DeckMetrics()
+    new_deck = deck.Deck()
+    deck_metrics.attach(new_deck)
+
+    new_deck.shuffle()
+    dealt_cards = [new_deck.deal() for _ in range(3)]
+    new_deck.discard(dealt_cards)
+    assert new_deck.check_deck()
+
+    new_deck._cards[0] = card.Card(card.JOKER_RANK, card.JOKER_SUIT)
+    new_deck._cards[1] = card.Card(card.JOKER_RANK, card.JOKER_SUIT)
+    assert not new_deck.check_deck()
+
+    with pytest.raises(ValueError):
+        new_deck.discard(dealt_cards[0])
+
+    snapshot = deck_metrics.to_dict()
+    assert {'deal' : 3, 'discard' : 2, 'shuffle' : 1, 'check_deck' : 2} == _operations(snapshot, 'calls')
+    assert {'deal' : 0, 'discard' : 1, 'shuffle' : 0, 'check_deck' : 0} == _operations(snapshot, 'errors')
+    assert 1 == snapshot['check_deck_failures']
+
+    # every call is sampled by default
+    for operation, values in snapshot['operations'].items():
+        assert values['calls'] == values['latency']['count']
+        assert values['calls'] == values['latency']['buckets'][-1][1]
+
+    deck_metrics.detach(new_deck)
+    assert new_deck._metrics is None
+
+def test_sampling():
+    deck_metrics = metrics.DeckMetrics(sample_every=4)
+    new_deck = deck.Deck()
+    deck_metrics.attach(new_deck)
+
+    for _ in range(10):
+        new_deck.deal()
+
+    latency = deck_metrics.to_dict()['operations']['deal']['latency']
+    assert 2 == latency['count']
+
+    with pytest.raises(ValueError):
+        metrics.DeckMetrics(sample_every=0)
+
+def test_profile_every_deck():
+    deck_metrics = metrics.DeckMetrics()
+    with deck_metrics.profile():
+        deck.Deck().deal()
+        deck.Deck().deal()
+    deck.Deck().deal()
+
+    assert deck.Deck._metrics is None
+    assert 2 == deck_metrics.to_dict()['operations']['deal']['calls']
+
+def test_profile_single_deck():
+    deck_metrics = metrics.DeckMetrics()
+    profiled_deck = deck.Deck()
+    other_deck = deck.Deck()
+    with deck_metrics.profile(profiled_deck):
+        profiled_deck.shuffle()
+        other_deck.shuffle()
+
+    assert profiled_deck._metrics is None
+    assert 1 == deck_metrics.to_dict()['operations']['shuffle']['calls']
+
+    # a deck given twice is profiled once
+    with deck_metrics.profile(profiled_deck, profiled_deck):
+        profiled_deck.shuffle()
+    assert profiled_deck._metrics is None
+    assert 2 == deck_metrics.to_dict()['operations']['shuffle']['calls']
+
+def test_prometheus(tmpdir):
+    deck_metrics = metrics.DeckMetrics()
+    new_deck = deck.Deck()
+    with deck_metrics.profile(new_deck):
+        new_deck.deal()
+
+    text = deck_metrics.to_prometheus()
+    assert 'deck_operations_total{operation="deal"} 1\n' in text
+    assert 'deck_operation_latency_seconds_bucket{operation="deal",le="+Inf"} 1\n' in text
+    assert 'deck_operation_latency_seconds_count{operation="shuffle"} 0\n' in text
+    assert 'deck_check_deck_failures_total 0\n' in text
+
+    path = str(tmpdir.join('deck.prom'))
+    deck_metrics.write_prometheus(path)
+    with open(path) as prom_file:
+        assert text == prom_file.read()
+    assert ['deck.prom'] == os.listdir(str(tmpdir))
+
+    deck_metrics.reset()
+    assert 0 == deck_metrics.to_dict()['operations']['deal']['calls']
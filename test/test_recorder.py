@@ -0,0 +1,135 @@
+#!/usr/bin/python
+
+import os
+import sys
+file_path = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.join(file_path, './../'))
+
+import pytest
+import timeit
+import deck_of_cards.deck as deck
+import deck_of_cards.recorder as recorder
+
+#: seconds recording one event may take, flushes included. The timing test
+#: only runs when DECK_RECORDER_EVENT_BUDGET is set, e.g. to 3e-7
+EVENT_SECONDS_BUDGET = os.environ.get('DECK_RECORDER_EVENT_BUDGET')
+
+def _play(decks):
+    # returns the expected (deck_id, seq, op, rank, suit) rows
+    rows = []
+    seqs = [0] * len(decks)
+    for _ in xrange(4):
+        for deck_id, d_deck in enumerate(decks):
+            d_deck.shuffle()
+            dealt_cards = [d_deck.deal() for _ in xrange(3)]
+            d_deck.discard(dealt_cards[:2])
+
+            events = ([(recorder.OP_DEAL, c_card) for c_card in dealt_cards]
+                      + [(recorder.OP_DISCARD, c_card) for c_card in dealt_cards[:2]])
+            for op, c_card in events:
+                rows.append((deck_id, seqs[deck_id], op, c_card.get_rank(),
+                             recorder.SUITS.index(c_card.get_suit())))
+                seqs[deck_id] += 1
+    return rows
+
+def _read_rows(path):
+    columns = recorder.read_columns(path)
+    names = [name for name, _ in recorder.COLUMNS]
+    return list(zip(*[columns[name].tolist() for name in names]))
+
+def _record(path, file_format):
+    decks = [deck.Deck(), deck.Deck(with_jokers=False)]
+    deal_recorder = recorder.DealRecorder(path, chunk_size=7, file_format=file_format)
+    for d_deck in decks:
+        deal_recorder.attach(d_deck)
+    rows = _play(decks)
+    deal_recorder.close()
+
+    # closing detaches the decks
+    decks[0].deal()
+    return rows
+
+def test_binary_format(tmpdir):
+    path = str(tmpdir.join('deals'))
+    rows = _record(path, 'binary')
+    assert 40 == len(rows)
+    assert rows == _read_rows(path)
+
+    columns = recorder.read_columns(path)
+    assert 'uint8' == columns['op'].dtype.name
+    assert 4 == columns['deck_id'].dtype.itemsize
+
+def test_arrow_format(tmpdir):
+    pytest.importorskip('pyarrow')
+    path = str(tmpdir.join('deals.arrow'))
+    rows = _record(path, 'arrow')
+    assert rows == _read_rows(path)
+
+def test_jokers_and_deck_ids(tmpdir):
+    path = str(tmpdir.join('deals'))
+    d_deck = deck.Deck()
+    deal_recorder = recorder.DealRecorder(path, file_format='binary')
+    assert 7 == deal_recorder.attach(d_deck, deck_id=7)
+    assert 8 == deal_recorder.attach(deck.Deck())
+
+    # a new deck deals from the end, the jokers are at the start
+    while len(d_deck._cards) > 1:
+        d_deck.deal()
+    joker = d_deck.deal()
+    deal_recorder.close()
+
+    assert joker.is_joker()
+    assert (7, 53, recorder.OP_DEAL, 0, len(recorder.SUITS) - 1) == _read_rows(path)[-1]
+
+def test_flushes_full_chunks(tmpdir):
+    path = str(tmpdir.join('deals'))
+    d_deck = deck.Deck()
+    deal_recorder = recorder.DealRecorder(path, chunk_size=16, file_format='binary')
+    deal_recorder.attach(d_deck)
+    listener = d_deck._listeners[0]
+    c_card = d_deck._cards[0]
+
+    for _ in xrange(40):
+        listener.deck_dealt(d_deck, c_card)
+    assert 32 == len(_read_rows(path))
+    deal_recorder.close()
+
+    row = (0, 0, recorder.OP_DEAL, 0, len(recorder.SUITS) - 1)
+    assert [row[:1] + (seq,) + row[2:] for seq in xrange(40)] == _read_rows(path)
+
+@pytest.mark.skipif(EVENT_SECONDS_BUDGET is None,
+                    reason="Set DECK_RECORDER_EVENT_BUDGET to time the recorder.")
+def test_event_cost(tmpdir):
+    d_deck = deck.Deck()
+    deal_recorder = recorder.DealRecorder(str(tmpdir.join('deals')), chunk_size=4096,
+                                          file_format='binary')
+    deal_recorder.attach(d_deck)
+    listener = d_deck._listeners[0]
+    c_card = d_deck._cards[0]
+
+    events = 20000
+    seconds = min(timeit.repeat(lambda: listener.deck_dealt(d_deck, c_card),
+                                number=events, repeat=5))
+    empty_seconds = min(timeit.repeat(lambda: None, number=events, repeat=5))
+    deal_recorder.close()
+    assert (seconds - empty_seconds) / events <= float(EVENT_SECONDS_BUDGET)
+
+def test_bad_arguments(tmpdir):
+    with pytest.raises(ValueError):
+        recorder.DealRecorder(str(tmpdir.join('deals')), chunk_size=0)
+    with pytest.raises(ValueError):
+        recorder.DealRecorder(str(tmpdir.join('deals')), file_format='csv')
+
+    deal_recorder = recorder.DealRecorder(str(tmpdir.join('deals')), file_format='binary')
+    d_deck = deck.Deck()
+    deal_recorder.attach(d_deck, deck_id=7)
+    with pytest.raises(ValueError):
+        deal_recorder.attach(deck.Deck(), deck_id=7)
+    with pytest.raises(ValueError):
+        deal_recorder.attach(d_deck)
+
+    # the id of a detached deck stays used
+    deal_recorder.detach(d_deck)
+    with pytest.raises(ValueError):
+        deal_recorder.attach(d_deck, deck_id=7)
+    assert 8 == deal_recorder.attach(d_deck)
@@ -0,0 +1,102 @@
+#!/usr/bin/python
+
+import os
+import sys
+file_path = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.join(file_path, './../'))
+
+import pytest
+import multiprocessing
+import socket
+import deck_of_cards.deck as deck
+import deck_of_cards.replication as replication
+import helpers
+
+def _play(d_deck):
+    d_deck.shuffle()
+    for _ in xrange(5):
+        dealt_cards = [d_deck.deal() for _ in xrange(3)]
+        d_deck.discard(dealt_cards[:2])
+    d_deck.shuffle(lazy=True)
+    d_deck.discard(d_deck.deal())
+
+def test_pipe():
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    primary = deck.Deck()
+    replicator = replication.DeckReplicator(primary, sender.send_bytes)
+    replica = replication.DeckReplica()
+
+    _play(primary)
+    while receiver.poll():
+        replica.feed(receiver.recv_bytes())
+
+    assert not replica.needs_snapshot()
+    assert replica.get_deck().check_deck()
+    assert helpers.deck_state(primary) == helpers.deck_state(replica.get_deck())
+    replicator.close()
+
+def test_socket_stream():
+    primary_socket, replica_socket = socket.socketpair()
+    primary = deck.Deck(with_jokers=False)
+    sent_bytes = []
+
+    def _send(data):
+        sent_bytes.append(len(data))
+        primary_socket.sendall(data)
+
+    replication.DeckReplicator(primary, _send)
+    _play(primary)
+    primary_socket.close()
+
+    # feed the stream in small chunks that split records
+    replica = replication.DeckReplica()
+    data = replica_socket.recv(5)
+    while data:
+        replica.feed(data)
+        data = replica_socket.recv(5)
+    replica_socket.close()
+
+    assert helpers.deck_state(primary) == helpers.deck_state(replica.get_deck())
+
+    # every message but the snapshot and the shuffles is a 6 byte deal or discard
+    assert set([6]) == set(sent_bytes[2:-3] + sent_bytes[-2:])
+
+def test_gap_and_resync():
+    messages = []
+    primary = deck.Deck()
+    replicator = replication.DeckReplicator(primary, messages.append)
+    replica = replication.DeckReplica()
+    assert replica.needs_snapshot()
+    assert replica.get_deck() is None
+
+    primary.deal()
+    primary.deal()
+    # lose the first deal
+    del messages[1]
+    for message in messages:
+        replica.feed(message)
+    assert replica.needs_snapshot()
+    assert not replica.get_deck()._in_play_cards
+
+    # changes are ignored until the snapshot arrives
+    del messages[:]
+    primary.deal()
+    replicator.send_snapshot()
+    primary.deal()
+    assert 2 == replica.feed(b''.join(messages))
+    assert not replica.needs_snapshot()
+    assert helpers.deck_state(primary) == helpers.deck_state(replica.get_deck())
+
+def test_sequence_wraps_around():
+    messages = []
+    primary = deck.Deck()
+    replicator = replication.DeckReplicator(primary, messages.append)
+    replica = replication.DeckReplica()
+    replicator._sequence = replication.SEQUENCE_RANGE - 1
+    replicator.send_snapshot()
+    primary.deal()
+    for message in messages:
+        replica.feed(message)
+
+    assert not replica.needs_snapshot()
+    assert helpers.deck_state(primary) == helpers.deck_state(replica.get_deck())
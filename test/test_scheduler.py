@@ -0,0 +1,258 @@
+#!/usr/bin/python
+
+import os
+import sys
+file_path = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.join(file_path, './../'))
+
+import pytest
+import logging
+import multiprocessing
+import deck_of_cards.card as card
+import deck_of_cards.deck as deck
+import deck_of_cards.journal as journal
+import deck_of_cards.metrics as metrics
+import deck_of_cards.replication as replication
+import deck_of_cards.scheduler as scheduler
+import deck_of_cards.shared as shared
+import helpers
+
+def _play_round(table_scheduler, table_id, round_number):
+    # queue a few deals and discards, and run them on a reference deck
+    reference = table_scheduler.reference[table_id]
+    expected = []
+    for count in (1, 3, 2):
+        table_scheduler.deal(table_id, count)
+        expected.append([reference.deal() for _ in xrange(count)])
+    for discard_cards in (expected[1][:2], expected[0][0]):
+        table_scheduler.discard(table_id, discard_cards)
+        reference.discard(discard_cards)
+        expected.append(None)
+    if round_number % 2:
+        table_scheduler.deal(table_id)
+        expected.append([reference.deal()])
+    return expected
+
+def _run_rounds(workers):
+    table_scheduler = scheduler.TableScheduler(workers)
+    table_scheduler.reference = {}
+    for table_id in xrange(20):
+        table_scheduler.add_table(table_id, with_jokers=bool(table_id % 2))
+        table_scheduler.reference[table_id] = deck.Deck(bool(table_id % 2))
+
+    for round_number in xrange(4):
+        expected = dict((table_id, _play_round(table_scheduler, table_id, round_number))
+                        for table_id in xrange(20))
+        assert expected == table_scheduler.tick()
+
+    for table_id in xrange(20):
+        helpers.assert_same_deck(table_scheduler.reference[table_id],
+                                 table_scheduler.get_deck(table_id))
+    stats = table_scheduler.get_stats()
+    table_scheduler.close()
+    return stats
+
+def test_matches_deck():
+    stats = _run_rounds(1)
+    assert 4 == stats['ticks']
+    assert 20 == stats['tables']
+    assert 0 == stats['queued']
+    assert 20 * (4 * 5 + 2) == stats['operations']
+    # deals and discards are coalesced, the extra deal starts a new batch
+    assert 20 * (4 * 2 + 2) == stats['batches']
+    assert 0 <= stats['mean_queue_latency'] <= stats['max_queue_latency']
+    assert stats['operations_per_second'] > 0
+
+def test_thread_pool_matches_deck():
+    assert _run_rounds(3)['operations'] == _run_rounds(1)['operations']
+
+def test_listeners_see_every_card():
+    table_scheduler = scheduler.TableScheduler()
+    primary = table_scheduler.add_table('a')
+    messages = []
+    replication.DeckReplicator(primary, messages.append)
+    replica = replication.DeckReplica()
+
+    table_scheduler.shuffle('a')
+    table_scheduler.shuffle('a')
+    table_scheduler.deal('a', 5)
+    table_scheduler.deal('a', 5)
+    table_scheduler.tick()
+    table_scheduler.discard('a', list(primary._in_play_cards))
+    table_scheduler.tick()
+
+    for message in messages:
+        replica.feed(message)
+    assert not replica.needs_snapshot()
+    helpers.assert_same_deck(primary, replica.get_deck())
+    # a snapshot, one coalesced shuffle, 10 deals and 10 discards
+    assert 22 == len(messages)
+
+def test_errors_match_deck():
+    table_scheduler = scheduler.TableScheduler()
+    table_scheduler.add_table('a', with_jokers=False)
+    reference = deck.Deck(with_jokers=False)
+
+    ace_of_hearts = card.Card(1, 'hearts')
+    table_scheduler.deal('a', 50)
+    table_scheduler.deal('a', 1)
+    table_scheduler.deal('a', 2)
+    table_scheduler.deal('a', 1)
+    table_scheduler.discard('a', ace_of_hearts)
+    table_scheduler.discard('a', ace_of_hearts)
+    results = table_scheduler.tick()['a']
+
+    assert 6 == len(results)
+    assert 50 == len(results[0])
+    assert 1 == len(results[1])
+    assert isinstance(results[2], IndexError)
+    assert isinstance(results[3], IndexError)
+    assert results[4] is None
+    assert isinstance(results[5], ValueError)
+
+    # the same calls on a deck, one at a time
+    for _ in xrange(52):
+        reference.deal()
+    reference.discard(ace_of_hearts)
+    helpers.assert_same_deck(reference, table_scheduler.get_deck('a'))
+
+class _FailingListener(object):
+    # a listener whose output is gone, like a closed socket
+
+    def deck_dealt(self, d_deck, c_card):
+        raise IOError("Broken pipe")
+
+    def deck_discarded(self, d_deck, c_card):
+        pass
+
+    def deck_shuffled(self, d_deck):
+        raise IOError("Broken pipe")
+
+def test_listener_errors_do_not_drop_operations():
+    table_scheduler = scheduler.TableScheduler()
+    failing = table_scheduler.add_table('failing')
+    failing.add_listener(_FailingListener())
+    for table_id in ('before', 'after'):
+        table_scheduler.add_table(table_id)
+        table_scheduler.deal(table_id, 2)
+    table_scheduler.deal('failing', 2)
+    table_scheduler.deal('failing', 1)
+    table_scheduler.shuffle('failing')
+    table_scheduler.discard('failing', card.Card(1, 'hearts'))
+    results = table_scheduler.tick()
+
+    assert 2 == len(results['before'][0]) == len(results['after'][0])
+    for result in results['failing'][:3]:
+        assert isinstance(result, IOError)
+    assert isinstance(results['failing'][3], ValueError)
+    # each deal moved its first card before the listener raised
+    assert 2 == len(failing._in_play_cards)
+    assert failing.check_deck()
+    assert 0 == table_scheduler.queued()
+    assert 6 == table_scheduler.get_stats()['operations']
+
+def test_journal_checkpoint_inside_a_batch(tmpdir):
+    path = str(tmpdir.join('tables.wal'))
+    table_scheduler = scheduler.TableScheduler()
+    d_deck = table_scheduler.add_table('a')
+    deck_journal = journal.DeckJournal(path, {0 : d_deck}, group_size=1,
+                                       checkpoint_every=3)
+
+    # the automatic checkpoint falls after the third of the four cards
+    table_scheduler.deal('a', 4)
+    table_scheduler.deal('a', 1)
+    table_scheduler.tick()
+    table_scheduler.discard('a', d_deck._in_play_cards[1:4])
+    table_scheduler.tick()
+    deck_journal.close()
+
+    helpers.assert_same_deck(d_deck, journal.recover(path)[0])
+
+def _log_records(caplog, run):
+    # the messages deck.LOGGER gets while running `run` on a new deck
+    d_deck = deck.Deck()
+    del caplog.records[:]
+    caplog.set_level(logging.DEBUG, logger=deck.LOGGER.name)
+    run(d_deck)
+    return [(record.levelno, record.getMessage()) for record in caplog.records
+            if record.name == deck.LOGGER.name]
+
+def test_log_records_match_deck(caplog):
+    def run_deck(d_deck):
+        dealt_cards = [d_deck.deal() for _ in xrange(5)]
+        d_deck.discard(dealt_cards[1:4])
+
+    def run_scheduler(d_deck):
+        table_scheduler = scheduler.TableScheduler()
+        table_scheduler.add_table('a', d_deck)
+        table_scheduler.deal('a', 2)
+        table_scheduler.deal('a', 3)
+        table_scheduler.tick()
+        table_scheduler.discard('a', d_deck._in_play_cards[1:4])
+        table_scheduler.tick()
+
+    deck_records = _log_records(caplog, run_deck)
+    assert 5 + 5 + 3 == len(deck_records)
+    assert deck_records == _log_records(caplog, run_scheduler)
+
+def test_decks_which_are_not_batched():
+    store = shared.SharedDeckStore(1)
+    table_scheduler = scheduler.TableScheduler()
+    table_scheduler.add_table('shared', store.deck(0))
+    instrumented = table_scheduler.add_table('instrumented')
+    deck_metrics = metrics.DeckMetrics()
+    deck_metrics.attach(instrumented)
+
+    for table_id in ('shared', 'instrumented'):
+        table_scheduler.deal(table_id, 3)
+        table_scheduler.deal(table_id, 2)
+    results = table_scheduler.tick()
+
+    assert results['shared'] == results['instrumented']
+    assert store.deck(0).check_deck()
+    assert 5 == deck_metrics.to_dict()['operations']['deal']['calls']
+
+def _run_shard(table_ids):
+    table_scheduler = scheduler.TableScheduler()
+    for table_id in table_ids:
+        table_scheduler.add_table(table_id)
+        table_scheduler.deal(table_id, 2)
+    results = table_scheduler.tick()
+    return sum(len(table_results[0]) for table_results in results.values())
+
+def test_partition_and_processes():
+    shares = scheduler.partition(xrange(10), 3)
+    assert [[0, 3, 6, 9], [1, 4, 7], [2, 5, 8]] == shares
+    assert shares == scheduler.partition(xrange(10), 3)
+    # string ids land in the same share in every process
+    assert [['a', 'c'], ['b']] == scheduler.partition(['a', 'b', 'c'], 2)
+
+    pool = multiprocessing.Pool(2)
+    try:
+        assert 20 == sum(pool.map(_run_shard, shares))
+    finally:
+        pool.close()
+        pool.join()
+
+def test_bad_arguments():
+    with pytest.raises(ValueError):
+        scheduler.TableScheduler(workers=0)
+    with pytest.raises(ValueError):
+        scheduler.partition([1], 0)
+
+    table_scheduler = scheduler.TableScheduler()
+    table_scheduler.add_table(1)
+    with pytest.raises(ValueError):
+        table_scheduler.add_table(1)
+    with pytest.raises(ValueError):
+        table_scheduler.deal(2)
+    with pytest.raises(ValueError):
+        table_scheduler.deal(1, 0)
+    with pytest.raises(ValueError):
+        table_scheduler.get_deck(2)
+
+    table_scheduler.deal(1)
+    assert 1 == table_scheduler.queued()
+    table_scheduler.remove_table(1)
+    assert 0 == table_scheduler.queued()
+    assert {} == table_scheduler.tick()
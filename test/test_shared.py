@@ -0,0 +1,161 @@
+#!/usr/bin/python
+
+import os
+import sys
+file_path = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.join(file_path, './../'))
+
+import pytest
+import logging
+import multiprocessing
+import deck_of_cards.deck as deck
+import deck_of_cards.card as card
+import deck_of_cards.shared as shared
+import helpers
+
+def test_new_store():
+    for with_jokers in [True, False]:
+        store = shared.SharedDeckStore(3, with_jokers)
+        assert 3 == len(store)
+        for slot in range(len(store)):
+            shared_deck = store.deck(slot)
+            assert shared_deck.check_deck()
+            helpers.assert_same_deck(deck.Deck(with_jokers), shared_deck)
+
+    with pytest.raises(ValueError):
+        shared.SharedDeckStore(0)
+
+    with pytest.raises(IndexError):
+        shared.SharedDeckStore(1).deck(1)
+
+def test_matches_deck():
+    # run the same operations on a private and a shared deck
+    store = shared.SharedDeckStore(2)
+    private_deck = deck.Deck()
+    private_deck.shuffle()
+    store.load(1, private_deck)
+    shared_deck = store.deck(1)
+    helpers.assert_same_deck(private_deck, shared_deck)
+
+    for _ in range(3):
+        dealt_cards = [private_deck.deal() for _ in range(5)]
+        assert dealt_cards == [shared_deck.deal() for _ in range(5)]
+
+        private_deck.discard([dealt_cards[3], dealt_cards[0]])
+        shared_deck.discard([dealt_cards[3], dealt_cards[0]])
+        private_deck.discard(dealt_cards[4])
+        shared_deck.discard(dealt_cards[4])
+
+        assert shared_deck.check_deck()
+        helpers.assert_same_deck(private_deck, shared_deck)
+        helpers.assert_same_deck(private_deck, store.to_deck(1))
+
+    # the neighbouring slot is untouched
+    helpers.assert_same_deck(deck.Deck(), store.deck(0))
+
+def test_deal_and_discard_errors():
+    store = shared.SharedDeckStore(1, with_jokers=False)
+    shared_deck = store.deck(0)
+
+    with pytest.raises(ValueError):
+        shared_deck.discard(card.Card(1, 'hearts'))
+
+    while not shared_deck.is_empty():
+        shared_deck.discard(shared_deck.deal())
+    assert shared_deck.check_deck()
+
+    with pytest.raises(IndexError):
+        shared_deck.deal()
+
+def test_shuffle_in_place():
+    store = shared.SharedDeckStore(1)
+    shared_deck = store.deck(0)
+    shared_deck.deal()
+    shared_deck.shuffle()
+    assert shared_deck.check_deck()
+    assert 53 == len(shared_deck._cards)
+    assert helpers.pile_codes(shared_deck._cards) != helpers.pile_codes(deck.Deck()._cards[:-1])
+
+    for kwargs in ({'top_k' : 3}, {'lazy' : True}):
+        shared_deck.shuffle(**kwargs)
+        assert shared_deck.check_deck()
+
+    with pytest.raises(ValueError):
+        shared_deck.shuffle(top_k=3, lazy=True)
+
+def test_bad_slot():
+    store = shared.SharedDeckStore(1)
+    store.deck(0)._store._buffer[shared.SLOT_HEADER] = 5
+    assert not store.deck(0).check_deck()
+
+    # a count byte which does not match the unused cards
+    store.reset(0)
+    store._buffer[shared.SLOT_HEADER + shared.SLOT_CARDS + 5] = 0
+    assert not store.deck(0).check_deck()
+
+def _log_records(caplog, d_deck):
+    # the messages deck.LOGGER gets while playing on `d_deck`
+    del caplog.records[:]
+    caplog.set_level(logging.DEBUG, logger=deck.LOGGER.name)
+    d_deck.shuffle(top_k=0)
+    dealt_cards = [d_deck.deal() for _ in range(3)]
+    d_deck.discard(dealt_cards[:2])
+    return [(record.levelno, record.getMessage()) for record in caplog.records
+            if record.name == deck.LOGGER.name]
+
+def test_log_records_match_deck(caplog):
+    private_records = _log_records(caplog, deck.Deck())
+    assert 1 + 3 + 3 + 2 == len(private_records)
+    assert private_records == _log_records(caplog, shared.SharedDeckStore(1).deck(0))
+
+def _worker(store, slots, deals):
+    for slot in slots:
+        with store.locked(slot) as shared_deck:
+            shared_deck.shuffle()
+            for _ in range(deals):
+                shared_deck.discard(shared_deck.deal())
+
+def test_workers():
+    store = shared.SharedDeckStore(8)
+    workers = [multiprocessing.Process(target=_worker, args=(store, range(i, 8, 2), 10 + i))
+               for i in range(2)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+        assert 0 == worker.exitcode
+
+    for slot in range(8):
+        shared_deck = store.deck(slot)
+        assert shared_deck.check_deck()
+        assert 10 + slot % 2 == len(shared_deck._discarded_cards)
+        assert not shared_deck._in_play_cards
+
+def test_discard_joker_matches_deck():
+    private_deck = deck.Deck()
+    private_deck._cards.reverse()
+    store = shared.SharedDeckStore(1)
+    store.load(0, private_deck)
+    shared_deck = store.deck(0)
+
+    for d_deck in (private_deck, shared_deck):
+        dealt_cards = [d_deck.deal() for _ in range(3)]
+        d_deck.discard(dealt_cards[0])
+    helpers.assert_same_deck(private_deck, shared_deck)
+
+def test_lock_stripes():
+    store = shared.SharedDeckStore(1000)
+    assert shared.LOCK_STRIPES == len(store._locks)
+    assert store.lock(3) is store.lock(3 + shared.LOCK_STRIPES)
+    assert 1 == len(shared.SharedDeckStore(1)._locks)
+
+    # slots of the same lock can be held together
+    store = shared.SharedDeckStore(4, locks=2)
+    with store.locked(0) as first_deck:
+        with store.locked(2) as second_deck:
+            first_deck.discard(first_deck.deal())
+            second_deck.deal()
+    assert store.deck(0).check_deck()
+
+    with pytest.raises(ValueError):
+        shared.SharedDeckStore(4, locks=0)